@@ -0,0 +1,17 @@
+import argparse
+
+from logger import setup_logging
+
+parser = argparse.ArgumentParser(description="Render many reports from one shared extract")
+
+parser.add_argument("specs", type=str, help="JSON file with the list of report specs")
+parser.add_argument("--trace-memory", action="store_true", help="Trace the peak memory of every stage")
+args = parser.parse_args()
+
+if __name__ == "__main__":
+    setup_logging()
+
+    from batch_processing_job import BatchProcessingJob, load_report_specs
+
+    job = BatchProcessingJob(load_report_specs(args.specs), args.trace_memory)
+    job.run()
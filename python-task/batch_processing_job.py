@@ -0,0 +1,93 @@
+import json
+from datetime import datetime
+from logger import logger
+from typing import Dict, List
+
+from data_processing_job import DataProcessingJob
+from utils.data_utils import parse_dates
+
+
+def load_report_specs(path: str) -> List[Dict]:
+    """
+    Loads the specs of the reports to render from JSON file.
+
+    Every spec has the "keys" to include and optionally whether the rows are "colored",
+    the "as_of" date they are colored relative to as YYYY-MM-DD, the output "format" and
+    the "name" suffixed to the output file path.
+
+    Parameters
+    ----------
+    path : str
+        Path of the JSON file with list of the specs.
+
+    Returns
+    -------
+    specs : List[Dict]
+        The specs with the defaults of the missing optional fields.
+    """
+    with open(path) as file:
+        specs = json.load(file)
+
+    if not isinstance(specs, list) or not specs:
+        raise ValueError(f"Expected non empty list of report specs in {path}.")
+
+    for i, spec in enumerate(specs):
+        if not spec.get("keys"):
+            raise ValueError(f"Report spec {i} in {path} has no keys.")
+
+        spec.setdefault("colored", True)
+        spec.setdefault("as_of", None)
+        spec.setdefault("format", "xlsx")
+        spec.setdefault("name", f"report_{i + 1}")
+
+    return specs
+
+
+class BatchProcessingJob(DataProcessingJob):
+    """
+    Renders many reports from one shared extract.
+
+    The data is extracted and cleaned once with the columns of all reports,
+    then every report is rendered from the shared clean DataFrame.
+    """
+
+    def __init__(self, specs: List[Dict], trace_memory: bool = False):
+        # Extract the columns of all reports
+        columns = list(dict.fromkeys(key for spec in specs for key in spec["keys"]))
+        super().__init__(columns, any(spec["colored"] for spec in specs), trace_memory=trace_memory)
+
+        self.reports = []
+        for spec in specs:
+            report = DataProcessingJob(
+                list(spec["keys"]),
+                spec["colored"],
+                output_format=spec["format"],
+                today=datetime.fromisoformat(spec["as_of"]) if spec["as_of"] else None
+            )
+            report._OUTPUT_DATA_PATH = f"{self._OUTPUT_DATA_PATH}_{spec['name']}"
+            self.reports.append(report)
+
+    def _transform(self, data):
+        logger.info("Transforming data...")
+
+        sorted_df = self._clean(data)
+
+        # Parse "hu" dates once for all as-of dates
+        hu_dates = None
+        if any(report.to_color_rows and report.sink.supports_styling for report in self.reports):
+            hu_dates = parse_dates(sorted_df[self._HU_COLUMN])
+
+        # Resolve label colors once for all reports
+        label_color_codes = None
+        if any(self._LABEL_IDS_COLUMN in report.columns and report.sink.supports_styling for report in self.reports):
+            label_color_codes = self._get_label_color_codes(sorted_df[self._LABEL_IDS_COLUMN])
+
+        logger.info("Data transformations ended!")
+
+        return sorted_df, hu_dates, label_color_codes
+
+    def _load(self, result):
+        sorted_df, hu_dates, label_color_codes = result
+        for i, report in enumerate(self.reports):
+            logger.info(f"Rendering report {i + 1} of {len(self.reports)}...")
+            report._load(report._render(sorted_df, hu_dates, label_color_codes))
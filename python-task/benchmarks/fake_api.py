@@ -0,0 +1,44 @@
+from typing import Dict
+
+from benchmarks.fleet_generator import LABEL_IDS, generate_api_payload
+from tests.stub_server import StubServer
+
+LOGIN_PATH = "/login"
+VEHICLES_PATH = "/vehicles/select/active"
+LABELS_PATH = "/labels/"
+
+
+def get_label_color_codes() -> Dict[str, str]:
+    """
+    Gets the color code served for every generated label id.
+    """
+    return {label_id: f"#{int(label_id) * 7919 % 0xFFFFFF:06X}" for label_id in LABEL_IDS}
+
+
+def create_fake_api(rows: int, latency: float = 0, seed: int = 0) -> StubServer:
+    """
+    Creates local server serving the baubuddy API endpoints the job uses with generated data.
+
+    Parameters
+    ----------
+    rows : int
+        Count of vehicles served by /vehicles/select/active.
+    latency : float
+        Seconds to wait before every response.
+    seed : int
+        Seed of the random generator.
+
+    Returns
+    -------
+    server : StubServer
+        The server, serving once entered as context manager.
+    """
+    routes = {
+        LOGIN_PATH: (200, {"oauth": {"access_token": "benchmark", "expires_in": 24 * 60 * 60}}),
+        # The records are generated while they are streamed, for every request again
+        VEHICLES_PATH: lambda handler: (200, generate_api_payload(rows, seed))
+    }
+    for label_id, color_code in get_label_color_codes().items():
+        routes[f"{LABELS_PATH}{label_id}"] = (200, [{"id": int(label_id), "colorCode": color_code}])
+
+    return StubServer(routes, delay=latency)
@@ -0,0 +1,162 @@
+import json
+from typing import Iterator, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+GRUPPEN = ["LKW", "PKW", "Anhänger", "Bagger", "Kran", "Stapler"]
+LAGERORTE = ["Paderborn", "Bielefeld", "Dortmund", "Kassel"]
+LABEL_IDS = [str(label_id) for label_id in range(70, 90)]
+
+
+def _get_kurznamen(start: int, end: int) -> np.ndarray:
+    return np.char.add("PB V ", np.arange(start, end).astype(str))
+
+
+def generate_local_data(rows: int, seed: int = 0, start: int = 0) -> pd.DataFrame:
+    """
+    Generates local vehicles data with the columns of resources/vehicles.csv.
+
+    Parameters
+    ----------
+    rows : int
+        Count of vehicles.
+    seed : int
+        Seed of the random generator.
+    start : int
+        Index of the first vehicle.
+
+    Returns
+    -------
+    df : pd.DataFrame
+        The vehicles data.
+    """
+    rng = np.random.default_rng(seed)
+    gruppe = rng.choice(GRUPPEN, rows)
+    label_ids = rng.choice(np.array(LABEL_IDS + [""] * len(LABEL_IDS), dtype=object), rows)
+
+    return pd.DataFrame({
+        "gruppe": gruppe,
+        "kurzname": _get_kurznamen(start, start + rows),
+        "langtext": np.char.add("Fahrzeug der Gruppe ", gruppe.astype(str)),
+        "info": np.where(rng.random(rows) < 0.5, "Dieses Fahrzeug wurde für den Gerüstbau angeschafft.\nKlasse C", ""),
+        "lagerort": rng.choice(LAGERORTE, rows),
+        "labelIds": np.where(label_ids == "", None, label_ids)
+    })
+
+
+def write_local_data_csv(path: str, rows: int, seed: int = 0, chunk_rows: int = 1_000_000) -> None:
+    """
+    Writes generated local vehicles data to semicolon separated CSV file, chunk by chunk.
+
+    Parameters
+    ----------
+    path : str
+        Path of the CSV file.
+    rows : int
+        Count of vehicles.
+    seed : int
+        Seed of the random generator.
+    chunk_rows : int
+        Count of vehicles generated at once.
+
+    Returns
+    -------
+    None
+    """
+    for chunk_start in range(0, max(rows, 1), chunk_rows):
+        chunk_rows_count = min(chunk_rows, rows - chunk_start)
+        df = generate_local_data(chunk_rows_count, seed + chunk_start, chunk_start)
+        df.to_csv(path, sep=";", index=False, header=chunk_start == 0, mode="w" if chunk_start == 0 else "a")
+
+
+def generate_api_records(rows: int, seed: int = 0, start: int = 0, offset: int | None = None) -> List[dict]:
+    """
+    Generates vehicles records as returned by /vehicles/select/active.
+
+    A tenth of the records have no "hu" date and the keys are shifted by
+    a tenth of the fleet by default, so that both sources have keys the
+    other one doesn't.
+
+    Parameters
+    ----------
+    rows : int
+        Count of vehicles.
+    seed : int
+        Seed of the random generator.
+    start : int
+        Index of the first vehicle.
+    offset : int | None
+        Shift of the keys relative to the local vehicles data, a tenth of the rows if None.
+
+    Returns
+    -------
+    records : List[dict]
+        The vehicles records.
+    """
+    rng = np.random.default_rng(seed + 1)
+    offset = rows // 10 if offset is None else offset
+    days = rng.integers(0, 3 * 365, rows)
+    hu = pd.Timestamp("2020-01-01") + pd.to_timedelta(days, unit="D")
+    hu = np.where(rng.random(rows) < 0.5, hu.strftime("%Y-%m-%d"), hu.strftime("%Y/%m/%d"))
+    hu = np.where(rng.random(rows) < 0.1, None, hu)
+    label_ids = rng.choice(LABEL_IDS, (rows, 2))
+
+    df = pd.DataFrame({
+        "rnr": np.arange(start, start + rows),
+        "kurzname": _get_kurznamen(start + offset, start + offset + rows),
+        "hu": hu,
+        "gruppe": rng.choice(GRUPPEN, rows),
+        "labelIds": np.char.add(np.char.add(label_ids[:, 0], ","), label_ids[:, 1]),
+        "gb1": rng.integers(0, 100, rows),
+        "vondat": "2021-01-01"
+    })
+
+    return df.to_dict("records")
+
+
+def generate_api_payload(rows: int, seed: int = 0, chunk_rows: int = 10_000) -> Iterator[bytes]:
+    """
+    Generates the JSON body of /vehicles/select/active chunk by chunk,
+    so that only the records of one chunk are held in memory.
+
+    Parameters
+    ----------
+    rows : int
+        Count of vehicles.
+    seed : int
+        Seed of the random generator.
+    chunk_rows : int
+        Count of vehicles generated at once.
+
+    Returns
+    -------
+    payload : Iterator[bytes]
+        The consecutive chunks of the JSON array of the vehicles records.
+    """
+    yield b"["
+    for chunk_start in range(0, rows, chunk_rows):
+        chunk_rows_count = min(chunk_rows, rows - chunk_start)
+        records = generate_api_records(chunk_rows_count, seed + chunk_start, chunk_start, rows // 10)
+        separator = b"," if chunk_start else b""
+        yield separator + json.dumps(records, default=int)[1:-1].encode()
+    yield b"]"
+
+
+def generate_fleet(rows: int, seed: int = 0) -> Tuple[pd.DataFrame, List[dict]]:
+    """
+    Generates local vehicles data and the matching API records.
+
+    Parameters
+    ----------
+    rows : int
+        Count of vehicles in every source.
+    seed : int
+        Seed of the random generator.
+
+    Returns
+    -------
+    fleet : Tuple[pd.DataFrame, List[dict]]
+        The local vehicles data and the API records.
+    """
+    return generate_local_data(rows, seed), generate_api_records(rows, seed)
@@ -0,0 +1,250 @@
+import argparse
+import json
+import logging
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+from io import BytesIO
+from typing import Callable, Dict, List
+
+import openpyxl
+import pandas as pd
+
+from benchmarks.fake_api import LABELS_PATH, LOGIN_PATH, VEHICLES_PATH, create_fake_api
+from benchmarks.fleet_generator import generate_api_records, write_local_data_csv
+from data_processing_job import OUTER_MERGE, TODAY, DataProcessingJob
+from logger import setup_logging
+from utils.csv_utils import read_csv_in_parallel
+from utils.data_utils import *
+from utils.request_utils import AccessTokenProvider
+from utils.shard_utils import read_csv_shards
+from utils.xlsx_utils import XlsxStreamWriter, write_styled_dataframe_to_stream
+
+KEYS = ["kurzname", "hu", "labelIds", "lagerort", "gb1"]
+RESULTS_DIR = "benchmarks/results"
+
+
+def create_job(
+        api_url: str,
+        csv_path: str,
+        work_dir: str,
+        partition: str | None = None,
+        xlsx_engine: str = "native"
+) -> DataProcessingJob:
+    """
+    Creates job reading the generated CSV file and calling the fake API.
+    """
+    class BenchmarkJob(DataProcessingJob):
+        _LOCAL_DATA_PATH = csv_path
+        _OUTPUT_DATA_PATH = os.path.join(work_dir, "vehicles")
+        _ACCESS_TOKEN_PROVIDER = AccessTokenProvider(f"{api_url}{LOGIN_PATH}", {}, {})
+        _RESOURCE_REQUEST_URL = f"{api_url}{VEHICLES_PATH}"
+        _COLOR_REQUEST_URL = f"{api_url}{LABELS_PATH}"
+        _LABEL_COLOR_CACHE_PATH = os.path.join(work_dir, "label_colors.json")
+        _SNAPSHOT_PATH = os.path.join(work_dir, "snapshot.pkl")
+        _SHARD_CACHE_DIRECTORY = os.path.join(work_dir, "shards")
+        # The resource is downloaded on every run
+        _HTTP_CACHE = None
+
+    return BenchmarkJob(list(KEYS), True, partition=partition, xlsx_engine=xlsx_engine)
+
+
+def measure(function: Callable[[], object], repeat: int, setup: Callable[[], None] = None) -> List[float]:
+    """
+    Measures wall time of function calls in seconds.
+    """
+    times = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start_time = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start_time)
+
+    return times
+
+
+def run_benchmarks(rows: int, repeat: int, latency: float, stages: List[str] | None) -> List[Dict]:
+    """
+    Runs the benchmarks of every stage on generated fleet.
+
+    Parameters
+    ----------
+    rows : int
+        Count of vehicles in every source.
+    repeat : int
+        Count of measurements of every stage.
+    latency : float
+        Seconds the fake API waits before every response.
+    stages : List[str] | None
+        Names of the stages to run, all stages if None.
+
+    Returns
+    -------
+    results : List[Dict]
+        Measurements of every stage.
+    """
+    results = []
+
+    with tempfile.TemporaryDirectory() as work_dir, create_fake_api(rows, latency) as server:
+        csv_path = os.path.join(work_dir, "vehicles.csv")
+        write_local_data_csv(csv_path, rows)
+        job = create_job(server.url, csv_path, work_dir)
+        sheets_job = create_job(server.url, csv_path, work_dir, "sheets")
+        files_job = create_job(server.url, csv_path, work_dir, "files")
+        openpyxl_job = create_job(server.url, csv_path, work_dir, xlsx_engine="openpyxl")
+
+        local_df, request_df = job._extract()
+        records = generate_api_records(rows)
+        merged_df = coalesce_merge_dataframes(local_df, request_df, OUTER_MERGE, job._KURZNAME_COLUMN)
+        filtered_df = filter_rows_with_null_values_from_df(merged_df, job._HU_COLUMN)
+        sorted_df = sort_dataframe(filtered_df, job._GRUPPE_COLUMN, True).reset_index(drop=True)
+        clean_df = drop_mismatch_columns(sorted_df, job.columns)
+        label_ids = clean_df[job._LABEL_IDS_COLUMN]
+        color_codes = resolve_label_color_codes(label_ids, job._COLOR_REQUEST_URL, {})
+        fill_color_codes = get_background_color_codes(sorted_df[job._HU_COLUMN], TODAY)
+        font_color_codes = get_font_color_codes(label_ids, color_codes)
+        result = job._transform((local_df, request_df))
+
+        def clear_label_color_cache():
+            if os.path.exists(job._LABEL_COLOR_CACHE_PATH):
+                os.remove(job._LABEL_COLOR_CACHE_PATH)
+
+        def clear_shard_cache():
+            shutil.rmtree(job._SHARD_CACHE_DIRECTORY, ignore_errors=True)
+
+        def write_worksheet():
+            write_styled_dataframe_to_worksheet(clean_df, openpyxl.Workbook().active, fill_color_codes, font_color_codes)
+
+        def write_stream():
+            with XlsxStreamWriter(BytesIO()) as writer:
+                write_styled_dataframe_to_stream(clean_df, writer, fill_color_codes, font_color_codes)
+
+        benchmarks = {
+            "extract": (job._extract, clear_shard_cache),
+            "read_csv_in_parallel": (lambda: read_csv_in_parallel(csv_path, sep=";"), None),
+            "read_csv_shards_cached": (
+                lambda: read_csv_shards([csv_path], ";", job.required_columns, job._SHARD_CACHE_DIRECTORY), None
+            ),
+            "records_to_dataframe": (lambda: records_to_dataframe(records), None),
+            "coalesce_merge_dataframes": (
+                lambda: coalesce_merge_dataframes(local_df, request_df, OUTER_MERGE, job._KURZNAME_COLUMN), None
+            ),
+            "filter_rows_with_null_values_from_df": (
+                lambda: filter_rows_with_null_values_from_df(merged_df, job._HU_COLUMN), None
+            ),
+            "sort_dataframe": (lambda: sort_dataframe(filtered_df, job._GRUPPE_COLUMN, True), None),
+            "drop_mismatch_columns": (lambda: drop_mismatch_columns(sorted_df, job.columns), None),
+            "get_background_color_codes": (lambda: get_background_color_codes(sorted_df[job._HU_COLUMN], TODAY), None),
+            "resolve_label_color_codes": (
+                lambda: resolve_label_color_codes(label_ids, job._COLOR_REQUEST_URL, {}), None
+            ),
+            "get_font_color_codes": (lambda: get_font_color_codes(label_ids, color_codes), None),
+            "write_styled_dataframe_to_worksheet": (write_worksheet, None),
+            "write_styled_dataframe_to_stream": (write_stream, None),
+            "transform": (lambda: job._transform((local_df, request_df)), clear_label_color_cache),
+            "load": (lambda: job._load(result), None),
+            "load_openpyxl": (lambda: openpyxl_job._load(result), None),
+            "load_partitioned_sheets": (lambda: sheets_job._load(result), None),
+            "load_partitioned_files": (lambda: files_job._load(result), None)
+        }
+
+        for stage, (function, setup) in benchmarks.items():
+            if stages is not None and stage not in stages:
+                continue
+
+            times = measure(function, repeat, setup)
+            results.append({
+                "rows": rows,
+                "stage": stage,
+                "times": times,
+                "best": min(times),
+                "median": statistics.median(times)
+            })
+            print(f"{rows:>10} rows  {stage:<40} best {min(times):.4f}s  median {statistics.median(times):.4f}s")
+
+    return results
+
+
+def find_regressions(results: List[Dict], baseline: List[Dict], tolerance: float) -> List[str]:
+    """
+    Compares the best times with the baseline ones.
+
+    Parameters
+    ----------
+    results : List[Dict]
+        Measurements of the current run.
+    baseline : List[Dict]
+        Measurements of the baseline run.
+    tolerance : float
+        Allowed relative slowdown.
+
+    Returns
+    -------
+    regressions : List[str]
+        Description of every stage slower than allowed.
+    """
+    baseline_times = {(result["rows"], result["stage"]): result["best"] for result in baseline}
+
+    regressions = []
+    for result in results:
+        baseline_time = baseline_times.get((result["rows"], result["stage"]))
+        if baseline_time is not None and result["best"] > baseline_time * (1 + tolerance):
+            regressions.append(
+                f"{result['stage']} with {result['rows']} rows: {result['best']:.4f}s, baseline {baseline_time:.4f}s"
+            )
+
+    return regressions
+
+
+def main():
+    # Only warnings, the logs of every stage would mix with the measurements
+    setup_logging(logging.WARNING, logs_dir=None)
+
+    parser = argparse.ArgumentParser(description="Benchmark the job stages on generated fleets against a fake API")
+    parser.add_argument("-s", "--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("-r", "--repeat", type=int, default=3)
+    parser.add_argument("-l", "--latency", type=float, default=0.0, help="Fake API latency in seconds")
+    parser.add_argument("--stages", type=str, nargs="+", help="Stages to run, all by default")
+    parser.add_argument("-o", "--output", type=str, help="Results JSON file, in benchmarks/results by default")
+    parser.add_argument("-b", "--baseline", type=str, help="Results JSON file to compare with")
+    parser.add_argument("-t", "--tolerance", type=float, default=0.2, help="Allowed relative slowdown")
+    args = parser.parse_args()
+
+    results = []
+    for rows in args.sizes:
+        results.extend(run_benchmarks(rows, args.repeat, args.latency, args.stages))
+
+    output_path = args.output or os.path.join(RESULTS_DIR, f"{datetime.now().isoformat()}.json".replace(":", "."))
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+    with open(output_path, "w") as file:
+        json.dump({
+            "meta": {
+                "created": datetime.now().isoformat(),
+                "python": platform.python_version(),
+                "pandas": pd.__version__,
+                "openpyxl": openpyxl.__version__,
+                "cpus": os.cpu_count(),
+                "latency": args.latency,
+                "repeat": args.repeat
+            },
+            "results": results
+        }, file, indent=2)
+    print(f"Results saved to {output_path}")
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            regressions = find_regressions(results, json.load(file)["results"], args.tolerance)
+        for regression in regressions:
+            print(f"Regression: {regression}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
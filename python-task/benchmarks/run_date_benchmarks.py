@@ -0,0 +1,63 @@
+import argparse
+import logging
+import statistics
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.run_benchmarks import measure
+from logger import setup_logging
+from utils.common_utils import get_color_code_by_number, get_color_codes_by_numbers
+from utils.datetime_utils import *
+
+
+def generate_dates(count: int, seed: int = 0) -> pd.Series:
+    """
+    Generates "hu" dates as strings with mixed separators, a tenth of them Null.
+    """
+    rng = np.random.default_rng(seed)
+    dates = pd.Timestamp("2015-01-01") + pd.to_timedelta(rng.integers(0, 365 * 10, count), unit="D")
+    dates = np.where(rng.random(count) < 0.5, dates.strftime("%Y-%m-%d"), dates.strftime("%Y/%m/%d"))
+
+    return pd.Series(np.where(rng.random(count) < 0.1, None, dates))
+
+
+def get_color_codes_by_scalars(dates: pd.Series, today: datetime) -> list:
+    """
+    Gets the color code of every date value by value.
+    """
+    return [
+        get_color_code_by_number(get_months_diff_between_dates(string_to_date(date), today)) if date else None
+        for date in dates
+    ]
+
+
+def get_color_codes_by_arrays(dates: pd.Series, today: datetime) -> pd.Series:
+    """
+    Gets the color code of every date on the whole array.
+    """
+    return get_color_codes_by_numbers(get_months_diff_between_date_arrays(strings_to_dates(dates), today))
+
+
+def main():
+    # Only warnings, the logs of every stage would mix with the measurements
+    setup_logging(logging.WARNING, logs_dir=None)
+
+    parser = argparse.ArgumentParser(description="Benchmark the scalar and the vectorized date coloring")
+    parser.add_argument("-c", "--count", type=int, default=1_000_000, help="Count of dates")
+    parser.add_argument("-r", "--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    dates = generate_dates(args.count)
+    today = datetime.now()
+    if get_color_codes_by_scalars(dates, today) != get_color_codes_by_arrays(dates, today).tolist():
+        raise AssertionError("The scalar and the vectorized color codes differ.")
+
+    for name, function in [("scalar", get_color_codes_by_scalars), ("vectorized", get_color_codes_by_arrays)]:
+        times = measure(lambda: function(dates, today), args.repeat)
+        print(f"{args.count:>10} dates  {name:<12} best {min(times):.4f}s  median {statistics.median(times):.4f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+import argparse
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+from typing import Dict, List, Tuple
+
+from benchmarks.run_benchmarks import RESULTS_DIR, find_regressions
+from logger import setup_logging
+
+COMMANDS = {
+    "help": ["main.py", "--help"],
+    "dry_run": ["main.py", "--keys", "kurzname", "hu", "--dry-run"]
+}
+
+
+def parse_import_times(stderr: str) -> List[Tuple[str, int]]:
+    """
+    Parses the cumulative import time of every top-level import from the -X importtime output.
+
+    Parameters
+    ----------
+    stderr : str
+        Standard error of the process run with -X importtime.
+
+    Returns
+    -------
+    import_times : List[Tuple[str, int]]
+        Name and cumulative import time in microseconds of every top-level import, the slowest first.
+    """
+    import_times = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+
+        _, cumulative, name = line[len("import time:"):].split("|")
+        # Nested imports are indented, only the top-level ones are kept
+        if cumulative.strip().isdigit() and not name.startswith("  "):
+            import_times.append((name.strip(), int(cumulative)))
+
+    return sorted(import_times, key=lambda import_time: import_time[1], reverse=True)
+
+
+def run_startup_benchmark(name: str, arguments: List[str], repeat: int) -> Dict:
+    """
+    Measures cold start of the command in new interpreter processes.
+
+    Parameters
+    ----------
+    name : str
+        Name of the command.
+    arguments : List[str]
+        Arguments of the Python interpreter.
+    repeat : int
+        Count of measurements.
+
+    Returns
+    -------
+    result : Dict
+        Wall times and import times of the slowest top-level imports of the last run.
+    """
+    times = []
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        process = subprocess.run([sys.executable, "-X", "importtime", *arguments], capture_output=True, text=True)
+        times.append(time.perf_counter() - start_time)
+        if process.returncode != 0:
+            raise RuntimeError(f"Command {name} failed: {process.stderr[-1000:]}")
+
+    import_times = parse_import_times(process.stderr)
+    print(f"{name:<10} best {min(times):.4f}s  median {statistics.median(times):.4f}s")
+    for module, microseconds in import_times[:5]:
+        print(f"    {module:<40} {microseconds / 1000:.1f}ms")
+
+    return {
+        "rows": 0,
+        "stage": f"startup_{name}",
+        "times": times,
+        "best": min(times),
+        "median": statistics.median(times),
+        "imports": dict(import_times[:20])
+    }
+
+
+def main():
+    setup_logging(logging.WARNING, logs_dir=None)
+
+    parser = argparse.ArgumentParser(description="Benchmark the cold start of main.py with --help and a dry run")
+    parser.add_argument("-r", "--repeat", type=int, default=5)
+    parser.add_argument("-o", "--output", type=str, help="Results JSON file, in benchmarks/results by default")
+    parser.add_argument("-b", "--baseline", type=str, help="Results JSON file to compare with")
+    parser.add_argument("-t", "--tolerance", type=float, default=0.2, help="Allowed relative slowdown")
+    args = parser.parse_args()
+
+    results = [run_startup_benchmark(name, arguments, args.repeat) for name, arguments in COMMANDS.items()]
+
+    output_path = args.output or os.path.join(
+        RESULTS_DIR, f"startup_{datetime.now().isoformat()}.json".replace(":", ".")
+    )
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+    with open(output_path, "w") as file:
+        json.dump({
+            "meta": {
+                "created": datetime.now().isoformat(),
+                "python": platform.python_version(),
+                "repeat": args.repeat
+            },
+            "results": results
+        }, file, indent=2)
+    print(f"Results saved to {output_path}")
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            regressions = find_regressions(results, json.load(file)["results"], args.tolerance)
+        for regression in regressions:
+            print(f"Regression: {regression}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
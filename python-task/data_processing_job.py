@@ -1,15 +1,22 @@
+import tempfile
 from datetime import datetime
+from itertools import chain, islice
 from logger import logger
-from typing import List
+from typing import Dict, List
 
 import pandas as pd
-import openpyxl
 
+from utils.cache_utils import LabelColorCache
 from utils.data_utils import *
-from utils.request_utils import get_access_token
+from utils.dtype_utils import align_dtypes, get_memory_report, optimize_dtypes
+from utils.metrics_utils import MetricsRecorder, record_metadata, recording
+from utils.request_utils import AccessTokenProvider, HttpCache, stream_request_resource
+from utils.shard_utils import get_shard_paths, read_csv_shards
+from utils.sink_utils import PARTITION_MODES, get_sink, split_into_partitions
+from utils.snapshot_utils import get_changed_keys, get_rows_hashes, isin_keys, load_snapshot, save_snapshot
+from utils.spill_utils import get_rows_per_budget, merge_and_sort_out_of_core
 
 OUTER_MERGE = "outer"
-SUFFIX = "_drop"
 TODAY = datetime.now()
 
 
@@ -20,9 +27,16 @@ class DataProcessingJob:
     _KURZNAME_COLUMN = "kurzname"
     _LABEL_IDS_COLUMN = "labelIds"
 
+    # CSV file, directory of CSV shards or glob pattern of CSV shards
     _LOCAL_DATA_PATH = "resources/vehicles.csv"
+    # Manifest and parsed DataFrames of the shards, the unchanged shards are not parsed again
+    _SHARD_CACHE_DIRECTORY = "cache/shards"
+    # Count of processes parsing the shards, the count of CPUs if None
+    _SHARD_MAX_WORKERS = None
 
-    _OUTPUT_DATA_PATH = f"output_data/vehicles_{TODAY.isoformat()}.xlsx".replace(":", ".")
+    # The extension of the output format is appended to the path
+    _OUTPUT_DATA_PATH = f"output_data/vehicles_{TODAY.isoformat()}".replace(":", ".")
+    _METRICS_PATH = f"metrics/vehicles_{TODAY.isoformat()}.json".replace(":", ".")
 
     _TOKEN_REQUEST_ULR = "https://api.baubuddy.de/index.php/login"
     _TOKEN_REQUEST_PAYLOAD = {
@@ -34,19 +48,78 @@ class DataProcessingJob:
         "Content-Type": "application/json"
     }
 
-    _ACCESS_TOKEN = get_access_token(_TOKEN_REQUEST_ULR, _TOKEN_REQUEST_PAYLOAD, _TOKEN_REQUEST_HEADERS)
+    _ACCESS_TOKEN_CACHE_PATH = "cache/access_token.json"
+    _ACCESS_TOKEN_PROVIDER = AccessTokenProvider(
+        _TOKEN_REQUEST_ULR,
+        _TOKEN_REQUEST_PAYLOAD,
+        _TOKEN_REQUEST_HEADERS,
+        cache_path=_ACCESS_TOKEN_CACHE_PATH
+    )
 
     _RESOURCE_REQUEST_URL = "https://api.baubuddy.de/dev/index.php/v1/vehicles/select/active"
-    _RESOURCE_REQUEST_HEADERS = {
-        "Authorization": f"Bearer {_ACCESS_TOKEN}",
-        "Content-Type": "application/json"
-    }
+    _RESOURCE_BATCH_SIZE = 10000
+    # Resource bodies revalidated with ETag and Last-Modified, not downloaded again if unchanged
+    _HTTP_CACHE_DIRECTORY = "cache/http"
+    _HTTP_CACHE_MAX_SIZE = 512 * 1024 * 1024
+    _HTTP_CACHE = HttpCache(_HTTP_CACHE_DIRECTORY, _HTTP_CACHE_MAX_SIZE)
 
     _COLOR_REQUEST_URL = "https://api.baubuddy.de/dev/index.php/v1/labels/"
 
-    def __init__(self, columns: List[str], add_background_color: bool):
+    # Every label color is requested on every run if None
+    _LABEL_COLOR_CACHE_PATH = "cache/label_colors.json"
+    _LABEL_COLOR_CACHE_TTL = 7 * 24 * 60 * 60
+    # Labels without color code are requested again sooner, in case the color is added
+    _LABEL_COLOR_CACHE_NEGATIVE_TTL = 60 * 60
+    _LABEL_COLOR_CACHE_MAX_SIZE = 1024
+    _LABEL_REQUEST_MAX_WORKERS = 8
+
+    _SNAPSHOT_PATH = "cache/snapshot.pkl"
+    # Count of processes writing the partitions, the count of CPUs if None
+    _PARTITION_MAX_WORKERS = None
+
+    # Directory of the files spilled when running within memory budget, the temporary directory if None
+    _SPILL_DIRECTORY = None
+    # Count of rows read to estimate the rows of a chunk within memory budget
+    _SPILL_SAMPLE_ROWS = 1000
+
+    def __init__(
+            self,
+            columns: List[str],
+            add_background_color: bool,
+            incremental: bool = False,
+            trace_memory: bool = False,
+            output_format: str = "xlsx",
+            partition: str | None = None,
+            today: datetime | None = None,
+            memory_budget: int | None = None,
+            xlsx_engine: str = "openpyxl",
+            local_data_path: str | None = None
+    ):
         self.columns = columns
         self.to_color_rows = add_background_color
+        self.incremental = incremental
+        self.trace_memory = trace_memory
+        self.sink = get_sink(output_format, xlsx_engine)
+        self.partition = partition
+        # The date the rows are colored relative to
+        self.today = today or TODAY
+        # Bytes of rows held in memory at once, the rows are merged and sorted on disk if given
+        self.memory_budget = memory_budget
+        # CSV file, directory of CSV shards or glob pattern of CSV shards, _LOCAL_DATA_PATH if None
+        self.local_data_path = local_data_path or self._LOCAL_DATA_PATH
+
+    @property
+    def memory_budget(self):
+        return self._memory_budget
+
+    @memory_budget.setter
+    def memory_budget(self, value):
+        if value is not None:
+            if value <= 0:
+                raise ValueError(f"Memory budget must be positive, got {value}.")
+            if self.incremental or self.partition is not None:
+                raise ValueError("Memory budget can't be combined with incremental or partitioned runs.")
+        self._memory_budget = value
 
     @property
     def columns(self):
@@ -60,77 +133,339 @@ class DataProcessingJob:
 
         self._columns = value
 
+    @property
+    def partition(self):
+        return self._partition
+
+    @partition.setter
+    def partition(self, value):
+        if value is not None and value not in PARTITION_MODES:
+            raise ValueError(f"Unsupported partition mode {value}, expected one of {', '.join(PARTITION_MODES)}.")
+        if value == "sheets" and not self.sink.supports_sheets:
+            raise ValueError(f"Output format {self.sink.extension} doesn't support sheets.")
+        self._partition = value
+
+    @property
+    def required_columns(self) -> List[str] | None:
+        # The columns in the input and the ones the transformations depend on,
+        # subclasses return None to extract all columns of the local and resource data
+        return list(dict.fromkeys(self.columns + [self._KURZNAME_COLUMN, self._HU_COLUMN, self._GRUPPE_COLUMN]))
+
+    def _get_resource_request_headers(self) -> Dict[str, str]:
+        return {
+            "Authorization": f"Bearer {self._ACCESS_TOKEN_PROVIDER.get_token()}",
+            "Content-Type": "application/json"
+        }
+
+    def disable_api_caches(self) -> None:
+        """
+        Makes the job request the access token, the resource and every label color from the API on every run,
+        instead of reusing them from the caches on disk, so that the whole API traffic is recorded or replayed.
+
+        Returns
+        -------
+        None
+        """
+        token_provider = self._ACCESS_TOKEN_PROVIDER
+        self._ACCESS_TOKEN_PROVIDER = AccessTokenProvider(
+            token_provider.url,
+            token_provider.json,
+            token_provider.headers,
+            token_provider.client
+        )
+        self._HTTP_CACHE = None
+        self._LABEL_COLOR_CACHE_PATH = None
+
     def run(self):
         logger.info("Running job...")
 
-        data = self._extract()
-        result_wb = self._transform(data)
-        self._load(result_wb)
+        recorder = MetricsRecorder(self.trace_memory)
+        recorder.metadata.update({
+            "started": datetime.now().isoformat(),
+            "columns": self.columns,
+            "colored": self.to_color_rows,
+            "incremental": self.incremental
+        })
+
+        with recording(recorder), recorder.stage("run"):
+            if self.memory_budget is not None:
+                self._run_within_memory_budget(recorder)
+                recorder.save(self._METRICS_PATH)
+                return
+
+            with recorder.stage("extract") as metrics:
+                data = self._extract()
+                metrics.rows_out = sum(len(df.index) for df in data)
+
+            with recorder.stage("transform") as metrics:
+                metrics.rows_in = sum(len(df.index) for df in data)
+                result = self._transform(data)
+                metrics.rows_out = len(result[0].index) if result is not None else 0
+
+            if result is not None:
+                with recorder.stage("load") as metrics:
+                    metrics.rows_in = len(result[0].index)
+                    self._load(result)
+
+        recorder.save(self._METRICS_PATH)
+
+    def _run_within_memory_budget(self, recorder):
+        with tempfile.TemporaryDirectory(dir=self._SPILL_DIRECTORY) as spill_directory:
+            # The chunks are read while they are spilled to disk in the transform stage
+            with recorder.stage("extract"):
+                data = self._extract_chunks()
+
+            with recorder.stage("transform"):
+                blocks = self._transform_within_memory_budget(data, spill_directory)
+
+            with recorder.stage("load") as metrics:
+                metrics.rows_out = self._load_blocks(blocks)
 
     def _extract(self):
         logger.info("Extracting data...")
 
-        # Read local data into DataFrame
-        local_data_df = pd.read_csv(self._LOCAL_DATA_PATH, sep=";")
-        # Download resource data
-        resource_data = get_request_resource_as_json(self._RESOURCE_REQUEST_URL, self._RESOURCE_REQUEST_HEADERS)
-        # Create DataFrame from the resource data
-        request_data_df = pd.DataFrame(resource_data)
+        # All columns are extracted if no required columns are given
+        required_columns = frozenset(self.required_columns) if self.required_columns is not None else None
+        # Read the required local data columns of all shards into DataFrame
+        local_data_df = read_csv_shards(
+            get_shard_paths(self.local_data_path),
+            ";",
+            required_columns,
+            self._SHARD_CACHE_DIRECTORY,
+            self._SHARD_MAX_WORKERS
+        )
+        # Download resource data and create DataFrame from the required fields of its records while they are streamed
+        resource_records = self._stream_resource_records()
+        request_data_df = records_to_dataframe(resource_records, self._RESOURCE_BATCH_SIZE, required_columns)
+        self._record_http_cache_stats()
+
+        # Merge and sort the data in its memory-compact representation
+        local_data_df = self._compact(local_data_df, "local_data")
+        request_data_df = self._compact(request_data_df, "request_data")
+        # The dtypes are chosen per DataFrame, the shared columns are merged in one dtype
+        local_data_df, request_data_df = align_dtypes(local_data_df, request_data_df)
 
         logger.info("Data extracted successfully!")
 
         return local_data_df, request_data_df
 
-    def _transform(self, data):
-        logger.info("Transforming data...")
+    def _compact(self, df: pd.DataFrame, name: str) -> pd.DataFrame:
+        # "hu" is kept as the text it was read from, its dates are only parsed to color the rows
+        compact_df = optimize_dtypes(df)
+
+        memory_report = get_memory_report(df, compact_df)
+        logger.info(f"Memory usage of {name} columns:\n{memory_report.to_string()}")
+        record_metadata(f"{name}_memory", memory_report.to_dict(orient="index"))
+
+        return compact_df
+
+    def _extract_chunks(self):
+        logger.info(f"Extracting data in chunks within {self.memory_budget} bytes...")
+
+        # All columns are extracted if no required columns are given
+        required_columns = frozenset(self.required_columns) if self.required_columns is not None else None
+        usecols = required_columns.__contains__ if required_columns is not None else None
+        shard_paths = get_shard_paths(self.local_data_path)
+        # Read the local data shard by shard in chunks of as many rows as fit the budget
+        sample_df = pd.read_csv(shard_paths[0], sep=";", usecols=usecols, nrows=self._SPILL_SAMPLE_ROWS)
+        chunk_rows = get_rows_per_budget(sample_df, self.memory_budget)
+        local_data_chunks = chain.from_iterable(
+            pd.read_csv(shard_path, sep=";", usecols=usecols, chunksize=chunk_rows)
+            for shard_path in shard_paths
+        )
+        resource_records = self._stream_resource_records()
+        request_data_chunks = self._iter_record_chunks(resource_records, required_columns)
+
+        return local_data_chunks, request_data_chunks
+
+    def _stream_resource_records(self):
+        def request():
+            records = stream_request_resource(
+                self._RESOURCE_REQUEST_URL, self._get_resource_request_headers(), cache=self._HTTP_CACHE
+            )
+            # The request is sent when the first record is read, so a rejected access token is retried here.
+            # The label colors are requested later with the token this request checked
+            return chain(list(islice(records, 1)), records)
+
+        return self._ACCESS_TOKEN_PROVIDER.retry_unauthorized(request)
 
+    def _record_http_cache_stats(self):
+        if self._HTTP_CACHE is None:
+            return
+
+        http_cache = self._HTTP_CACHE
+        logger.info(
+            f"HTTP cache - {http_cache.hits} hits, {http_cache.misses} misses, hit ratio {http_cache.hit_ratio:.2f}."
+        )
+        record_metadata("http_cache", {
+            "hits": http_cache.hits,
+            "misses": http_cache.misses,
+            "hit_ratio": http_cache.hit_ratio,
+            "size": http_cache.size
+        })
+
+    def _iter_record_chunks(self, records, columns):
+        records = iter(records)
+        chunk_rows = self._SPILL_SAMPLE_ROWS
+        while True:
+            chunk = records_to_dataframe(islice(records, chunk_rows), self._RESOURCE_BATCH_SIZE, columns)
+            if len(chunk.index) == 0:
+                self._record_http_cache_stats()
+                return
+
+            yield chunk
+            # The first chunk is the sample of the rows that fit the budget
+            chunk_rows = get_rows_per_budget(chunk, self.memory_budget)
+
+    def _clean(self, data):
         local_data_df, request_data_df = data
-        # Get the common columns from both DataFrames
-        common_columns = get_common_columns_from_dfs(request_data_df, local_data_df)
-        # Remove the merge column from the common columns list
-        common_columns.remove(self._KURZNAME_COLUMN)
-        # Merge both DataFrames
-        merged_df = merge_dataframes(local_data_df, request_data_df, OUTER_MERGE, self._KURZNAME_COLUMN, ("", SUFFIX))
+        # Merge both DataFrames, filling Null values of the common columns from the resource data
+        merged_df = coalesce_merge_dataframes(local_data_df, request_data_df, OUTER_MERGE, self._KURZNAME_COLUMN)
         # Filter rows where "hu" column is Null
-        filtered_df = filter_rows_with_null_values_from_df(merged_df, self._HU_COLUMN)
-        # Replace Null values from the duplicate column
-        clean_df = replace_null_values_in_df(filtered_df, common_columns, SUFFIX)
-        # Drop the duplicate columns
-        clean_df = drop_suffix_columns_from_df(clean_df, common_columns, SUFFIX)
+        clean_df = filter_rows_with_null_values_from_df(merged_df, self._HU_COLUMN)
         # Sort DataFrame by "gruppe" column
         sorted_df = sort_dataframe(clean_df, self._GRUPPE_COLUMN, True)
         sorted_df = sorted_df.reset_index(drop=True)
+
+        return sorted_df
+
+    def _clean_incrementally(self, data):
+        local_data_df, request_data_df = data
+        snapshot = load_snapshot(self._SNAPSHOT_PATH)
+        hashes = get_rows_hashes([local_data_df, request_data_df], self._KURZNAME_COLUMN)
+        render_key = (self.columns, self.to_color_rows, self.sink.extension, self.partition, self.today.date())
+
+        if snapshot is None or snapshot["required_columns"] != self.required_columns:
+            logger.info("No snapshot of the required columns, cleaning all rows.")
+            sorted_df = self._clean(data)
+        else:
+            changed_keys = get_changed_keys(snapshot["hashes"], hashes)
+            deleted_keys = snapshot["hashes"].index.difference(hashes.index)
+            logger.info(f"Found {len(changed_keys)} new or changed and {len(deleted_keys)} deleted rows.")
+
+            if changed_keys.empty and deleted_keys.empty and snapshot["render_key"] == render_key:
+                return None
+
+            # Clean only the new and changed rows and reuse the rest from the snapshot
+            delta_df = self._clean((
+                local_data_df[isin_keys(local_data_df[self._KURZNAME_COLUMN], changed_keys)],
+                request_data_df[isin_keys(request_data_df[self._KURZNAME_COLUMN], changed_keys)]
+            ))
+            previous_df = snapshot["clean_df"]
+            kept_df = previous_df[~isin_keys(previous_df[self._KURZNAME_COLUMN], changed_keys.union(deleted_keys))]
+            sorted_df = sort_dataframe(pd.concat([kept_df, delta_df]), self._GRUPPE_COLUMN, True)
+            sorted_df = sorted_df.reset_index(drop=True)
+
+        save_snapshot(self._SNAPSHOT_PATH, {
+            "required_columns": self.required_columns,
+            "hashes": hashes,
+            "clean_df": sorted_df,
+            "render_key": render_key
+        })
+
+        return sorted_df
+
+    def _transform(self, data):
+        logger.info("Transforming data...")
+
+        sorted_df = self._clean_incrementally(data) if self.incremental else self._clean(data)
+        if sorted_df is None:
+            logger.info("No changes since the last run, skipping the transformations.")
+            return None
+
+        result = self._render(sorted_df)
+
+        logger.info("Data transformations ended!")
+
+        return result
+
+    def _transform_within_memory_budget(self, data, spill_directory):
+        logger.info("Transforming data on disk...")
+
+        local_data_chunks, request_data_chunks = data
+        # Merge, filter and sort the data partition by partition, streaming the sorted rows in blocks
+        blocks = merge_and_sort_out_of_core(
+            local_data_chunks,
+            request_data_chunks,
+            OUTER_MERGE,
+            self._KURZNAME_COLUMN,
+            self._HU_COLUMN,
+            self._GRUPPE_COLUMN,
+            self.memory_budget,
+            spill_directory
+        )
+
+        logger.info("Data transformations ended, rendering while saving!")
+
+        return (self._render(block) for block in blocks)
+
+    def _get_label_color_codes(self, label_ids: pd.Series) -> Dict[str, str | None]:
+        label_color_cache = None
+        if self._LABEL_COLOR_CACHE_PATH is not None:
+            label_color_cache = LabelColorCache(
+                self._LABEL_COLOR_CACHE_PATH,
+                self._LABEL_COLOR_CACHE_TTL,
+                self._LABEL_COLOR_CACHE_MAX_SIZE,
+                self._LABEL_COLOR_CACHE_NEGATIVE_TTL
+            )
+        color_codes = resolve_label_color_codes(
+            label_ids,
+            self._COLOR_REQUEST_URL,
+            self._get_resource_request_headers(),
+            label_color_cache,
+            self._LABEL_REQUEST_MAX_WORKERS
+        )
+        if label_color_cache is not None:
+            label_color_cache.save()
+
+        return color_codes
+
+    def _render(self, sorted_df, hu_dates=None, label_color_codes=None):
         # Drop columns from the DataFrame that are not in the input
         clean_df = drop_mismatch_columns(sorted_df, self.columns)
 
-        # Create workbook
-        wb = openpyxl.Workbook()
-        ws = wb.active
-        # Write the data from pandas Dataframe to openpyxl workbook
-        write_data_from_pandas_dataframe_to_worksheet(clean_df, ws)
-
-        # Tint the cell's text in workbook if "labelIds" is given in the input
-        if self._LABEL_IDS_COLUMN in self.columns:
-            add_font_color_to_worksheet_cells(
-                clean_df[self._LABEL_IDS_COLUMN],
-                ws,
-                self._COLOR_REQUEST_URL,
-                self._RESOURCE_REQUEST_HEADERS
-            )
+        # Colors are only resolved for output formats that support styling
+        font_color_codes = None
+        fill_color_codes = None
+        if self.sink.supports_styling:
+            # Tint every row's text by its labels if "labelIds" is given in the input
+            if self._LABEL_IDS_COLUMN in self.columns:
+                # Label color codes resolved once can be shared by the reports rendered from the same rows
+                if label_color_codes is None:
+                    label_color_codes = self._get_label_color_codes(clean_df[self._LABEL_IDS_COLUMN])
+                font_color_codes = get_font_color_codes(clean_df[self._LABEL_IDS_COLUMN], label_color_codes)
 
-        # Color rows by date in workbook if add_background_color is True
-        if self.to_color_rows:
-            add_background_color_to_worksheet_cells(ws, self._HU_COLUMN, TODAY)
+            # Color rows by date if add_background_color is True and "hu" is in the output
+            if self.to_color_rows and self._HU_COLUMN in self.columns:
+                # Reuse the "hu" dates if they are already parsed
+                dates = hu_dates if hu_dates is not None else sorted_df[self._HU_COLUMN]
+                fill_color_codes = get_background_color_codes(dates, self.today)
 
-        logger.info("Data transformations ended!")
+        return clean_df, fill_color_codes, font_color_codes
+
+    def _load(self, result):
+        logger.info("Saving data...")
+
+        clean_df, fill_color_codes, font_color_codes = result
+        output_path = f"{self._OUTPUT_DATA_PATH}.{self.sink.extension}"
+        if self.partition is None:
+            # Save the data after the transformations in the output format
+            self.sink.write(clean_df, output_path, fill_color_codes, font_color_codes)
+        else:
+            # Save every "gruppe" to its own sheet or file, in parallel
+            partitions = split_into_partitions(clean_df, self._GRUPPE_COLUMN, fill_color_codes, font_color_codes)
+            if self.partition == "sheets":
+                self.sink.write_partitioned_sheets(partitions, output_path, self._PARTITION_MAX_WORKERS)
+            else:
+                self.sink.write_partitioned_files(partitions, self._OUTPUT_DATA_PATH, self._PARTITION_MAX_WORKERS)
 
-        return wb
+        logger.info("Data saved successfully!")
 
-    def _load(self, result_wb):
+    def _load_blocks(self, blocks):
         logger.info("Saving data...")
 
-        # Save the data after the transformations as xlsx file
-        result_wb.save(self._OUTPUT_DATA_PATH)
-        result_wb.close()
+        rows_count = self.sink.write_blocks(blocks, f"{self._OUTPUT_DATA_PATH}.{self.sink.extension}")
 
         logger.info("Data saved successfully!")
+
+        return rows_count
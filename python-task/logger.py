@@ -1,20 +1,153 @@
+from __future__ import annotations
+
+import atexit
 import logging
+import os
+import threading
+import time
 from datetime import date
+from typing import Callable, Dict, Tuple
 
-logging.basicConfig(level=logging.INFO)
-
+# Nothing is written until the entry point calls setup_logging
 logger = logging.getLogger(__name__)
 
-today = date.today()
-file_name = f"{today}.log"
-logs_dir = "log_files/"
+LOGS_DIR = "log_files"
+LOG_FORMAT = "%(asctime)s: %(levelname)s - %(message)s"
+
+_listener = None
+_queue_handler = None
+_listener_lock = threading.Lock()
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Lets through at most limit records logged from the same line every interval seconds,
+    so that messages repeated in hot loops don't flood the logs.
+
+    The count of the dropped records is added to the first record let through in the next interval.
+
+    Parameters
+    ----------
+    limit: int
+        Maximum count of records from the same line in an interval.
+    interval: float
+        Length of the interval in seconds.
+    clock: Callable[[], float]
+        Function returning the current time in seconds.
+    """
+
+    def __init__(self, limit: int = 50, interval: float = 60, clock: Callable[[], float] = time.monotonic):
+        super().__init__()
+        self.limit = limit
+        self.interval = interval
+        self._clock = clock
+        self._lock = threading.Lock()
+        # Start, count of records let through and count of records dropped in the interval of every line
+        self._intervals: Dict[Tuple[str, int], Tuple[float, int, int]] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        key = (record.pathname, record.lineno)
+        now = self._clock()
+
+        with self._lock:
+            start, passed, dropped = self._intervals.get(key, (now, 0, 0))
+            if now - start >= self.interval:
+                if dropped:
+                    record.msg = f"{record.msg} ({dropped} similar messages suppressed)"
+                start, passed, dropped = now, 0, 0
+
+            if passed >= self.limit:
+                self._intervals[key] = (start, passed, dropped + 1)
+                return False
+
+            self._intervals[key] = (start, passed + 1, dropped)
+
+        return True
+
+
+def setup_logging(
+        level: int = logging.INFO,
+        logs_dir: str | None = LOGS_DIR,
+        console: bool = True,
+        rate_limit: RateLimitFilter | None = None
+) -> logging.handlers.QueueListener:
+    """
+    Sets up logging for the entry point.
+
+    Records are rate limited and put on a queue by the logging thread,
+    and formatted and written by a background listener thread,
+    so writing the logs never blocks the pipeline.
+
+    Parameters
+    ----------
+    level: int
+        Minimum level of the logged records.
+    logs_dir: str | None
+        Directory of the daily log files, no log file if None.
+    console: bool
+        Whether to write the logs to stderr too.
+    rate_limit: RateLimitFilter | None
+        Filter limiting the records repeated from the same line, RateLimitFilter() if None.
+
+    Returns
+    -------
+    listener: logging.handlers.QueueListener
+        The listener writing the logs, stopped at exit.
+    """
+    # Imported here, logger is imported by the entry points before their arguments are parsed
+    import logging.handlers
+    import queue
+
+    global _listener, _queue_handler
+
+    with _listener_lock:
+        if _listener is not None:
+            return _listener
+
+        formatter = logging.Formatter(LOG_FORMAT)
+        handlers = []
+        if console:
+            handlers.append(logging.StreamHandler())
+        if logs_dir is not None:
+            os.makedirs(logs_dir, exist_ok=True)
+            handlers.append(logging.FileHandler(os.path.join(logs_dir, f"{date.today()}.log")))
+        for handler in handlers:
+            handler.setFormatter(formatter)
+
+        log_queue = queue.SimpleQueue()
+        _queue_handler = logging.handlers.QueueHandler(log_queue)
+        _queue_handler.addFilter(rate_limit or RateLimitFilter())
+
+        root_logger = logging.getLogger()
+        root_logger.addHandler(_queue_handler)
+        root_logger.setLevel(level)
+
+        _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+        _listener.start()
+        atexit.register(stop_logging)
+
+    logger.info("Logger initialized successfully!")
+
+    return _listener
+
 
-file_handler = logging.FileHandler(f"{logs_dir}{file_name}")
-file_handler.setLevel(logging.INFO)
+def stop_logging() -> None:
+    """
+    Writes the queued records and stops the listener.
 
-formatter = logging.Formatter("%(asctime)s: %(levelname)s - %(message)s")
-file_handler.setFormatter(formatter)
+    Returns
+    -------
+    None
+    """
+    global _listener, _queue_handler
 
-logger.addHandler(file_handler)
+    with _listener_lock:
+        if _listener is None:
+            return
 
-logger.info("Logger initialized successfully!")
+        logging.getLogger().removeHandler(_queue_handler)
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+        _queue_handler = None
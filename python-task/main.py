@@ -1,14 +1,90 @@
 import argparse
-from distutils import util
+import cProfile
+import os
 
-from data_processing_job import DataProcessingJob
+from logger import logger, setup_logging
+from utils.common_utils import OUTPUT_FORMATS, PARTITION_MODES, XLSX_ENGINES, string_to_bool
 
+# Only light modules are imported before the arguments are parsed and validated, the job is imported after
 parser = argparse.ArgumentParser(description="Enter columns to include and whether to add background color on rows")
 
 parser.add_argument("-k", "--keys", type=str, nargs="+", required=True)
-parser.add_argument("-c", "--colored", type=lambda x: bool(util.strtobool(x)), default=True)
+parser.add_argument("-c", "--colored", type=string_to_bool, default=True)
+parser.add_argument("-i", "--incremental", action="store_true", help="Process only the rows changed since last run")
+parser.add_argument("-f", "--format", type=str, choices=OUTPUT_FORMATS, default="xlsx", help="Format of the output file")
+parser.add_argument(
+    "-p", "--partition", type=str, choices=PARTITION_MODES, help="Write every gruppe to its own sheet or file in parallel"
+)
+parser.add_argument(
+    "--xlsx-engine", type=str, choices=XLSX_ENGINES, default="openpyxl", help="Engine writing the xlsx output"
+)
+parser.add_argument(
+    "-l", "--local-data", type=str, metavar="PATH", help="CSV file, directory of CSV shards or glob of CSV shards"
+)
+parser.add_argument(
+    "--memory-budget", type=int, metavar="MIB", help="Merge and sort on disk holding at most this many MiB of rows"
+)
+api_traffic_group = parser.add_mutually_exclusive_group()
+api_traffic_group.add_argument(
+    "--record", type=str, metavar="PATH", help="Record the responses of the API to a fixture bundle"
+)
+api_traffic_group.add_argument(
+    "--replay", type=str, metavar="PATH", help="Serve the responses of the API from a recorded fixture bundle"
+)
+parser.add_argument("--trace-memory", action="store_true", help="Trace the peak memory of every stage")
+parser.add_argument("--profile", type=str, metavar="PATH", help="Dump cProfile stats of the whole job to the file")
+parser.add_argument("--dry-run", action="store_true", help="Create the job without running it")
 args = parser.parse_args()
 
+if args.partition == "sheets" and args.format != "xlsx":
+    parser.error(f"Output format {args.format} doesn't support sheets.")
+if args.memory_budget is not None and (args.memory_budget <= 0 or args.incremental or args.partition):
+    parser.error("Memory budget must be positive and can't be combined with incremental or partitioned runs.")
+if args.replay is not None and not os.path.isfile(args.replay):
+    parser.error(f"Recorded fixture bundle {args.replay} doesn't exist.")
+
 if __name__ == "__main__":
-    job = DataProcessingJob(args.keys, args.colored)
-    job.run()
+    setup_logging()
+
+    from data_processing_job import DataProcessingJob
+
+    memory_budget = args.memory_budget * 1024 * 1024 if args.memory_budget is not None else None
+    try:
+        job = DataProcessingJob(
+            args.keys,
+            args.colored,
+            args.incremental,
+            args.trace_memory,
+            args.format,
+            args.partition,
+            memory_budget=memory_budget,
+            xlsx_engine=args.xlsx_engine,
+            local_data_path=args.local_data
+        )
+    except ImportError as error:
+        # The optional dependencies of the output format are missing
+        parser.error(str(error))
+
+    recording = None
+    if args.record is not None or args.replay is not None:
+        from utils.recording_utils import ApiRecording, RecordingHttpClient, ReplayHttpClient
+        from utils.request_utils import set_http_client
+
+        job.disable_api_caches()
+        if args.record is not None:
+            recording = ApiRecording()
+            set_http_client(RecordingHttpClient(recording))
+        else:
+            set_http_client(ReplayHttpClient(ApiRecording.load(args.replay)))
+
+    if args.dry_run:
+        logger.info("Dry run, the job is not run.")
+    elif args.profile:
+        profiler = cProfile.Profile()
+        profiler.runcall(job.run)
+        profiler.dump_stats(args.profile)
+    else:
+        job.run()
+
+    if recording is not None and not args.dry_run:
+        recording.save(args.record)
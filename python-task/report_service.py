@@ -0,0 +1,246 @@
+import json
+import threading
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import BytesIO
+from logger import logger
+from typing import Dict, List, Tuple
+from urllib.parse import parse_qs, urlparse
+
+from data_processing_job import DataProcessingJob
+from utils.cache_utils import LabelColorCache
+from utils.common_utils import string_to_bool
+from utils.data_utils import parse_dates, resolve_label_color_codes
+from utils.sink_utils import OutputSink
+
+
+class ReportService(DataProcessingJob):
+    """
+    Renders reports for arbitrary keys in memory from warm dataset.
+
+    The access token, the HTTP connection pool, the label colors and
+    the cleaned DataFrame with all columns are kept between the reports,
+    the dataset is refreshed every refresh_interval seconds.
+    """
+    _REFRESH_INTERVAL = 15 * 60
+
+    def __init__(self, refresh_interval: float | None = None):
+        super().__init__([], True)
+        self.refresh_interval = refresh_interval or self._REFRESH_INTERVAL
+        self.refreshed_at = None
+        self._dataset = None
+        self._label_color_cache = LabelColorCache(
+            self._LABEL_COLOR_CACHE_PATH,
+            self._LABEL_COLOR_CACHE_TTL,
+            self._LABEL_COLOR_CACHE_MAX_SIZE,
+            self._LABEL_COLOR_CACHE_NEGATIVE_TTL
+        )
+        self._stop_event = threading.Event()
+        self._refresh_thread = None
+
+    @property
+    def required_columns(self):
+        # The reports can include any column
+        return None
+
+    def _get_label_color_codes(self, label_ids):
+        color_codes = resolve_label_color_codes(
+            label_ids,
+            self._COLOR_REQUEST_URL,
+            self._get_resource_request_headers(),
+            self._label_color_cache,
+            self._LABEL_REQUEST_MAX_WORKERS
+        )
+        self._label_color_cache.save()
+
+        return color_codes
+
+    def refresh(self) -> None:
+        """
+        Extracts and cleans the data and replaces the dataset the reports are rendered from.
+
+        Returns
+        -------
+        None
+        """
+        logger.info("Refreshing dataset...")
+
+        sorted_df = self._clean(self._extract())
+        hu_dates = parse_dates(sorted_df[self._HU_COLUMN])
+        label_color_codes = None
+        if self._LABEL_IDS_COLUMN in sorted_df.columns:
+            label_color_codes = self._get_label_color_codes(sorted_df[self._LABEL_IDS_COLUMN])
+
+        # Reports being rendered keep the previous dataset
+        self._dataset = (sorted_df, hu_dates, label_color_codes)
+        self.refreshed_at = datetime.now()
+
+        logger.info(f"Dataset refreshed with {len(sorted_df.index)} rows.")
+
+    def start(self) -> None:
+        """
+        Loads the dataset and starts refreshing it in the background.
+
+        Returns
+        -------
+        None
+        """
+        self.refresh()
+        self._stop_event.clear()
+        self._refresh_thread = threading.Thread(target=self._refresh_periodically, daemon=True)
+        self._refresh_thread.start()
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        if self._refresh_thread is not None:
+            self._refresh_thread.join()
+            self._refresh_thread = None
+
+    def _refresh_periodically(self):
+        while not self._stop_event.wait(self.refresh_interval):
+            try:
+                self.refresh()
+            except Exception:
+                # Keep serving the previous dataset until the next refresh
+                logger.exception("Couldn't refresh dataset.")
+
+    def render_report(
+            self,
+            keys: List[str],
+            colored: bool = True,
+            output_format: str = "xlsx",
+            today: datetime | None = None
+    ) -> Tuple[bytes, OutputSink]:
+        """
+        Renders report from the dataset in memory.
+
+        Parameters
+        ----------
+        keys : List[str]
+            Columns to include in the report.
+        colored : bool
+            Whether to color the rows by "hu" date.
+        output_format : str
+            Format of the report.
+        today : datetime | None
+            The date the rows are colored relative to, now if None.
+
+        Returns
+        -------
+        report : Tuple[bytes, OutputSink]
+            Content of the report and the sink that wrote it.
+
+        Raises
+        ------
+        RuntimeError
+            If the dataset is not loaded yet.
+        ValueError
+            If a key is not a column of the dataset or the format is not supported.
+        """
+        dataset = self._dataset
+        if dataset is None:
+            raise RuntimeError("The dataset is not loaded yet.")
+
+        sorted_df, hu_dates, label_color_codes = dataset
+        unknown_keys = [key for key in keys if key not in sorted_df.columns]
+        if unknown_keys:
+            raise ValueError(f"Unknown keys {', '.join(unknown_keys)}.")
+
+        report = DataProcessingJob(list(keys), colored, output_format=output_format, today=today or datetime.now())
+        clean_df, fill_color_codes, font_color_codes = report._render(sorted_df, hu_dates, label_color_codes)
+
+        buffer = BytesIO()
+        report.sink.write(clean_df, buffer, fill_color_codes, font_color_codes)
+
+        return buffer.getvalue(), report.sink
+
+
+def _parse_report_query(query: Dict[str, List[str]]) -> dict:
+    keys = [key for value in query.get("keys", []) for key in value.split(",") if key]
+    if not keys:
+        raise ValueError("No keys given.")
+
+    as_of = query.get("as_of", [None])[0]
+
+    return {
+        "keys": keys,
+        "colored": string_to_bool(query.get("colored", ["true"])[0]),
+        "output_format": query.get("format", ["xlsx"])[0],
+        "today": datetime.fromisoformat(as_of) if as_of else None
+    }
+
+
+def create_report_server(service: ReportService, host: str = "127.0.0.1", port: int = 8000) -> ThreadingHTTPServer:
+    """
+    Creates HTTP server rendering the reports of the service.
+
+    GET /report takes comma separated or repeated "keys" and optionally "colored",
+    "format" and "as_of" as YYYY-MM-DD, GET /health reports the dataset state.
+
+    Parameters
+    ----------
+    service : ReportService
+        Service to render the reports with.
+    host : str
+        Host to listen on.
+    port : int
+        Port to listen on, any free port if 0.
+
+    Returns
+    -------
+    server : ThreadingHTTPServer
+        The server, serving once serve_forever is called.
+    """
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            url = urlparse(self.path)
+            if url.path == "/health":
+                self._send_json(200, {
+                    "loaded": service.refreshed_at is not None,
+                    "refreshed_at": service.refreshed_at.isoformat() if service.refreshed_at else None
+                })
+            elif url.path == "/report":
+                self._send_report(parse_qs(url.query))
+            else:
+                self._send_json(404, {"error": "Not found"})
+
+        def log_message(self, format, *args):
+            logger.info(f"{self.address_string()} {format % args}")
+
+        def _send_report(self, query):
+            try:
+                content, sink = service.render_report(**_parse_report_query(query))
+            except (ValueError, ImportError) as error:
+                self._send_json(400, {"error": str(error)})
+                return
+            except RuntimeError as error:
+                self._send_json(503, {"error": str(error)})
+                return
+            except Exception:
+                logger.exception("Couldn't render report.")
+                self._send_json(500, {"error": "Couldn't render report."})
+                return
+
+            file_name = f"vehicles_{datetime.now().isoformat()}.{sink.extension}".replace(":", ".")
+            self._send(200, content, sink.content_type, {"Content-Disposition": f'attachment; filename="{file_name}"'})
+
+        def _send_json(self, status, body):
+            self._send(status, json.dumps(body).encode(), "application/json")
+
+        def _send(self, status, content, content_type, headers=None):
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.send_header("Content-Length", str(len(content)))
+            self.end_headers()
+            try:
+                self.wfile.write(content)
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+
+    return server
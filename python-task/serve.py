@@ -0,0 +1,26 @@
+import argparse
+
+from logger import setup_logging
+
+parser = argparse.ArgumentParser(description="Serve reports for arbitrary keys from warm in-memory dataset")
+
+parser.add_argument("--host", type=str, default="127.0.0.1")
+parser.add_argument("--port", type=int, default=8000)
+parser.add_argument("--refresh-interval", type=float, help="Seconds between dataset refreshes, 15 minutes by default")
+args = parser.parse_args()
+
+if __name__ == "__main__":
+    setup_logging()
+
+    from report_service import ReportService, create_report_server
+
+    service = ReportService(args.refresh_interval)
+    service.start()
+    server = create_report_server(service, args.host, args.port)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.stop()
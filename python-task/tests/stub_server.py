@@ -0,0 +1,106 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Iterator, List
+
+
+class StubServer:
+    """
+    Local HTTP server returning canned JSON responses by request path.
+
+    A route is either a (status, body) or (status, body, headers) tuple,
+    or a callable taking the request handler and returning such a tuple.
+    A body given as iterator of bytes is streamed chunk by chunk until the
+    connection is closed, without Content-Length.
+    Every handled request is recorded as a (method, path) tuple in
+    `requests`.
+    """
+
+    def __init__(self, routes: Dict[str, Any] = None, delay: float = 0):
+        self.routes = routes or {}
+        self.delay = delay
+        self.requests: List[tuple] = []
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._create_handler())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, args=(0.05,), daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address
+        return f"http://{host}:{port}"
+
+    def requests_to(self, path: str) -> List[tuple]:
+        return [request for request in self.requests if request[1] == path]
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *args):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _create_handler(self) -> type:
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                self._respond()
+
+            def do_POST(self):
+                self._respond()
+
+            def log_message(self, *args):
+                pass
+
+            def _respond(self):
+                with stub._lock:
+                    stub.requests.append((self.command, self.path))
+
+                if stub.delay:
+                    time.sleep(stub.delay)
+
+                route = stub.routes.get(self.path, (404, {"error": "Not found"}))
+                status, body, *headers = route(self) if callable(route) else route
+                headers = headers[0] if headers else {}
+                if body is None:
+                    self.send_response(status)
+                    for name, value in headers.items():
+                        self.send_header(name, value)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+
+                if isinstance(body, Iterator):
+                    self._stream(status, body, headers)
+                    return
+
+                payload = body if isinstance(body, bytes) else json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                try:
+                    self.wfile.write(payload)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+
+            def _stream(self, status, chunks, headers):
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header("Connection", "close")
+                self.end_headers()
+                self.close_connection = True
+                try:
+                    for chunk in chunks:
+                        self.wfile.write(chunk)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+
+        return Handler
@@ -0,0 +1,75 @@
+import json
+import os
+import tempfile
+from unittest import TestCase
+
+import openpyxl
+import pandas as pd
+
+from batch_processing_job import BatchProcessingJob, load_report_specs
+
+
+class BatchProcessingJobTests(TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.local_df = pd.DataFrame({
+            "kurzname": ["A", "B"],
+            "gruppe": ["PKW", "LKW"]
+        })
+        self.request_df = pd.DataFrame({
+            "kurzname": ["A", "B"],
+            "rnr": [1, 2],
+            "hu": ["2022-11-15", "2022-01-01"]
+        })
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def _write_specs(self, specs) -> str:
+        path = os.path.join(self.temp_dir.name, "specs.json")
+        with open(path, "w") as file:
+            json.dump(specs, file)
+        return path
+
+    def test_load_report_specs__when_optional_fields_are_missing__expect_defaults(self):
+        # Arrange
+        path = self._write_specs([{"keys": ["kurzname"]}])
+        expected_specs = [{"keys": ["kurzname"], "colored": True, "as_of": None, "format": "xlsx", "name": "report_1"}]
+
+        # Act
+        actual_specs = load_report_specs(path)
+
+        # Assert
+        self.assertListEqual(expected_specs, actual_specs)
+
+    def test_load_report_specs__when_spec_has_no_keys__expect_value_error(self):
+        # Arrange
+        path = self._write_specs([{"keys": ["kurzname"]}, {"colored": False}])
+
+        # Act & Assert
+        with self.assertRaises(ValueError):
+            load_report_specs(path)
+
+    def test_run__when_reports_have_different_as_of_dates__expect_report_per_spec_from_shared_rows(self):
+        # Arrange
+        class TestBatchProcessingJob(BatchProcessingJob):
+            _OUTPUT_DATA_PATH = os.path.join(self.temp_dir.name, "vehicles")
+
+        specs = load_report_specs(self._write_specs([
+            {"name": "early", "keys": ["kurzname", "hu"], "as_of": "2022-02-01"},
+            {"name": "late", "keys": ["kurzname", "hu"], "as_of": "2022-12-20"},
+            {"name": "plain", "keys": ["kurzname"], "colored": False, "format": "csv"}
+        ]))
+        job = TestBatchProcessingJob(specs)
+
+        # Act
+        job._load(job._transform((self.local_df, self.request_df)))
+        early_ws = openpyxl.load_workbook(os.path.join(self.temp_dir.name, "vehicles_early.xlsx")).active
+        late_ws = openpyxl.load_workbook(os.path.join(self.temp_dir.name, "vehicles_late.xlsx")).active
+        plain_df = pd.read_csv(os.path.join(self.temp_dir.name, "vehicles_plain.csv"), sep=";")
+
+        # Assert
+        self.assertEqual("00007500", early_ws.cell(row=2, column=1).fill.fgColor.rgb)
+        self.assertEqual("00FFA500", late_ws.cell(row=2, column=1).fill.fgColor.rgb)
+        self.assertListEqual(["kurzname", "gruppe", "rnr"], plain_df.columns.tolist())
+        self.assertListEqual(["B", "A"], plain_df["kurzname"].tolist())
@@ -0,0 +1,183 @@
+import os
+import tempfile
+import time
+from unittest import TestCase
+
+import pandas as pd
+
+from tests.stub_server import StubServer
+from utils.cache_utils import LabelColorCache
+from utils.data_utils import resolve_label_color_codes
+from utils.request_utils import HttpClient, set_http_client
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class CacheUtilsTests(TestCase):
+    _TTL = 60
+    _RED_COLOR_CODE = "#FF0000"
+    _BLUE_COLOR_CODE = "#0000FF"
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.cache_path = os.path.join(self.temp_dir.name, "cache", "label_colors.json")
+        self.clock = FakeClock()
+        self.routes = {
+            "/labels/1": (200, [{"id": 1, "colorCode": self._RED_COLOR_CODE}]),
+            "/labels/2": (200, []),
+            "/labels/3": (200, [{"id": 3, "colorCode": self._BLUE_COLOR_CODE}]),
+        }
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def _create_cache(self, max_size: int = 10) -> LabelColorCache:
+        return LabelColorCache(self.cache_path, self._TTL, max_size, clock=self.clock)
+
+    def test_get__when_id_is_not_cached__expect_miss(self):
+        # Arrange
+        cache = self._create_cache()
+
+        # Act
+        actual_result = cache.get(1)
+
+        # Assert
+        self.assertEqual((False, None), actual_result)
+        self.assertEqual(0, cache.hits)
+        self.assertEqual(1, cache.misses)
+
+    def test_get__when_id_is_cached__expect_hit_with_color_code(self):
+        # Arrange
+        cache = self._create_cache()
+        cache.set(1, self._RED_COLOR_CODE)
+
+        # Act
+        actual_result = cache.get(1)
+
+        # Assert
+        self.assertEqual((True, self._RED_COLOR_CODE), actual_result)
+        self.assertEqual(1, cache.hits)
+
+    def test_get__when_entry_is_expired__expect_miss(self):
+        # Arrange
+        cache = self._create_cache()
+        cache.set(1, self._RED_COLOR_CODE)
+
+        # Act
+        self.clock.now += self._TTL
+        actual_result = cache.get(1)
+
+        # Assert
+        self.assertEqual((False, None), actual_result)
+        self.assertEqual(0, len(cache))
+
+    def test_set__when_max_size_is_exceeded__expect_least_recently_used_to_be_evicted(self):
+        # Arrange
+        cache = self._create_cache(max_size=2)
+        cache.set(1, self._RED_COLOR_CODE)
+        cache.set(2, None)
+
+        # Act
+        cache.get(1)
+        cache.set(3, self._BLUE_COLOR_CODE)
+
+        # Assert
+        self.assertEqual((True, self._RED_COLOR_CODE), cache.get(1))
+        self.assertEqual((False, None), cache.get(2))
+        self.assertEqual((True, self._BLUE_COLOR_CODE), cache.get(3))
+
+    def test_save__when_cache_is_reloaded__expect_same_entries(self):
+        # Arrange
+        cache = self._create_cache()
+        cache.set(1, self._RED_COLOR_CODE)
+        cache.set(2, None)
+
+        # Act
+        cache.save()
+        reloaded_cache = self._create_cache()
+
+        # Assert
+        self.assertEqual((True, self._RED_COLOR_CODE), reloaded_cache.get(1))
+        self.assertEqual((True, None), reloaded_cache.get(2))
+
+    def test_resolve_label_color_codes__when_run_twice_with_persisted_cache__expect_no_requests_on_second_run(self):
+        # Arrange
+        expected_color_codes = {"2": None, "1": self._RED_COLOR_CODE}
+        label_ids = pd.Series(["2", "1,2"])
+
+        with StubServer(self.routes) as server:
+            # Act
+            first_cache = self._create_cache()
+            first_result = resolve_label_color_codes(label_ids, f"{server.url}/labels/", {}, first_cache)
+            first_cache.save()
+            first_requests_count = len(server.requests)
+
+            second_cache = self._create_cache()
+            second_result = resolve_label_color_codes(label_ids, f"{server.url}/labels/", {}, second_cache)
+
+        # Assert
+        self.assertDictEqual(expected_color_codes, first_result)
+        self.assertDictEqual(expected_color_codes, second_result)
+        self.assertEqual(2, first_requests_count)
+        self.assertEqual(2, len(server.requests))
+        self.assertEqual(2, second_cache.hits)
+        self.assertEqual(0, second_cache.misses)
+
+    def test_resolve_label_color_codes__when_request_fails__expect_only_successful_results_cached(self):
+        # Arrange
+        self.routes["/labels/4"] = (403, {"error": "Forbidden"})
+        label_ids = pd.Series(["2,4", "1"])
+        cache = self._create_cache()
+
+        with StubServer(self.routes) as server:
+            # Act
+            actual_result = resolve_label_color_codes(label_ids, f"{server.url}/labels/", {}, cache)
+
+        # Assert
+        self.assertDictEqual({"2": None, "4": None, "1": self._RED_COLOR_CODE}, actual_result)
+        self.assertEqual((True, None), cache.get("2"))
+        self.assertEqual((False, None), cache.get("4"))
+
+    def test_resolve_label_color_codes__when_responses_are_malformed__expect_failures_not_cached(self):
+        # Arrange
+        self.routes["/labels/4"] = (200, {"id": 4, "colorCode": self._BLUE_COLOR_CODE})
+        self.routes["/labels/5"] = (200, b"<html>Maintenance</html>")
+        label_ids = pd.Series(["2,4", "5,1"])
+        cache = self._create_cache()
+
+        with StubServer(self.routes) as server:
+            # Act
+            actual_result = resolve_label_color_codes(label_ids, f"{server.url}/labels/", {}, cache)
+
+        # Assert
+        self.assertDictEqual({"2": None, "4": None, "5": None, "1": self._RED_COLOR_CODE}, actual_result)
+        self.assertEqual((True, None), cache.get("2"))
+        self.assertEqual((False, None), cache.get("4"))
+        self.assertEqual((False, None), cache.get("5"))
+
+    def test_resolve_label_color_codes__when_requests_time_out_or_cannot_connect__expect_failures_not_cached(self):
+        # Arrange
+        set_http_client(HttpClient(timeout=0.1, max_retries=0))
+        self.addCleanup(set_http_client, None)
+        self.routes["/labels/4"] = lambda handler: (time.sleep(0.5), (200, []))[1]
+        label_ids = pd.Series(["4", "1"])
+        cache = self._create_cache()
+        with StubServer() as closed_server:
+            closed_url = f"{closed_server.url}/labels/"
+
+        with StubServer(self.routes) as server:
+            # Act
+            timed_out_result = resolve_label_color_codes(label_ids, f"{server.url}/labels/", {}, cache)
+            unreachable_result = resolve_label_color_codes(pd.Series(["3"]), closed_url, {}, cache)
+
+        # Assert
+        self.assertDictEqual({"4": None, "1": self._RED_COLOR_CODE}, timed_out_result)
+        self.assertDictEqual({"3": None}, unreachable_result)
+        self.assertEqual((False, None), cache.get("4"))
+        self.assertEqual((False, None), cache.get("3"))
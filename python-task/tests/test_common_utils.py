@@ -1,6 +1,9 @@
 from unittest import TestCase
 
-from utils.common_utils import get_color_code_by_number
+import numpy as np
+import pandas as pd
+
+from utils.common_utils import get_color_code_by_number, get_color_codes_by_numbers
 
 
 class CommonUtilsTests(TestCase):
@@ -57,3 +60,14 @@ class CommonUtilsTests(TestCase):
 
         # Assert
         self.assertEqual(expected_result, actual_result)
+
+    def test_get_color_codes_by_numbers__when_numbers_are_in_diff_ranges__expect_same_codes_as_by_number(self):
+        # Arrange
+        numbers = pd.Series([-2, 3, 4, 12, 13, np.nan])
+        expected_result = [get_color_code_by_number(number) for number in numbers.iloc[:5]] + [None]
+
+        # Act
+        actual_result = get_color_codes_by_numbers(numbers)
+
+        # Assert
+        self.assertListEqual(expected_result, actual_result.tolist())
@@ -0,0 +1,77 @@
+import os
+import tempfile
+from unittest import TestCase
+
+import pandas as pd
+
+from utils.csv_utils import *
+
+
+class CsvUtilsTests(TestCase):
+    _SEPARATOR = ";"
+    _LOCAL_DATA_PATH = "resources/vehicles.csv"
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.temp_dir.name, "vehicles.csv")
+        with open(self.path, "w", encoding="utf-8") as file:
+            file.write('gruppe;kurzname;info\n')
+            for i in range(50):
+                file.write(f'LKW;Fahrzeug {i};"Zeile {i}\nmit ""Zitat""; und Größe\n"\n')
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_find_record_boundaries__when_fields_contain_newlines__expect_chunks_of_whole_records(self):
+        # Arrange
+        with open(self.path, "rb") as file:
+            data = file.read()
+
+        # Act
+        header_end, chunks = find_record_boundaries(self.path, 100)
+        chunk_records = [data[start:end] for start, end in chunks]
+
+        # Assert
+        self.assertEqual(len("gruppe;kurzname;info\n"), header_end)
+        self.assertGreater(len(chunks), 1)
+        self.assertEqual(len(data), chunks[-1][1])
+        self.assertTrue(all(record.startswith(b"LKW;") for record in chunk_records))
+        self.assertTrue(all(record.count(b'"') % 2 == 0 for record in chunk_records))
+
+    def test_read_csv_in_parallel__when_file_is_split_in_chunks__expect_same_df_as_serial_read(self):
+        # Arrange
+        expected_df = pd.read_csv(self.path, sep=self._SEPARATOR)
+
+        # Act
+        actual_df = read_csv_in_parallel(self.path, sep=self._SEPARATOR, workers=2, chunk_size=200)
+
+        # Assert
+        pd.testing.assert_frame_equal(expected_df, actual_df)
+
+    def test_read_csv_in_parallel__when_file_is_local_vehicles_data__expect_same_df_as_serial_read(self):
+        # Arrange
+        expected_df = pd.read_csv(self._LOCAL_DATA_PATH, sep=self._SEPARATOR)
+
+        # Act
+        actual_df = read_csv_in_parallel(self._LOCAL_DATA_PATH, sep=self._SEPARATOR, workers=2, chunk_size=1024)
+
+        # Assert
+        pd.testing.assert_frame_equal(expected_df, actual_df)
+
+    def test_read_csv_in_parallel__when_usecols_is_callable__expect_only_selected_columns(self):
+        # Arrange
+        expected_columns = ["kurzname", "info"]
+        selected_columns = frozenset(["kurzname", "info", "missing"])
+
+        # Act
+        actual_df = read_csv_in_parallel(
+            self.path,
+            sep=self._SEPARATOR,
+            workers=2,
+            chunk_size=200,
+            usecols=selected_columns.__contains__
+        )
+
+        # Assert
+        self.assertListEqual(expected_columns, actual_df.columns.tolist())
+        self.assertEqual(50, len(actual_df.index))
@@ -0,0 +1,244 @@
+import os
+import tempfile
+from unittest import TestCase
+
+import pandas as pd
+
+from data_processing_job import DataProcessingJob
+from tests.stub_server import StubServer
+from utils.recording_utils import ApiRecording, ReplayHttpClient
+from utils.request_utils import AccessTokenProvider, set_http_client
+
+
+class DataProcessingJobTests(TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.local_df = pd.DataFrame({
+            "kurzname": ["A", "B", "C"],
+            "gruppe": ["PKW", "LKW", "LKW"]
+        })
+        self.request_df = pd.DataFrame({
+            "kurzname": ["A", "B", "C"],
+            "rnr": [1, 2, 3],
+            "hu": ["2022-11-15", "2022-01-01", None]
+        })
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def _create_incremental_job(self) -> DataProcessingJob:
+        job = DataProcessingJob(["kurzname", "hu"], False, incremental=True)
+        job._SNAPSHOT_PATH = os.path.join(self.temp_dir.name, "snapshot.pkl")
+        return job
+
+    def test_required_columns__when_keys_are_given__expect_keys_and_transformation_columns(self):
+        # Arrange
+        expected_columns = ["labelIds", "hu", "rnr", "gruppe", "kurzname"]
+
+        # Act
+        job = DataProcessingJob(["labelIds", "hu"], True)
+        actual_columns = job.required_columns
+
+        # Assert
+        self.assertListEqual(expected_columns, actual_columns)
+
+    def test_transform__when_incremental_and_nothing_changed__expect_no_result(self):
+        # Arrange
+        self._create_incremental_job()._transform((self.local_df, self.request_df))
+
+        # Act
+        actual_result = self._create_incremental_job()._transform((self.local_df, self.request_df))
+
+        # Assert
+        self.assertIsNone(actual_result)
+
+    def test_transform__when_incremental_and_rows_changed__expect_all_current_rows(self):
+        # Arrange
+        expected_rows = [
+            ["B", "LKW", 2, "2022-01-01"],
+            ["C", "LKW", 3, "2022-02-01"],
+            ["A", "PKW", 1, "2022-11-15"]
+        ]
+        self._create_incremental_job()._transform((self.local_df, self.request_df))
+
+        # Act
+        self.request_df.loc[2, "hu"] = "2022-02-01"
+        actual_df, _, _ = self._create_incremental_job()._transform((self.local_df, self.request_df))
+        actual_rows = actual_df[["kurzname", "gruppe", "rnr", "hu"]].values.tolist()
+
+        # Assert
+        self.assertListEqual(expected_rows, actual_rows)
+
+    def test_transform__when_incremental_and_row_without_key_changed__expect_changed_row(self):
+        # Arrange
+        self.local_df.loc[2, "kurzname"] = None
+        self.request_df.loc[2, ["kurzname", "hu"]] = [None, "2022-02-01"]
+        self._create_incremental_job()._transform((self.local_df, self.request_df))
+
+        # Act
+        self.request_df.loc[2, "hu"] = "2022-03-01"
+        actual_result = self._create_incremental_job()._transform((self.local_df, self.request_df))
+
+        # Assert
+        self.assertIsNotNone(actual_result)
+        self.assertListEqual(["2022-01-01", "2022-03-01", "2022-11-15"], actual_result[0]["hu"].tolist())
+
+    def test_load__when_output_format_is_csv__expect_csv_file_without_colors(self):
+        # Arrange
+        job = DataProcessingJob(["kurzname", "hu"], True, output_format="csv")
+        job._OUTPUT_DATA_PATH = os.path.join(self.temp_dir.name, "vehicles")
+        self.request_df.loc[2, "hu"] = "2022-02-01"
+
+        # Act
+        result = job._transform((self.local_df, self.request_df))
+        job._load(result)
+        actual_df = pd.read_csv(f"{job._OUTPUT_DATA_PATH}.csv", sep=";")
+
+        # Assert
+        self.assertIsNone(result[1])
+        self.assertIsNone(result[2])
+        self.assertListEqual(["B", "C", "A"], actual_df["kurzname"].tolist())
+
+    def test_load__when_data_is_compacted__expect_hu_text_as_it_was_read(self):
+        # Arrange
+        job = DataProcessingJob(["kurzname", "hu"], True, output_format="csv")
+        job._OUTPUT_DATA_PATH = os.path.join(self.temp_dir.name, "vehicles")
+        self.request_df["hu"] = ["2022/11/15", "2022-01-01", "2020/01/08"]
+        data = (job._compact(self.local_df, "local_data"), job._compact(self.request_df, "request_data"))
+
+        # Act
+        job._load(job._transform(data))
+        actual_df = pd.read_csv(f"{job._OUTPUT_DATA_PATH}.csv", sep=";")
+
+        # Assert
+        self.assertListEqual(["2022-01-01", "2020/01/08", "2022/11/15"], actual_df["hu"].tolist())
+
+    def test_transform__when_hu_is_not_in_keys__expect_no_background_colors(self):
+        # Arrange
+        job = DataProcessingJob(["kurzname", "rnr"], True)
+
+        # Act
+        _, fill_color_codes, _ = job._transform((self.local_df, self.request_df))
+
+        # Assert
+        self.assertIsNone(fill_color_codes)
+
+    def test_init__when_sheets_are_requested_for_csv__expect_value_error(self):
+        # Act & Assert
+        with self.assertRaises(ValueError):
+            DataProcessingJob(["kurzname"], False, output_format="csv", partition="sheets")
+
+    def test_transform_within_memory_budget__when_chunks_are_given__expect_same_rows_as_in_memory(self):
+        # Arrange
+        job = DataProcessingJob(["kurzname", "hu"], True, output_format="csv", memory_budget=1000)
+        job._OUTPUT_DATA_PATH = os.path.join(self.temp_dir.name, "vehicles")
+        data = ([self.local_df.iloc[:2], self.local_df.iloc[2:]], [self.request_df])
+
+        # Act
+        blocks = job._transform_within_memory_budget(data, self.temp_dir.name)
+        rows_count = job._load_blocks(blocks)
+        actual_df = pd.read_csv(f"{job._OUTPUT_DATA_PATH}.csv", sep=";")
+
+        # Assert
+        self.assertEqual(2, rows_count)
+        self.assertListEqual(["B", "A"], actual_df["kurzname"].tolist())
+
+    def test_init__when_memory_budget_and_incremental__expect_value_error(self):
+        # Act & Assert
+        with self.assertRaises(ValueError):
+            DataProcessingJob(["kurzname"], False, incremental=True, memory_budget=1024)
+
+    def test_disable_api_caches__when_called__expect_no_token_cache_and_no_http_cache(self):
+        # Arrange
+        job = DataProcessingJob(["kurzname"], False)
+
+        # Act
+        job.disable_api_caches()
+
+        # Assert
+        self.assertIsNone(job._ACCESS_TOKEN_PROVIDER.cache_path)
+        self.assertIsNone(job._HTTP_CACHE)
+        self.assertIsNone(job._LABEL_COLOR_CACHE_PATH)
+        self.assertIsNotNone(DataProcessingJob._HTTP_CACHE)
+
+    def test_get_label_color_codes__when_api_is_replayed__expect_label_color_cache_file_unchanged(self):
+        # Arrange
+        cache_path = os.path.join(self.temp_dir.name, "label_colors.json")
+        with open(cache_path, "w") as file:
+            file.write('[["1", "0000ff", 1000.0]]')
+        job = DataProcessingJob(["kurzname", "labelIds"], False)
+        job._LABEL_COLOR_CACHE_PATH = cache_path
+        job._COLOR_REQUEST_URL = "http://api/labels/"
+        job.disable_api_caches()
+
+        token_provider = job._ACCESS_TOKEN_PROVIDER
+        recording = ApiRecording()
+        recording.add("POST", token_provider.url, token_provider.json, (200, {}, b'{"oauth": {"access_token": "t"}}'))
+        recording.add("GET", "http://api/labels/1", None, (200, {}, b'[{"colorCode": "ff0000"}]'))
+        set_http_client(ReplayHttpClient(recording))
+        self.addCleanup(set_http_client, None)
+
+        # Act
+        actual_color_codes = job._get_label_color_codes(pd.Series(["1"]))
+
+        # Assert
+        self.assertDictEqual({"1": "ff0000"}, actual_color_codes)
+        with open(cache_path) as file:
+            self.assertEqual('[["1", "0000ff", 1000.0]]', file.read())
+
+    def test_extract__when_cached_access_token_is_revoked__expect_login_and_resource_requested_again(self):
+        # Arrange
+        csv_path = os.path.join(self.temp_dir.name, "vehicles.csv")
+        self.local_df.to_csv(csv_path, sep=";", index=False)
+        token_path = os.path.join(self.temp_dir.name, "access_token.json")
+        with open(token_path, "w") as file:
+            file.write('{"access_token": "revoked", "expires_at": 10000000000}')
+
+        def vehicles_route(handler):
+            if handler.headers["Authorization"] == "Bearer revoked":
+                return 401, {"error": "Unauthorized"}
+            return 200, self.request_df.to_dict(orient="records")
+
+        routes = {"/login": (200, {"oauth": {"access_token": "token"}}), "/vehicles": vehicles_route}
+
+        with StubServer(routes) as server:
+            class RevokedTokenJob(DataProcessingJob):
+                _SHARD_CACHE_DIRECTORY = os.path.join(self.temp_dir.name, "shards")
+                _ACCESS_TOKEN_PROVIDER = AccessTokenProvider(f"{server.url}/login", {}, {}, cache_path=token_path)
+                _RESOURCE_REQUEST_URL = f"{server.url}/vehicles"
+                _HTTP_CACHE = None
+
+            # Act
+            _, request_data_df = RevokedTokenJob(["kurzname"], False, local_data_path=csv_path)._extract()
+
+        # Assert
+        self.assertEqual(3, len(request_data_df.index))
+        self.assertEqual(1, len(server.requests_to("/login")))
+        self.assertEqual(2, len(server.requests_to("/vehicles")))
+
+    def test_extract__when_required_columns_are_none__expect_all_columns_extracted(self):
+        # Arrange
+        csv_path = os.path.join(self.temp_dir.name, "vehicles.csv")
+        self.local_df.assign(info=["x", "y", "z"]).to_csv(csv_path, sep=";", index=False)
+        routes = {
+            "/login": (200, {"oauth": {"access_token": "token"}}),
+            "/vehicles": (200, self.request_df.assign(lagerort=["L1", "L2", None]).to_dict(orient="records"))
+        }
+
+        with StubServer(routes) as server:
+            class AllColumnsJob(DataProcessingJob):
+                _SHARD_CACHE_DIRECTORY = os.path.join(self.temp_dir.name, "shards")
+                _ACCESS_TOKEN_PROVIDER = AccessTokenProvider(f"{server.url}/login", {}, {})
+                _RESOURCE_REQUEST_URL = f"{server.url}/vehicles"
+                _HTTP_CACHE = None
+
+                @property
+                def required_columns(self):
+                    return None
+
+            # Act
+            local_data_df, request_data_df = AllColumnsJob(["kurzname"], False, local_data_path=csv_path)._extract()
+
+        # Assert
+        self.assertListEqual(["kurzname", "gruppe", "info"], local_data_df.columns.tolist())
+        self.assertListEqual(["kurzname", "rnr", "hu", "lagerort"], request_data_df.columns.tolist())
@@ -1,8 +1,12 @@
+import time
+from datetime import datetime
 from unittest import TestCase
 
 import numpy as np
+import openpyxl
 import pandas as pd
 
+from tests.stub_server import StubServer
 from utils.data_utils import *
 
 
@@ -440,3 +444,272 @@ class DataUtilsTests(TestCase):
         # Assert
         self.assertListEqual(expected_first_row_values, actual_first_row_values)
         self.assertListEqual(expected_last_row_values, actual_last_row_values)
+
+    def test_get_background_color_codes__when_dates_are_in_diff_ranges__expect_color_code_per_date(self):
+        # Arrange
+        expected_color_codes = ["007500", "b30000", "FFA500", "007500"]
+        today = datetime(2022, 12, 20)
+
+        # Act
+        actual_color_codes = get_background_color_codes(self.first_df[self._DATE_COLUMN], today).tolist()
+
+        # Assert
+        self.assertListEqual(expected_color_codes, actual_color_codes)
+
+    def test_get_background_color_codes__when_dates_are_parsed__expect_same_color_codes_as_strings(self):
+        # Arrange
+        today = datetime(2022, 12, 20)
+        expected_color_codes = get_background_color_codes(self.first_df[self._DATE_COLUMN], today).tolist()
+
+        # Act
+        parsed_dates = parse_dates(self.first_df[self._DATE_COLUMN])
+        actual_color_codes = get_background_color_codes(parsed_dates, today).tolist()
+
+        # Assert
+        self.assertListEqual(expected_color_codes, actual_color_codes)
+
+    def test_write_styled_dataframe_to_worksheet__when_no_color_codes__expect_data_without_styles(self):
+        # Arrange
+        expected_rows = [
+            (self._MERGE_COLUMN, self._COLUMN_1),
+            (1, "A"),
+            (3, "C")
+        ]
+        df = filter_rows_with_null_values_from_df(self.second_df, self._COLUMN_1)
+        ws = openpyxl.Workbook().active
+
+        # Act
+        write_styled_dataframe_to_worksheet(df, ws)
+        actual_rows = list(ws.iter_rows(values_only=True))
+        has_fill = any(cell.has_style and cell.fill.fill_type for row in ws.iter_rows(min_row=2) for cell in row)
+
+        # Assert
+        self.assertListEqual(expected_rows, actual_rows)
+        self.assertFalse(has_fill)
+
+    def test_write_styled_dataframe_to_worksheet__when_color_codes__expect_styled_rows_with_shared_styles(self):
+        # Arrange
+        expected_fill_colors = ["00007500", "00b30000", "00FFA500", "00007500"]
+        expected_font_color = "00FF0000"
+        fill_color_codes = pd.Series(["007500", "b30000", "FFA500", "007500"])
+        font_color_codes = pd.Series(["#FF0000"] * 4)
+        ws = openpyxl.Workbook().active
+
+        # Act
+        write_styled_dataframe_to_worksheet(self.first_df, ws, fill_color_codes, font_color_codes)
+        data_rows = list(ws.iter_rows(min_row=2))
+        actual_fill_colors = [row[0].fill.start_color.rgb for row in data_rows]
+        actual_font_colors = {cell.font.color.rgb for row in data_rows for cell in row}
+        actual_fills_count = len(ws.parent._fills)
+
+        # Assert
+        self.assertListEqual(expected_fill_colors, actual_fill_colors)
+        self.assertSetEqual({expected_font_color}, actual_font_colors)
+        # Default fills plus the three distinct colors
+        self.assertEqual(2 + 3, actual_fills_count)
+
+    def test_parse_label_ids__when_value_is_comma_separated__expect_list_with_ids(self):
+        # Arrange
+        expected_label_ids = ["76", "77"]
+
+        # Act
+        actual_label_ids = parse_label_ids("76, 77")
+
+        # Assert
+        self.assertListEqual(expected_label_ids, actual_label_ids)
+
+    def test_parse_label_ids__when_value_is_float_read_from_csv__expect_list_with_integer_id(self):
+        # Arrange
+        expected_label_ids = ["76"]
+
+        # Act
+        actual_label_ids = parse_label_ids(76.0)
+
+        # Assert
+        self.assertListEqual(expected_label_ids, actual_label_ids)
+
+    def test_parse_label_ids__when_value_is_null__expect_empty_list(self):
+        # Arrange
+        expected_label_ids = []
+
+        # Act
+        actual_label_ids = parse_label_ids(np.nan)
+
+        # Assert
+        self.assertListEqual(expected_label_ids, actual_label_ids)
+
+    def test_resolve_label_color_codes__when_ids_repeat_across_rows__expect_every_id_requested_once_concurrently(self):
+        # Arrange
+        expected_color_codes = {"1": "#000001", "2": "#000002", "3": "#000003", "4": None}
+        routes = {f"/labels/{i}": (200, [{"colorCode": f"#00000{i}"}]) for i in range(1, 4)}
+        routes["/labels/4"] = (200, [])
+        label_ids = pd.Series(["1,2", "2", np.nan, "3,4", 1.0, "4"])
+        delay = 0.3
+
+        with StubServer(routes, delay=delay) as server:
+            # Act
+            start_time = time.perf_counter()
+            actual_color_codes = resolve_label_color_codes(label_ids, f"{server.url}/labels/", {}, max_workers=4)
+            elapsed_time = time.perf_counter() - start_time
+
+        # Assert
+        self.assertDictEqual(expected_color_codes, actual_color_codes)
+        self.assertEqual(4, len(server.requests))
+        self.assertLess(elapsed_time, 2 * delay)
+
+    def test_get_font_color_codes__when_rows_have_diff_labels__expect_first_resolved_color_per_row(self):
+        # Arrange
+        expected_font_color_codes = ["#000002", "#000002", None, None]
+        color_codes = {"1": None, "2": "#000002", "3": None}
+        label_ids = pd.Series(["1,2", "2", "3", np.nan])
+
+        # Act
+        actual_font_color_codes = get_font_color_codes(label_ids, color_codes).tolist()
+
+        # Assert
+        self.assertListEqual(expected_font_color_codes, actual_font_color_codes)
+
+    def test_records_to_dataframe__when_records_span_several_batches__expect_same_df_as_from_list(self):
+        # Arrange
+        records = [
+            {"kurzname": "A", "rnr": 1},
+            {"kurzname": "B", "rnr": 2},
+            {"kurzname": "C", "rnr": 3, "hu": "2022-11-15"},
+            {"kurzname": "D", "rnr": 4},
+            {"kurzname": "E", "rnr": 5}
+        ]
+        expected_df = pd.DataFrame(records)
+
+        # Act
+        actual_df = records_to_dataframe(iter(records), batch_size=2)
+
+        # Assert
+        self.assertListEqual(expected_df.columns.tolist(), actual_df.columns.tolist())
+        self.assertEqual(expected_df["rnr"].dtype, actual_df["rnr"].dtype)
+        self.assertListEqual(expected_df["kurzname"].tolist(), actual_df["kurzname"].tolist())
+        self.assertListEqual([False, False, True, False, False], actual_df["hu"].notnull().tolist())
+
+    def test_records_to_dataframe__when_no_records__expect_empty_df(self):
+        # Act
+        actual_df = records_to_dataframe([])
+
+        # Assert
+        self.assertTrue(actual_df.empty)
+
+    def test_records_to_dataframe__when_columns_are_given__expect_only_given_columns(self):
+        # Arrange
+        expected_columns = ["kurzname", "hu"]
+        records = [{"kurzname": "A", "rnr": 1}, {"kurzname": "B", "rnr": 2, "hu": "2022-11-15"}]
+
+        # Act
+        actual_df = records_to_dataframe(records, batch_size=1, columns={"kurzname", "hu", "missing"})
+
+        # Assert
+        self.assertListEqual(expected_columns, actual_df.columns.tolist())
+
+    def test_coalesce_merge_dataframes__when_outer_merge__expect_same_df_as_merge_replace_and_drop_chain(self):
+        # Arrange
+        expected_df = merge_dataframes(
+            self.first_df,
+            self.second_df,
+            self._OUTER_MERGE,
+            self._MERGE_COLUMN,
+            ("", self._SUFFIX)
+        )
+        expected_df = replace_null_values_in_df(expected_df, [self._COLUMN_1], self._SUFFIX)
+        expected_df = drop_suffix_columns_from_df(expected_df, [self._COLUMN_1], self._SUFFIX)
+
+        # Act
+        actual_df = coalesce_merge_dataframes(self.first_df, self.second_df, self._OUTER_MERGE, self._MERGE_COLUMN)
+
+        # Assert
+        pd.testing.assert_frame_equal(expected_df, actual_df)
+
+    def test_coalesce_merge_dataframes__when_keys_differ_and_repeat__expect_same_keys_as_merge(self):
+        # Arrange
+        expected_keys = [1, 2, 3, 4, 4, 5]
+        expected_col_1_values = ["A", np.nan, "C", "D", "D", "E"]
+        row = pd.DataFrame([{self._MERGE_COLUMN: 5, self._COLUMN_1: "E"}, {self._MERGE_COLUMN: 4, self._COLUMN_1: "F"}])
+        right_df = pd.concat([self.second_df, row], ignore_index=True)
+
+        # Act
+        new_df = coalesce_merge_dataframes(self.first_df, right_df, self._OUTER_MERGE, self._MERGE_COLUMN)
+        actual_keys = new_df[self._MERGE_COLUMN].tolist()
+        actual_col_1_values = new_df[self._COLUMN_1].tolist()
+        actual_columns = new_df.columns.tolist()
+
+        # Assert
+        self.assertListEqual(expected_keys, actual_keys)
+        self.assertListEqual(expected_col_1_values, actual_col_1_values)
+        self.assertListEqual([self._MERGE_COLUMN, self._COLUMN_1, self._DATE_COLUMN], actual_columns)
+
+    def test_coalesce_merge_dataframes__when_left_merge__expect_right_only_columns_added(self):
+        # Arrange
+        expected_columns = [self._MERGE_COLUMN, self._DATE_COLUMN, self._COLUMN_1]
+        left_df = self.first_df.drop(self._COLUMN_1, axis=1)
+
+        # Act
+        new_df = coalesce_merge_dataframes(left_df, self.second_df, self._LEFT_MERGE, self._MERGE_COLUMN)
+        actual_columns = new_df.columns.tolist()
+        actual_col_1_is_null = new_df[self._COLUMN_1].isnull().tolist()
+
+        # Assert
+        self.assertListEqual(expected_columns, actual_columns)
+        self.assertListEqual([False, True, False, True], actual_col_1_is_null)
+
+    def test_coalesce_merge_dataframes__when_columns_are_categorical__expect_coalesced_categorical(self):
+        # Arrange
+        expected_values = ["LKW", "PKW", "Anhänger"]
+        left_df = pd.DataFrame({"kurzname": ["A", "B", "C"], "gruppe": pd.Categorical(["LKW", None, None])})
+        right_df = pd.DataFrame({"kurzname": ["B", "C"], "gruppe": pd.Categorical(["PKW", "Anhänger"])})
+
+        # Act
+        new_df = coalesce_merge_dataframes(left_df, right_df, self._OUTER_MERGE, "kurzname")
+        actual_values = new_df["gruppe"].tolist()
+
+        # Assert
+        self.assertListEqual(expected_values, actual_values)
+        self.assertIsInstance(new_df["gruppe"].dtype, pd.CategoricalDtype)
+
+    def test_coalesce_merge_dataframes__when_only_left_column_is_categorical__expect_coalesced_categorical(self):
+        # Arrange
+        expected_values = ["LKW", "PKW", "Anhänger", "LKW"]
+        left_df = pd.DataFrame({"kurzname": ["A", "B", "C", "D"], "gruppe": pd.Categorical(["LKW", None, None, "LKW"])})
+        right_df = pd.DataFrame({"kurzname": ["B", "C"], "gruppe": pd.array(["PKW", "Anhänger"], dtype="string")})
+
+        # Act
+        new_df = coalesce_merge_dataframes(left_df, right_df, self._OUTER_MERGE, "kurzname")
+        actual_values = new_df["gruppe"].tolist()
+
+        # Assert
+        self.assertListEqual(expected_values, actual_values)
+        self.assertIsInstance(new_df["gruppe"].dtype, pd.CategoricalDtype)
+
+    def test_coalesce_merge_dataframes__when_only_right_column_is_categorical__expect_coalesced_values(self):
+        # Arrange
+        expected_values = ["LKW", "PKW"]
+        left_df = pd.DataFrame({"kurzname": ["A", "B"], "gruppe": ["LKW", None]})
+        right_df = pd.DataFrame({"kurzname": ["A", "B"], "gruppe": pd.Categorical(["LKW", "PKW"])})
+
+        # Act
+        new_df = coalesce_merge_dataframes(left_df, right_df, self._OUTER_MERGE, "kurzname")
+
+        # Assert
+        self.assertListEqual(expected_values, new_df["gruppe"].tolist())
+
+    def test_write_styled_dataframe_to_worksheet__when_compact_dtypes__expect_same_cells_as_object_dtypes(self):
+        # Arrange
+        expected_rows = [("gruppe", "rnr", "hu"), ("LKW", 1, "2022-11-15"), (None, 2, None)]
+        df = pd.DataFrame({
+            "gruppe": pd.Categorical(["LKW", None]),
+            "rnr": np.array([1, 2], dtype=np.int8),
+            "hu": pd.to_datetime(["2022-11-15", None])
+        })
+        ws = openpyxl.Workbook().active
+
+        # Act
+        write_styled_dataframe_to_worksheet(df, ws)
+        actual_rows = list(ws.iter_rows(values_only=True))
+
+        # Assert
+        self.assertListEqual(expected_rows, actual_rows)
@@ -1,6 +1,8 @@
 from datetime import datetime
 from unittest import TestCase
 
+import pandas as pd
+
 from utils.datetime_utils import *
 
 
@@ -75,3 +77,40 @@ class DatetimeUtilsTests(TestCase):
 
         # Assert
         self.assertEqual(expected_result, actual_result)
+
+    def test_strings_to_dates__when_dates_have_mixed_separators_and_nulls__expect_dates_and_nat(self):
+        # Arrange
+        dates = pd.Series([self._DASH_SEPARATED_DATE_AS_STR, self._SLASH_SEPARATED_DATE_AS_STR, None])
+        expected_result = [
+            string_to_date(self._DASH_SEPARATED_DATE_AS_STR),
+            string_to_date(self._SLASH_SEPARATED_DATE_AS_STR)
+        ]
+
+        # Act
+        actual_result = strings_to_dates(dates)
+
+        # Assert
+        self.assertListEqual(expected_result, [date.date() for date in actual_result.iloc[:2]])
+        self.assertTrue(pd.isnull(actual_result.iloc[2]))
+
+    def test_get_months_diff_between_date_arrays__when_month_ends_and_future_dates__expect_relativedelta_diff(self):
+        # Arrange
+        start_dates_as_str = ["2022-01-31", "2021-11-30", "2022-02-28", "2022-06-15", "2022-05-15", "2020-02-29"]
+        start_dates = strings_to_dates(pd.Series(start_dates_as_str))
+        end_dates = [
+            datetime(2022, 2, 28),
+            datetime(2022, 3, 31, 10, 30),
+            datetime(2022, 4, 15, 8),
+            datetime(2024, 2, 29)
+        ]
+
+        for end_date in end_dates:
+            expected_result = [
+                get_months_diff_between_dates(string_to_date(date_str), end_date) for date_str in start_dates_as_str
+            ]
+
+            # Act
+            actual_result = get_months_diff_between_date_arrays(start_dates, end_date)
+
+            # Assert
+            self.assertListEqual(expected_result, actual_result.tolist())
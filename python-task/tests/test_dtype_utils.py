@@ -0,0 +1,110 @@
+from unittest import TestCase
+
+import numpy as np
+import pandas as pd
+
+from utils.data_utils import coalesce_merge_dataframes
+from utils.dtype_utils import *
+
+
+class DtypeUtilsTests(TestCase):
+    def setUp(self):
+        self.df = pd.DataFrame({
+            "kurzname": ["A", "B", "C", "D"],
+            "gruppe": ["LKW", "LKW", "PKW", None],
+            "rnr": [1, 2, 3, 4],
+            "hu": ["2022-11-15", "2022/01/01", None, "2022-11-15"]
+        })
+
+    def test_optimize_dtypes__when_columns_are_objects__expect_compact_dtypes_with_same_values(self):
+        # Arrange
+        expected_dates = [pd.Timestamp("2022-11-15"), pd.Timestamp("2022-01-01"), pd.NaT, pd.Timestamp("2022-11-15")]
+
+        # Act
+        new_df = optimize_dtypes(self.df, ["hu"])
+
+        # Assert
+        self.assertIsInstance(new_df["gruppe"].dtype, pd.CategoricalDtype)
+        self.assertNotIsInstance(new_df["kurzname"].dtype, pd.CategoricalDtype)
+        self.assertEqual(np.int8, new_df["rnr"].dtype)
+        self.assertListEqual(expected_dates, new_df["hu"].tolist())
+        self.assertListEqual(["A", "B", "C", "D"], new_df["kurzname"].tolist())
+        self.assertListEqual(["LKW", "LKW", "PKW"], new_df["gruppe"].tolist()[:3])
+        self.assertTrue(pd.isnull(new_df["gruppe"][3]))
+
+    def test_optimize_dtypes__when_dates_do_not_parse__expect_column_kept(self):
+        # Arrange
+        df = pd.DataFrame({"hu": ["2022-11-15", "soon"]})
+
+        # Act
+        new_df = optimize_dtypes(df, ["hu"])
+
+        # Assert
+        self.assertListEqual(["2022-11-15", "soon"], new_df["hu"].tolist())
+
+    def test_optimize_dtypes__when_floats_lose_precision__expect_float64_kept(self):
+        # Arrange
+        df = pd.DataFrame({"exact": [0.5, np.nan], "inexact": [0.1, 1e300]})
+
+        # Act
+        new_df = optimize_dtypes(df)
+
+        # Assert
+        self.assertEqual(np.float32, new_df["exact"].dtype)
+        self.assertEqual(np.float64, new_df["inexact"].dtype)
+
+    def test_optimize_dtypes__when_values_are_mixed__expect_column_kept(self):
+        # Arrange
+        df = pd.DataFrame({"labelIds": ["1,2", 3.0, None]})
+
+        # Act
+        new_df = optimize_dtypes(df)
+
+        # Assert
+        self.assertEqual(object, new_df["labelIds"].dtype)
+
+    def test_get_memory_report__when_dtypes_are_optimized__expect_smaller_total(self):
+        # Arrange
+        new_df = optimize_dtypes(self.df, ["hu"])
+
+        # Act
+        report = get_memory_report(self.df, new_df)
+
+        # Assert
+        self.assertListEqual(["kurzname", "gruppe", "rnr", "hu", "total"], report.index.tolist())
+        self.assertEqual("int8", report.loc["rnr", "dtype_after"])
+        self.assertEqual(report["bytes_before"][:-1].sum(), report.loc["total", "bytes_before"])
+        self.assertLess(report.loc["total", "bytes_after"], report.loc["total", "bytes_before"])
+
+    def test_align_dtypes__when_column_is_categorical_in_one_df_only__expect_same_dtype_and_coalesced_merge(self):
+        # Arrange
+        local_df = optimize_dtypes(self.df)
+        request_df = optimize_dtypes(pd.DataFrame({
+            "kurzname": ["C", "D", "E"],
+            "gruppe": ["PKW", "Kombi", "LKW"]
+        }))
+
+        # Act
+        new_local_df, new_request_df = align_dtypes(local_df, request_df)
+        merged_df = coalesce_merge_dataframes(new_local_df, new_request_df, "outer", "kurzname")
+
+        # Assert
+        self.assertEqual("category", local_df["gruppe"].dtype.name)
+        self.assertNotEqual("category", request_df["gruppe"].dtype.name)
+        self.assertEqual(new_local_df["gruppe"].dtype, new_request_df["gruppe"].dtype)
+        self.assertEqual(new_local_df["kurzname"].dtype, new_request_df["kurzname"].dtype)
+        self.assertListEqual(["LKW", "LKW", "PKW", "Kombi", "LKW"], merged_df["gruppe"].tolist())
+
+    def test_align_dtypes__when_dtypes_are_not_text__expect_columns_kept(self):
+        # Arrange
+        local_df = optimize_dtypes(self.df, ["hu"])
+        request_df = pd.DataFrame({"kurzname": ["A"], "rnr": [1000], "hu": ["2022-11-15"]})
+
+        # Act
+        new_local_df, new_request_df = align_dtypes(local_df, request_df)
+
+        # Assert
+        self.assertEqual("int8", new_local_df["rnr"].dtype.name)
+        self.assertEqual("int64", new_request_df["rnr"].dtype.name)
+        self.assertTrue(pd.api.types.is_datetime64_dtype(new_local_df["hu"]))
+        self.assertEqual(object, new_request_df["hu"].dtype)
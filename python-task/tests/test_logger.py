@@ -0,0 +1,62 @@
+import logging
+import os
+import tempfile
+from unittest import TestCase
+
+from logger import RateLimitFilter, logger, setup_logging, stop_logging
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class LoggerTests(TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        stop_logging()
+        logging.getLogger().setLevel(logging.WARNING)
+        self.temp_dir.cleanup()
+
+    def _create_record(self, message: str, line: int = 1) -> logging.LogRecord:
+        return logging.LogRecord("logger", logging.INFO, "data_utils.py", line, message, None, None)
+
+    def test_rate_limit_filter__when_line_logs_over_limit__expect_rest_dropped_and_counted_next_interval(self):
+        # Arrange
+        clock = FakeClock()
+        rate_limit = RateLimitFilter(limit=2, interval=10, clock=clock)
+
+        # Act
+        actual_passed = [rate_limit.filter(self._create_record("Missing label")) for _ in range(5)]
+        other_line_passed = rate_limit.filter(self._create_record("Other", line=2))
+        clock.now = 10
+        next_record = self._create_record("Missing label")
+        next_passed = rate_limit.filter(next_record)
+
+        # Assert
+        self.assertListEqual([True, True, False, False, False], actual_passed)
+        self.assertTrue(other_line_passed)
+        self.assertTrue(next_passed)
+        self.assertEqual("Missing label (3 similar messages suppressed)", next_record.getMessage())
+
+    def test_setup_logging__when_records_are_logged__expect_them_written_by_listener_to_daily_file(self):
+        # Arrange
+        logs_dir = os.path.join(self.temp_dir.name, "logs")
+
+        # Act
+        setup_logging(logs_dir=logs_dir, console=False)
+        logger.info("Color code with id - %s.", 7)
+        logger.debug("Not written")
+        stop_logging()
+        with open(os.path.join(logs_dir, os.listdir(logs_dir)[0])) as file:
+            actual_lines = file.read().splitlines()
+
+        # Assert
+        self.assertEqual(2, len(actual_lines))
+        self.assertTrue(actual_lines[0].endswith("INFO - Logger initialized successfully!"))
+        self.assertTrue(actual_lines[1].endswith("INFO - Color code with id - 7."))
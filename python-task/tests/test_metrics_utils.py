@@ -0,0 +1,95 @@
+import json
+import os
+import tempfile
+from unittest import TestCase
+
+import pandas as pd
+
+from utils.metrics_utils import *
+
+
+@track_stage
+def drop_first_row(df: pd.DataFrame) -> pd.DataFrame:
+    return df.iloc[1:]
+
+
+class MetricsUtilsTests(TestCase):
+    def setUp(self):
+        self.df = pd.DataFrame({"col1": [1, 2, 3], "col2": ["A", "B", "C"]})
+
+    def test_track_stage__when_recording__expect_stage_with_rows_and_columns(self):
+        # Arrange
+        recorder = MetricsRecorder()
+
+        # Act
+        with recording(recorder):
+            drop_first_row(self.df)
+        actual_stage = recorder.stages[0]
+
+        # Assert
+        self.assertEqual("drop_first_row", actual_stage.name)
+        self.assertEqual(3, actual_stage.rows_in)
+        self.assertEqual(2, actual_stage.rows_out)
+        self.assertEqual(2, actual_stage.columns_in)
+        self.assertEqual(2, actual_stage.columns_out)
+        self.assertGreaterEqual(actual_stage.wall_time, 0)
+        self.assertGreaterEqual(actual_stage.cpu_time, 0)
+
+    def test_track_stage__when_not_recording__expect_no_stage(self):
+        # Arrange
+        recorder = MetricsRecorder()
+
+        # Act
+        actual_df = drop_first_row(self.df)
+
+        # Assert
+        self.assertEqual(2, len(actual_df.index))
+        self.assertListEqual([], recorder.stages)
+
+    def test_stage__when_stages_are_nested__expect_depth_and_enclosing_peak_memory(self):
+        # Arrange
+        recorder = MetricsRecorder(trace_memory=True)
+
+        # Act
+        with recording(recorder), recorder.stage("outer"):
+            with recorder.stage("inner"):
+                data = bytearray(10 * 1024 * 1024)
+                del data
+        outer_stage, inner_stage = recorder.stages
+
+        # Assert
+        self.assertEqual(0, outer_stage.depth)
+        self.assertEqual(1, inner_stage.depth)
+        self.assertGreaterEqual(inner_stage.peak_traced_memory, 10 * 1024 * 1024)
+        self.assertGreaterEqual(outer_stage.peak_traced_memory, inner_stage.peak_traced_memory)
+
+    def test_save__when_stages_are_recorded__expect_json_report(self):
+        # Arrange
+        recorder = MetricsRecorder()
+        recorder.metadata["columns"] = ["col1"]
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, "metrics", "run.json")
+
+            # Act
+            with recording(recorder):
+                drop_first_row(self.df)
+            recorder.save(path)
+            with open(path) as file:
+                actual_report = json.load(file)
+
+        # Assert
+        self.assertListEqual(["col1"], actual_report["metadata"]["columns"])
+        self.assertEqual("drop_first_row", actual_report["stages"][0]["name"])
+
+    def test_record_metadata__when_recording__expect_value_in_metadata(self):
+        # Arrange
+        recorder = MetricsRecorder()
+
+        # Act
+        with recording(recorder):
+            record_metadata("memory", {"col1": 24})
+        record_metadata("ignored", 1)
+
+        # Assert
+        self.assertDictEqual({"memory": {"col1": 24}}, recorder.metadata)
@@ -0,0 +1,83 @@
+import gzip
+import json
+import os
+import tempfile
+from unittest import TestCase
+
+import requests
+
+from tests.stub_server import StubServer
+from utils.recording_utils import ApiRecording, RecordingHttpClient, ReplayHttpClient
+from utils.request_utils import get_access_token, get_request_resource_as_json, stream_request_resource
+
+
+class RecordingUtilsTests(TestCase):
+    _RESOURCE_PATH = "/v1/vehicles/select/active"
+    _LABEL_PATH = "/v1/labels/1"
+    _LOGIN_PATH = "/login"
+
+    def test_replay_http_client__when_responses_are_recorded__expect_same_data_without_requests(self):
+        # Arrange
+        expected_records = [{"kurzname": str(i), "rnr": i} for i in range(100)]
+        expected_label = [{"colorCode": "ff0000"}]
+        gzipped_records = gzip.compress(json.dumps(expected_records).encode())
+        routes = {
+            self._LOGIN_PATH: (200, {"oauth": {"access_token": "token"}}),
+            self._RESOURCE_PATH: (200, gzipped_records, {"Content-Encoding": "gzip"}),
+            self._LABEL_PATH: (200, expected_label)
+        }
+        recording = ApiRecording()
+        recording_client = RecordingHttpClient(recording, timeout=1)
+
+        with tempfile.TemporaryDirectory() as directory, StubServer(routes) as server:
+            path = os.path.join(directory, "api.zip")
+            get_access_token(f"{server.url}{self._LOGIN_PATH}", {"username": "1"}, {}, recording_client)
+            list(stream_request_resource(f"{server.url}{self._RESOURCE_PATH}", {}, client=recording_client))
+            get_request_resource_as_json(f"{server.url}{self._LABEL_PATH}", {}, client=recording_client)
+            recording.save(path)
+            requests_count = len(server.requests)
+            replay_client = ReplayHttpClient(ApiRecording.load(path))
+
+            # Act
+            actual_token = get_access_token(f"{server.url}{self._LOGIN_PATH}", {"username": "1"}, {}, replay_client)
+            actual_records = list(
+                stream_request_resource(f"{server.url}{self._RESOURCE_PATH}", {}, client=replay_client)
+            )
+            actual_label = get_request_resource_as_json(f"{server.url}{self._LABEL_PATH}", {}, client=replay_client)
+
+        # Assert
+        self.assertEqual("token", actual_token)
+        self.assertListEqual(expected_records, actual_records)
+        self.assertListEqual(expected_label, actual_label)
+        self.assertEqual(3, requests_count)
+        self.assertEqual(requests_count, len(server.requests))
+
+    def test_replay_http_client__when_request_is_not_recorded__expect_connection_error(self):
+        # Arrange
+        recording = ApiRecording()
+        recording.add("GET", "http://api/labels/1", None, (200, {}, b"[]"))
+        client = ReplayHttpClient(recording)
+
+        # Act & Assert
+        with self.assertRaises(requests.ConnectionError):
+            get_request_resource_as_json("http://api/labels/2", {}, client=client)
+
+    def test_api_recording__when_saved_and_loaded__expect_same_responses(self):
+        # Arrange
+        expected_response = (404, {"Content-Type": "application/json"}, b'{"error": "Not found"}')
+        recording = ApiRecording()
+        recording.add("post", "http://api/login", {"username": "1"}, (200, {}, b"{}"))
+        recording.add("GET", "http://api/labels/1", None, expected_response)
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "fixtures", "api.zip")
+
+            # Act
+            recording.save(path)
+            loaded_recording = ApiRecording.load(path)
+
+        # Assert
+        self.assertEqual(2, len(loaded_recording))
+        self.assertEqual(expected_response, loaded_recording.get("GET", "http://api/labels/1"))
+        self.assertEqual((200, {}, b"{}"), loaded_recording.get("POST", "http://api/login", {"username": "1"}))
+        self.assertIsNone(loaded_recording.get("POST", "http://api/login", {"username": "2"}))
@@ -0,0 +1,121 @@
+import json
+import os
+import tempfile
+import threading
+import urllib.error
+import urllib.request
+from datetime import datetime
+from io import BytesIO, StringIO
+from unittest import TestCase
+
+import openpyxl
+import pandas as pd
+
+from report_service import ReportService, create_report_server
+from tests.stub_server import StubServer
+from utils.request_utils import AccessTokenProvider
+
+
+class ReportServiceTests(TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.csv_path = os.path.join(self.temp_dir.name, "vehicles.csv")
+        pd.DataFrame({"kurzname": ["A", "B"], "gruppe": ["PKW", "LKW"]}).to_csv(self.csv_path, sep=";", index=False)
+
+        self.server = StubServer({
+            "/login": (200, {"oauth": {"access_token": "token", "expires_in": 1200}}),
+            "/vehicles": (200, [
+                {"kurzname": "A", "rnr": 1, "hu": "2022-11-15", "labelIds": "7"},
+                {"kurzname": "B", "rnr": 2, "hu": "2022-01-01", "labelIds": None}
+            ]),
+            "/labels/7": (200, [{"id": 7, "colorCode": "#FF0000"}])
+        })
+        self.server.__enter__()
+
+        class TestReportService(ReportService):
+            _LOCAL_DATA_PATH = self.csv_path
+            _ACCESS_TOKEN_PROVIDER = AccessTokenProvider(f"{self.server.url}/login", {}, {})
+            _RESOURCE_REQUEST_URL = f"{self.server.url}/vehicles"
+            _COLOR_REQUEST_URL = f"{self.server.url}/labels/"
+            _LABEL_COLOR_CACHE_PATH = os.path.join(self.temp_dir.name, "label_colors.json")
+            _SHARD_CACHE_DIRECTORY = os.path.join(self.temp_dir.name, "shards")
+
+        self.service = TestReportService()
+
+    def tearDown(self):
+        self.server.__exit__(None, None, None)
+        self.temp_dir.cleanup()
+
+    def test_render_report__when_dataset_is_not_loaded__expect_runtime_error(self):
+        # Act & Assert
+        with self.assertRaises(RuntimeError):
+            self.service.render_report(["kurzname"])
+
+    def test_render_report__when_reports_are_rendered__expect_one_download_and_as_of_colors(self):
+        # Arrange
+        self.service.refresh()
+
+        # Act
+        csv_content, _ = self.service.render_report(["kurzname", "hu"], output_format="csv")
+        early_content, _ = self.service.render_report(["kurzname", "labelIds", "hu"], today=datetime(2022, 2, 1))
+        late_content, _ = self.service.render_report(["kurzname", "labelIds", "hu"], today=datetime(2022, 12, 20))
+        csv_df = pd.read_csv(StringIO(csv_content.decode()), sep=";")
+        early_ws = openpyxl.load_workbook(BytesIO(early_content)).active
+        late_ws = openpyxl.load_workbook(BytesIO(late_content)).active
+
+        # Assert
+        self.assertListEqual(["kurzname", "gruppe", "rnr", "hu"], csv_df.columns.tolist())
+        self.assertEqual(1, len(self.server.requests_to("/vehicles")))
+        self.assertEqual(1, len(self.server.requests_to("/labels/7")))
+        self.assertEqual("00007500", early_ws.cell(row=2, column=1).fill.fgColor.rgb)
+        self.assertEqual("00FFA500", late_ws.cell(row=2, column=1).fill.fgColor.rgb)
+        self.assertEqual("00FF0000", late_ws.cell(row=3, column=1).font.color.rgb)
+
+    def test_create_report_server__when_report_is_requested__expect_report_or_bad_request(self):
+        # Arrange
+        self.service.refresh()
+        server = create_report_server(self.service, port=0)
+        threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True).start()
+        host, port = server.server_address
+        url = f"http://{host}:{port}/report"
+
+        try:
+            # Act
+            with urllib.request.urlopen(f"{url}?keys=kurzname,hu&colored=false&format=csv") as response:
+                content_type = response.headers["Content-Type"]
+                actual_df = pd.read_csv(BytesIO(response.read()), sep=";")
+            with self.assertRaises(urllib.error.HTTPError) as context:
+                urllib.request.urlopen(f"{url}?keys=unknown")
+            error = json.loads(context.exception.read())
+
+            # Assert
+            self.assertEqual("text/csv", content_type)
+            self.assertListEqual(["B", "A"], actual_df["kurzname"].tolist())
+            self.assertEqual(400, context.exception.code)
+            self.assertEqual("Unknown keys unknown.", error["error"])
+        finally:
+            server.shutdown()
+            server.server_close()
+
+    def test_create_report_server__when_rendering_fails__expect_internal_server_error(self):
+        # Arrange
+        class FailingReportService(type(self.service)):
+            def render_report(self, *args, **kwargs):
+                raise KeyError("kurzname")
+
+        server = create_report_server(FailingReportService(), port=0)
+        threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True).start()
+        host, port = server.server_address
+
+        try:
+            # Act
+            with self.assertRaises(urllib.error.HTTPError) as context:
+                urllib.request.urlopen(f"http://{host}:{port}/report?keys=kurzname")
+            error = json.loads(context.exception.read())
+
+            # Assert
+            self.assertEqual(500, context.exception.code)
+            self.assertEqual("Couldn't render report.", error["error"])
+        finally:
+            server.shutdown()
+            server.server_close()
@@ -0,0 +1,446 @@
+import gzip
+import json
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from unittest import TestCase
+
+import requests
+
+from tests.stub_server import StubServer
+from utils.request_utils import *
+
+
+class FailingRoute:
+    def __init__(self, failures_count: int, status: int, body=None, headers: dict = None):
+        self.failures_count = failures_count
+        self.status = status
+        self.body = body if body is not None else [{"id": 1}]
+        self.headers = headers or {}
+        self.calls_count = 0
+
+    def __call__(self, handler):
+        self.calls_count += 1
+        if self.calls_count <= self.failures_count:
+            return self.status, {"error": "Failure"}, self.headers
+        return 200, self.body
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class LoginRoute:
+    def __init__(self, expires_in: int = 1200):
+        self.expires_in = expires_in
+        self.calls_count = 0
+
+    def __call__(self, handler):
+        self.calls_count += 1
+        return 200, {"oauth": {"access_token": f"token-{self.calls_count}", "expires_in": self.expires_in}}
+
+
+class ConditionalRoute:
+    def __init__(self, body, etag: str = '"v1"'):
+        self.body = body
+        self.etag = etag
+        self.conditional_headers = []
+
+    def __call__(self, handler):
+        self.conditional_headers.append(handler.headers.get("If-None-Match"))
+        if handler.headers.get("If-None-Match") == self.etag:
+            return 304, None, {"ETag": self.etag}
+        return 200, self.body, {"ETag": self.etag}
+
+
+class RequestUtilsTests(TestCase):
+    _RESOURCE_PATH = "/v1/vehicles/select/active"
+    _LOGIN_PATH = "/login"
+
+    def setUp(self):
+        self.sleeps = []
+        self.client = HttpClient(timeout=1, max_retries=3, backoff_factor=0.5, sleep=self.sleeps.append)
+
+    def tearDown(self):
+        self.client.close()
+
+    def test_get_access_token__when_login_succeeds__expect_access_token(self):
+        # Arrange
+        expected_token = "token"
+        routes = {self._LOGIN_PATH: (200, {"oauth": {"access_token": expected_token}})}
+
+        with StubServer(routes) as server:
+            # Act
+            actual_token = get_access_token(f"{server.url}{self._LOGIN_PATH}", {}, {}, self.client)
+
+        # Assert
+        self.assertEqual(expected_token, actual_token)
+        self.assertListEqual([("POST", self._LOGIN_PATH)], server.requests)
+
+    def test_get_request_resource_as_json__when_response_is_gzipped__expect_decoded_data(self):
+        # Arrange
+        expected_data = [{"kurzname": "A"}, {"kurzname": "B"}]
+        body = gzip.compress(json.dumps(expected_data).encode())
+        routes = {self._RESOURCE_PATH: (200, body, {"Content-Encoding": "gzip"})}
+
+        with StubServer(routes) as server:
+            # Act
+            actual_data = get_request_resource_as_json(f"{server.url}{self._RESOURCE_PATH}", {}, client=self.client)
+
+        # Assert
+        self.assertListEqual(expected_data, actual_data)
+
+    def test_request_json__when_server_errors_then_recovers__expect_retries_with_backoff(self):
+        # Arrange
+        expected_data = [{"id": 1}]
+        route = FailingRoute(2, 503)
+
+        with StubServer({self._RESOURCE_PATH: route}) as server:
+            # Act
+            actual_data = self.client.request_json("GET", f"{server.url}{self._RESOURCE_PATH}")
+
+        # Assert
+        self.assertListEqual(expected_data, actual_data)
+        self.assertEqual(3, route.calls_count)
+        self.assertEqual(2, len(self.sleeps))
+        self.assertTrue(0 <= self.sleeps[0] <= 0.5)
+        self.assertTrue(0 <= self.sleeps[1] <= 1)
+
+    def test_request_json__when_rate_limited_with_retry_after__expect_to_wait_retry_after(self):
+        # Arrange
+        route = FailingRoute(1, 429, headers={"Retry-After": "2"})
+
+        with StubServer({self._RESOURCE_PATH: route}) as server:
+            # Act
+            self.client.request_json("GET", f"{server.url}{self._RESOURCE_PATH}")
+
+        # Assert
+        self.assertEqual(2, route.calls_count)
+        self.assertListEqual([2.0], self.sleeps)
+
+    def test_request_json__when_retry_after_exceeds_max_backoff__expect_to_wait_max_backoff(self):
+        # Arrange
+        routes = {
+            "/seconds": FailingRoute(1, 503, headers={"Retry-After": "3600"}),
+            "/date": FailingRoute(1, 503, headers={"Retry-After": "Wed, 21 Oct 2099 07:28:00 GMT"}),
+            "/past-date": FailingRoute(1, 503, headers={"Retry-After": "Wed, 21 Oct 2015 07:28:00 GMT"})
+        }
+        self.client.max_backoff = 10
+
+        with StubServer(routes) as server:
+            # Act
+            for path in routes:
+                self.client.request_json("GET", f"{server.url}{path}")
+
+        # Assert
+        self.assertListEqual([10.0, 10.0, 0.0], self.sleeps)
+
+    def test_request_json__when_server_keeps_failing__expect_http_error_after_last_retry(self):
+        # Arrange
+        route = FailingRoute(10, 500)
+
+        with StubServer({self._RESOURCE_PATH: route}) as server:
+            # Act & Assert
+            with self.assertRaises(requests.HTTPError):
+                self.client.request_json("GET", f"{server.url}{self._RESOURCE_PATH}")
+
+        self.assertEqual(4, route.calls_count)
+
+    def test_request_json__when_client_error__expect_no_retries_and_http_error(self):
+        # Arrange
+        route = FailingRoute(10, 404)
+
+        with StubServer({self._RESOURCE_PATH: route}) as server:
+            # Act & Assert
+            with self.assertRaises(requests.HTTPError):
+                self.client.request_json("GET", f"{server.url}{self._RESOURCE_PATH}")
+
+        self.assertEqual(1, route.calls_count)
+
+    def test_request_json__when_response_is_slower_than_timeout__expect_retries_then_timeout_error(self):
+        # Arrange
+        routes = {self._RESOURCE_PATH: (200, [])}
+
+        with StubServer(routes, delay=0.5) as server:
+            # Act & Assert
+            with self.assertRaises(requests.Timeout):
+                self.client.request_json("GET", f"{server.url}{self._RESOURCE_PATH}", timeout=0.1)
+
+        self.assertEqual(4, len(server.requests))
+
+    def test_access_token_provider__when_created__expect_no_login_until_first_use(self):
+        # Arrange
+        route = LoginRoute()
+
+        with StubServer({self._LOGIN_PATH: route}) as server:
+            # Act
+            provider = AccessTokenProvider(f"{server.url}{self._LOGIN_PATH}", {}, {}, self.client)
+            calls_count_before_use = route.calls_count
+            actual_token = provider.get_token()
+
+        # Assert
+        self.assertEqual(0, calls_count_before_use)
+        self.assertEqual("token-1", actual_token)
+
+    def test_access_token_provider__when_token_is_valid__expect_cached_token(self):
+        # Arrange
+        route = LoginRoute()
+        clock = FakeClock()
+
+        with StubServer({self._LOGIN_PATH: route}) as server:
+            # Act
+            provider = AccessTokenProvider(f"{server.url}{self._LOGIN_PATH}", {}, {}, self.client, clock=clock)
+            first_token = provider.get_token()
+            clock.now += 1000
+            second_token = provider.get_token()
+
+        # Assert
+        self.assertEqual(first_token, second_token)
+        self.assertEqual(1, route.calls_count)
+
+    def test_access_token_provider__when_token_is_about_to_expire__expect_refreshed_token(self):
+        # Arrange
+        route = LoginRoute(expires_in=1200)
+        clock = FakeClock()
+
+        with StubServer({self._LOGIN_PATH: route}) as server:
+            # Act
+            provider = AccessTokenProvider(
+                f"{server.url}{self._LOGIN_PATH}", {}, {}, self.client, refresh_margin=60, clock=clock
+            )
+            provider.get_token()
+            clock.now += 1150
+            actual_token = provider.get_token()
+
+        # Assert
+        self.assertEqual("token-2", actual_token)
+        self.assertEqual(2, route.calls_count)
+
+    def test_access_token_provider__when_called_concurrently__expect_single_login(self):
+        # Arrange
+        route = LoginRoute()
+
+        with StubServer({self._LOGIN_PATH: route}, delay=0.2) as server:
+            # Act
+            provider = AccessTokenProvider(f"{server.url}{self._LOGIN_PATH}", {}, {}, self.client)
+            with ThreadPoolExecutor(max_workers=5) as executor:
+                actual_tokens = list(executor.map(lambda _: provider.get_token(), range(5)))
+
+        # Assert
+        self.assertListEqual(["token-1"] * 5, actual_tokens)
+        self.assertEqual(1, route.calls_count)
+
+    def test_access_token_provider__when_token_is_cached_on_disk__expect_no_login_in_new_provider(self):
+        # Arrange
+        route = LoginRoute()
+        clock = FakeClock()
+
+        with tempfile.TemporaryDirectory() as temp_dir, StubServer({self._LOGIN_PATH: route}) as server:
+            cache_path = os.path.join(temp_dir, "access_token.json")
+
+            # Act
+            first_provider = AccessTokenProvider(
+                f"{server.url}{self._LOGIN_PATH}", {}, {}, self.client, cache_path=cache_path, clock=clock
+            )
+            first_token = first_provider.get_token()
+            second_provider = AccessTokenProvider(
+                f"{server.url}{self._LOGIN_PATH}", {}, {}, self.client, cache_path=cache_path, clock=clock
+            )
+            second_token = second_provider.get_token()
+
+        # Assert
+        self.assertEqual(first_token, second_token)
+        self.assertEqual(1, route.calls_count)
+
+    def test_access_token_provider_retry_unauthorized__when_cached_token_is_revoked__expect_login_and_retry(self):
+        # Arrange
+        login_route = LoginRoute()
+        authorizations = []
+
+        def resource_route(handler):
+            authorizations.append(handler.headers["Authorization"])
+            if handler.headers["Authorization"] == "Bearer revoked":
+                return 401, {"error": "Unauthorized"}
+            return 200, [1]
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            cache_path = os.path.join(temp_dir, "access_token.json")
+            with open(cache_path, "w") as file:
+                json.dump({"access_token": "revoked", "expires_at": 10 ** 10}, file)
+            routes = {self._LOGIN_PATH: login_route, self._RESOURCE_PATH: resource_route}
+
+            with StubServer(routes) as server:
+                provider = AccessTokenProvider(
+                    f"{server.url}{self._LOGIN_PATH}", {}, {}, self.client, cache_path=cache_path
+                )
+
+                def request():
+                    headers = {"Authorization": f"Bearer {provider.get_token()}"}
+                    url = f"{server.url}{self._RESOURCE_PATH}"
+                    return list(stream_request_resource(url, headers, client=self.client))
+
+                # Act
+                actual_records = provider.retry_unauthorized(request)
+
+        # Assert
+        self.assertListEqual([1], actual_records)
+        self.assertListEqual(["Bearer revoked", "Bearer token-1"], authorizations)
+        self.assertEqual(1, login_route.calls_count)
+
+    def test_access_token_provider_retry_unauthorized__when_new_token_is_rejected__expect_http_error(self):
+        # Arrange
+        login_route = LoginRoute()
+        resource_route = FailingRoute(2, 401)
+
+        with StubServer({self._LOGIN_PATH: login_route, self._RESOURCE_PATH: resource_route}) as server:
+            provider = AccessTokenProvider(f"{server.url}{self._LOGIN_PATH}", {}, {}, self.client)
+
+            def request():
+                headers = {"Authorization": f"Bearer {provider.get_token()}"}
+                return get_request_resource_as_json(f"{server.url}{self._RESOURCE_PATH}", headers, client=self.client)
+
+            # Act & Assert
+            with self.assertRaises(requests.HTTPError):
+                provider.retry_unauthorized(request)
+        self.assertEqual(2, resource_route.calls_count)
+        self.assertEqual(2, login_route.calls_count)
+
+    def test_iter_json_array_items__when_items_are_split_across_chunks__expect_all_items(self):
+        # Arrange
+        expected_items = [{"kurzname": "Größe", "rnr": 12345}, {"kurzname": "B", "rnr": 678}, 9]
+        text = json.dumps(expected_items, ensure_ascii=False).encode()
+        chunks = [text[i:i + 3] for i in range(0, len(text), 3)]
+
+        # Act
+        actual_items = list(iter_json_array_items(chunks))
+
+        # Assert
+        self.assertListEqual(expected_items, actual_items)
+
+    def test_iter_json_array_items__when_body_is_not_array__expect_value_error(self):
+        # Act & Assert
+        with self.assertRaises(ValueError):
+            list(iter_json_array_items([b'{"error": "Failure"}']))
+
+    def test_iter_json_array_items__when_array_is_not_closed__expect_value_error(self):
+        # Act & Assert
+        with self.assertRaises(ValueError):
+            list(iter_json_array_items([b'[{"rnr": 1}, {"rnr"']))
+
+    def test_stream_request_resource__when_response_is_array__expect_records(self):
+        # Arrange
+        expected_records = [{"kurzname": str(i), "rnr": i} for i in range(1000)]
+        routes = {self._RESOURCE_PATH: (200, expected_records)}
+
+        with StubServer(routes) as server:
+            # Act
+            actual_records = list(stream_request_resource(f"{server.url}{self._RESOURCE_PATH}", {}, client=self.client))
+
+        # Assert
+        self.assertListEqual(expected_records, actual_records)
+
+    def test_stream_request_resource__when_body_is_streamed_without_length__expect_records(self):
+        # Arrange
+        expected_records = [{"kurzname": str(i), "rnr": i} for i in range(1000)]
+        chunks = [
+            b"[",
+            json.dumps(expected_records[:500])[1:-1].encode(),
+            b",",
+            json.dumps(expected_records[500:])[1:-1].encode(),
+            b"]"
+        ]
+        routes = {self._RESOURCE_PATH: lambda handler: (200, iter(chunks))}
+
+        with StubServer(routes) as server:
+            # Act
+            actual_records = list(stream_request_resource(f"{server.url}{self._RESOURCE_PATH}", {}, client=self.client))
+
+        # Assert
+        self.assertListEqual(expected_records, actual_records)
+
+    def test_http_cache__when_resource_is_not_modified__expect_body_served_from_disk(self):
+        # Arrange
+        expected_records = [{"kurzname": str(i), "rnr": i} for i in range(100)]
+        route = ConditionalRoute(expected_records)
+        routes = {self._RESOURCE_PATH: route}
+
+        with tempfile.TemporaryDirectory() as directory, StubServer(routes) as server:
+            url = f"{server.url}{self._RESOURCE_PATH}"
+            cache = HttpCache(directory)
+
+            # Act
+            first_records = list(stream_request_resource(url, {}, client=self.client, cache=cache))
+            second_records = list(stream_request_resource(url, {}, client=self.client, cache=cache))
+            # A new cache loads the stored bodies from its index
+            third_data = get_request_resource_as_json(url, {}, client=self.client, cache=HttpCache(directory))
+
+        # Assert
+        self.assertListEqual(expected_records, first_records)
+        self.assertListEqual(expected_records, second_records)
+        self.assertListEqual(expected_records, third_data)
+        self.assertListEqual([None, '"v1"', '"v1"'], route.conditional_headers)
+        self.assertEqual((1, 1), (cache.hits, cache.misses))
+        self.assertEqual(0.5, cache.hit_ratio)
+
+    def test_http_cache__when_resource_is_modified__expect_new_body_stored(self):
+        # Arrange
+        expected_records = [{"kurzname": "B"}]
+        route = ConditionalRoute([{"kurzname": "A"}])
+        routes = {self._RESOURCE_PATH: route}
+
+        with tempfile.TemporaryDirectory() as directory, StubServer(routes) as server:
+            url = f"{server.url}{self._RESOURCE_PATH}"
+            cache = HttpCache(directory)
+            list(stream_request_resource(url, {}, client=self.client, cache=cache))
+            route.body, route.etag = expected_records, '"v2"'
+
+            # Act
+            changed_records = list(stream_request_resource(url, {}, client=self.client, cache=cache))
+            cached_records = list(stream_request_resource(url, {}, client=self.client, cache=cache))
+
+        # Assert
+        self.assertListEqual(expected_records, changed_records)
+        self.assertListEqual(expected_records, cached_records)
+        self.assertListEqual([None, '"v1"', '"v2"'], route.conditional_headers)
+        self.assertEqual((1, 2), (cache.hits, cache.misses))
+
+    def test_http_cache__when_response_has_no_validator__expect_body_not_stored(self):
+        # Arrange
+        routes = {self._RESOURCE_PATH: (200, [{"kurzname": "A"}])}
+
+        with tempfile.TemporaryDirectory() as directory, StubServer(routes) as server:
+            cache = HttpCache(directory)
+
+            # Act
+            get_request_resource_as_json(f"{server.url}{self._RESOURCE_PATH}", {}, client=self.client, cache=cache)
+
+            # Assert
+            self.assertEqual(0, len(cache))
+            self.assertListEqual([], os.listdir(directory))
+
+    def test_http_cache__when_bodies_exceed_max_size__expect_least_recently_used_evicted(self):
+        # Arrange
+        body = [{"kurzname": "A" * 50}]
+        body_size = len(json.dumps(body).encode())
+        paths = ["/a", "/b", "/c"]
+        routes = {path: ConditionalRoute(body) for path in paths}
+
+        with tempfile.TemporaryDirectory() as directory, StubServer(routes) as server:
+            cache = HttpCache(directory, max_size=2 * body_size)
+
+            # Act
+            for path in ["/a", "/b", "/a", "/c"]:
+                get_request_resource_as_json(f"{server.url}{path}", {}, client=self.client, cache=cache)
+
+            # Assert
+            self.assertEqual(2, len(cache))
+            self.assertEqual(2 * body_size, cache.size)
+            self.assertEqual({}, cache.get_validators(cache.get_key(f"{server.url}/b")))
+            self.assertEqual(
+                {"If-None-Match": '"v1"'}, cache.get_validators(cache.get_key(f"{server.url}/a"))
+            )
+            self.assertEqual(2, len([name for name in os.listdir(directory) if name.endswith(".body")]))
@@ -0,0 +1,92 @@
+import os
+import tempfile
+from unittest import TestCase
+
+import pandas as pd
+
+from utils.shard_utils import *
+
+
+class ShardUtilsTests(TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.shards_dir = os.path.join(self.temp_dir.name, "shards")
+        self.cache_dir = os.path.join(self.temp_dir.name, "cache")
+        os.makedirs(self.shards_dir)
+        self.shard_paths = [
+            self._write_shard("north.csv", [["A", "LKW", "x"], ["B", "PKW", "y"]]),
+            self._write_shard("south.csv", [["C", "LKW", "z"]])
+        ]
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def _write_shard(self, name: str, rows: list) -> str:
+        path = os.path.join(self.shards_dir, name)
+        pd.DataFrame(rows, columns=["kurzname", "gruppe", "info"]).to_csv(path, sep=";", index=False)
+        return path
+
+    def test_get_shard_paths__when_path_is_directory_or_glob__expect_sorted_csv_files(self):
+        # Act
+        directory_paths = get_shard_paths(self.shards_dir)
+        glob_paths = get_shard_paths(os.path.join(self.shards_dir, "s*.csv"))
+
+        # Assert
+        self.assertListEqual(self.shard_paths, directory_paths)
+        self.assertListEqual(self.shard_paths[1:], glob_paths)
+
+    def test_get_shard_paths__when_nothing_matches__expect_file_not_found_error(self):
+        # Act & Assert
+        with self.assertRaises(FileNotFoundError):
+            get_shard_paths(os.path.join(self.shards_dir, "*.txt"))
+
+    def test_read_csv_shards__when_shards_are_read__expect_rows_of_all_shards_in_order(self):
+        # Act
+        df = read_csv_shards(self.shard_paths, ";", ["kurzname", "gruppe"], self.cache_dir)
+
+        # Assert
+        self.assertListEqual(["kurzname", "gruppe"], df.columns.tolist())
+        self.assertListEqual(["A", "B", "C"], df["kurzname"].tolist())
+        self.assertListEqual([0, 1, 2], df.index.tolist())
+
+    def test_read_csv_shards__when_read_again__expect_unchanged_shards_reused(self):
+        # Arrange
+        read_csv_shards(self.shard_paths, ";", ["kurzname"], self.cache_dir)
+        self._write_shard("south.csv", [["D", "LKW", "z"]])
+        # Same content with new modification time
+        os.utime(self.shard_paths[0], ns=(0, 0))
+
+        # Act
+        df = read_csv_shards(self.shard_paths, ";", ["kurzname"], self.cache_dir)
+        manifest = ShardManifest(self.cache_dir)
+        reused_df = manifest.get(self.shard_paths[0], ["kurzname"])
+
+        # Assert
+        self.assertListEqual(["A", "B", "D"], df["kurzname"].tolist())
+        self.assertIsNotNone(reused_df)
+        self.assertEqual(1, manifest.hits)
+
+    def test_manifest_get__when_columns_differ__expect_no_cached_df(self):
+        # Arrange
+        read_csv_shards(self.shard_paths, ";", ["kurzname"], self.cache_dir)
+
+        # Act
+        manifest = ShardManifest(self.cache_dir)
+        cached_df = manifest.get(self.shard_paths[0], ["gruppe", "kurzname"])
+
+        # Assert
+        self.assertIsNone(cached_df)
+        self.assertEqual(1, manifest.misses)
+
+    def test_read_csv_shards__when_shard_is_removed__expect_its_entry_and_cache_pruned(self):
+        # Arrange
+        read_csv_shards(self.shard_paths, ";", None, self.cache_dir)
+        removed_cache_path = ShardManifest(self.cache_dir).get_cache_path(self.shard_paths[1])
+
+        # Act
+        df = read_csv_shards(self.shard_paths[:1], ";", None, self.cache_dir)
+
+        # Assert
+        self.assertEqual(2, len(df.index))
+        self.assertEqual(1, len(ShardManifest(self.cache_dir)))
+        self.assertFalse(os.path.exists(removed_cache_path))
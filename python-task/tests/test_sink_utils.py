@@ -0,0 +1,305 @@
+import importlib.util
+import os
+import subprocess
+import sys
+import tempfile
+from unittest import TestCase, skipUnless
+
+import numpy as np
+import openpyxl
+import pandas as pd
+
+from utils.common_utils import OUTPUT_FORMATS
+from utils.sink_utils import *
+
+HAS_PYARROW = importlib.util.find_spec("pyarrow") is not None
+
+
+class SinkUtilsTests(TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.df = pd.DataFrame({
+            "kurzname": ["A", "B"],
+            "hu": ["2022-11-15", "2022-01-01"],
+            "rnr": [1, 2]
+        })
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def _get_path(self, extension: str) -> str:
+        return os.path.join(self.temp_dir.name, f"vehicles.{extension}")
+
+    def test_sinks__when_formats_are_listed_for_command_line__expect_every_format_has_sink(self):
+        # Assert
+        self.assertListEqual(OUTPUT_FORMATS, list(SINKS))
+
+    def test_import__when_sink_utils_is_imported__expect_no_openpyxl_or_requests_loaded(self):
+        # Arrange
+        code = "import sys, utils.sink_utils; print(sorted({'openpyxl', 'requests'} & set(sys.modules)))"
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+        # Act
+        process = subprocess.run([sys.executable, "-c", code], cwd=root, capture_output=True, text=True, check=True)
+
+        # Assert
+        self.assertEqual("[]", process.stdout.strip())
+
+    def test_get_sink__when_format_is_unknown__expect_value_error(self):
+        # Act & Assert
+        with self.assertRaises(ValueError):
+            get_sink("json")
+
+    def test_xlsx_sink_write__when_colors_are_given__expect_styled_rows(self):
+        # Arrange
+        path = self._get_path("xlsx")
+        fill_color_codes = pd.Series(["007500", None])
+        font_color_codes = pd.Series([None, "FF0000"])
+
+        # Act
+        get_sink("xlsx").write(self.df, path, fill_color_codes, font_color_codes)
+        ws = openpyxl.load_workbook(path).active
+
+        # Assert
+        self.assertListEqual(
+            [("kurzname", "hu", "rnr"), ("A", "2022-11-15", 1), ("B", "2022-01-01", 2)],
+            list(ws.iter_rows(values_only=True))
+        )
+        self.assertEqual("00007500", ws.cell(row=2, column=1).fill.fgColor.rgb)
+        self.assertEqual("00FF0000", ws.cell(row=3, column=1).font.color.rgb)
+
+    def test_split_into_partitions__when_df_is_sorted__expect_partition_per_value_with_its_colors(self):
+        # Arrange
+        df = pd.DataFrame({"gruppe": ["LKW", "LKW", "PKW", None], "kurzname": ["A", "B", "C", "D"]})
+        fill_color_codes = pd.Series(["007500", None, "FFA500", "b30000"])
+
+        # Act
+        partitions = split_into_partitions(df, "gruppe", fill_color_codes)
+
+        # Assert
+        self.assertListEqual(["LKW", "PKW", "unknown"], [name for name, _, _, _ in partitions])
+        self.assertListEqual(["A", "B"], partitions[0][1]["kurzname"].tolist())
+        self.assertListEqual(["FFA500"], partitions[1][2].tolist())
+        self.assertIsNone(partitions[2][3])
+
+    def test_split_into_partitions__when_column_is_categorical__expect_no_partition_of_unused_categories(self):
+        # Arrange
+        df = pd.DataFrame({
+            "gruppe": pd.Categorical(["PKW", "LKW", None, "PKW"], categories=["Kombi", "LKW", "PKW"]),
+            "kurzname": ["A", "B", "C", "D"]
+        })
+
+        # Act
+        partitions = split_into_partitions(df, "gruppe")
+
+        # Assert
+        self.assertListEqual(["PKW", "LKW", "unknown"], [name for name, _, _, _ in partitions])
+        self.assertListEqual(["A", "D"], partitions[0][1]["kurzname"].tolist())
+        self.assertListEqual(["C"], partitions[2][1]["kurzname"].tolist())
+
+    def test_xlsx_sink_write_partitioned_sheets__when_partitions_are_given__expect_styled_sheet_per_partition(self):
+        # Arrange
+        path = self._get_path("xlsx")
+        df = pd.DataFrame({"gruppe": ["LKW", "LKW", "PKW"], "kurzname": ["A", "B", "C"]})
+        fill_color_codes = pd.Series(["007500", None, "FFA500"])
+        font_color_codes = pd.Series([None, "#FF0000", "#FF0000"])
+        partitions = split_into_partitions(df, "gruppe", fill_color_codes, font_color_codes)
+
+        # Act
+        get_sink("xlsx", "native").write_partitioned_sheets(partitions, path, 2)
+        wb = openpyxl.load_workbook(path)
+
+        # Assert
+        self.assertListEqual(["LKW", "PKW"], wb.sheetnames)
+        self.assertListEqual(
+            [("gruppe", "kurzname"), ("LKW", "A"), ("LKW", "B")],
+            list(wb["LKW"].iter_rows(values_only=True))
+        )
+        self.assertTrue(wb["PKW"].cell(row=1, column=1).font.b)
+        self.assertEqual("00007500", wb["LKW"].cell(row=2, column=2).fill.fgColor.rgb)
+        self.assertEqual("00FF0000", wb["LKW"].cell(row=3, column=2).font.color.rgb)
+        self.assertEqual("00FFA500", wb["PKW"].cell(row=2, column=1).fill.fgColor.rgb)
+        self.assertEqual("00FF0000", wb["PKW"].cell(row=2, column=1).font.color.rgb)
+
+    def test_csv_sink_write_partitioned_files__when_partitions_are_given__expect_file_per_partition(self):
+        # Arrange
+        path = os.path.join(self.temp_dir.name, "vehicles")
+        df = pd.DataFrame({"gruppe": ["LKW", "PKW/Kombi"], "kurzname": ["A", "B"]})
+
+        # Act
+        get_sink("csv").write_partitioned_files(split_into_partitions(df, "gruppe"), path, 2)
+        actual_df = pd.read_csv(f"{path}_PKW_Kombi.csv", sep=";")
+
+        # Assert
+        self.assertListEqual(["vehicles_LKW.csv", "vehicles_PKW_Kombi.csv"], sorted(os.listdir(self.temp_dir.name)))
+        self.assertListEqual(["B"], actual_df["kurzname"].tolist())
+
+    def test_csv_sink_write_partitioned_files__when_file_names_collide__expect_numbered_files(self):
+        # Arrange
+        path = os.path.join(self.temp_dir.name, "vehicles")
+        prefix = "K" * 150
+        df = pd.DataFrame({"gruppe": ["A/B", "A_B", f"{prefix}1", f"{prefix}2"], "kurzname": ["A", "B", "C", "D"]})
+
+        # Act
+        get_sink("csv").write_partitioned_files(split_into_partitions(df, "gruppe"), path, 2)
+        actual_df = pd.read_csv(f"{path}_A_B1.csv", sep=";")
+
+        # Assert
+        self.assertEqual(4, len(os.listdir(self.temp_dir.name)))
+        self.assertListEqual(["B"], actual_df["kurzname"].tolist())
+
+    def test_csv_sink_write__when_df_is_written__expect_same_df_read(self):
+        # Arrange
+        path = self._get_path("csv")
+
+        # Act
+        get_sink("csv").write(self.df, path)
+        actual_df = pd.read_csv(path, sep=";")
+
+        # Assert
+        pd.testing.assert_frame_equal(self.df, actual_df)
+
+    @skipUnless(HAS_PYARROW, "pyarrow is not installed")
+    def test_parquet_sink_write__when_df_is_written__expect_same_df_read(self):
+        # Arrange
+        path = self._get_path("parquet")
+
+        # Act
+        get_sink("parquet").write(self.df, path)
+        actual_df = pd.read_parquet(path)
+
+        # Assert
+        pd.testing.assert_frame_equal(self.df, actual_df)
+
+    @skipUnless(HAS_PYARROW, "pyarrow is not installed")
+    def test_feather_sink_write__when_df_has_filtered_index__expect_same_rows_read(self):
+        # Arrange
+        path = self._get_path("feather")
+        df = self.df[self.df["rnr"] > 1]
+
+        # Act
+        get_sink("feather").write(df, path)
+        actual_df = pd.read_feather(path)
+
+        # Assert
+        pd.testing.assert_frame_equal(df.reset_index(drop=True), actual_df)
+
+    @skipUnless(HAS_PYARROW, "pyarrow is not installed")
+    def test_arrow_sinks_write__when_label_ids_mix_nan_numbers_and_strings__expect_strings_read(self):
+        # Arrange
+        df = pd.DataFrame({"kurzname": ["A", "B", "C"], "labelIds": [np.nan, 12, "1,2"]})
+
+        for output_format, read in [("parquet", pd.read_parquet), ("feather", pd.read_feather)]:
+            path = self._get_path(output_format)
+
+            # Act
+            get_sink(output_format).write(df, path)
+            actual_df = read(path)
+
+            # Assert
+            self.assertIsNone(actual_df["labelIds"][0])
+            self.assertListEqual(["12", "1,2"], actual_df["labelIds"][1:].tolist())
+
+    def test_xlsx_sink_write_blocks__when_blocks_are_given__expect_one_header_and_styled_rows(self):
+        # Arrange
+        expected_rows = [
+            ("kurzname", "hu", "rnr"),
+            ("A", "2022-11-15", 1),
+            ("B", "2022-01-01", 2),
+            ("A", "2022-11-15", 1)
+        ]
+        path = self._get_path("xlsx")
+        blocks = [(self.df, pd.Series(["007500", None]), None), (self.df.iloc[:1], pd.Series(["b30000"]), None)]
+
+        # Act
+        rows_count = XlsxSink("native").write_blocks(iter(blocks), path)
+        ws = openpyxl.load_workbook(path).active
+        actual_rows = list(ws.iter_rows(values_only=True))
+        actual_fill_colors = [row[0].fill.fgColor.rgb for row in ws.iter_rows(min_row=2)]
+
+        # Assert
+        self.assertEqual(3, rows_count)
+        self.assertListEqual(expected_rows, actual_rows)
+        self.assertListEqual(["00007500", "00000000", "00b30000"], actual_fill_colors)
+        self.assertTrue(ws["A1"].font.b)
+
+    def test_csv_sink_write_blocks__when_blocks_are_given__expect_same_df_as_concatenated(self):
+        # Arrange
+        path = self._get_path("csv")
+        blocks = [(self.df, None, None), (self.df, None, None)]
+
+        # Act
+        rows_count = CsvSink().write_blocks(iter(blocks), path)
+        actual_df = pd.read_csv(path, sep=";")
+
+        # Assert
+        self.assertEqual(4, rows_count)
+        pd.testing.assert_frame_equal(pd.concat([self.df, self.df], ignore_index=True), actual_df)
+
+    @skipUnless(HAS_PYARROW, "pyarrow is not installed")
+    def test_parquet_sink_write_blocks__when_blocks_are_given__expect_same_df_as_concatenated(self):
+        # Arrange
+        path = self._get_path("parquet")
+        blocks = [(self.df, None, None), (self.df.iloc[1:], None, None)]
+
+        # Act
+        rows_count = ParquetSink().write_blocks(iter(blocks), path)
+        actual_df = pd.read_parquet(path)
+
+        # Assert
+        self.assertEqual(3, rows_count)
+        pd.testing.assert_frame_equal(pd.concat([self.df, self.df.iloc[1:]], ignore_index=True), actual_df)
+
+    def test_get_sink__when_xlsx_engine_is_not_given__expect_openpyxl_engine(self):
+        # Act
+        sink = get_sink("xlsx")
+
+        # Assert
+        self.assertEqual("openpyxl", sink.engine)
+
+    def test_output_sink__when_write_is_not_implemented__expect_type_error(self):
+        # Arrange
+        class IncompleteSink(OutputSink):
+            extension = "txt"
+
+        # Act & Assert
+        with self.assertRaises(TypeError):
+            IncompleteSink()
+
+    def test_csv_sink_write_partitioned_sheets__when_called__expect_not_implemented_error(self):
+        # Act & Assert
+        with self.assertRaises(NotImplementedError):
+            get_sink("csv").write_partitioned_sheets([], self._get_path("csv"))
+
+    def test_xlsx_sink__when_engine_is_unknown__expect_value_error(self):
+        # Act & Assert
+        with self.assertRaises(ValueError):
+            get_sink("xlsx", "xlsxwriter")
+
+    def test_xlsx_sink_write_partitioned_sheets__when_titles_collide__expect_numbered_titles(self):
+        # Arrange
+        path = self._get_path("xlsx")
+        df = pd.DataFrame({"gruppe": ["LKW/1", "LKW:1", "PKW"], "kurzname": ["A", "B", "C"]})
+
+        # Act
+        get_sink("xlsx", "native").write_partitioned_sheets(split_into_partitions(df, "gruppe"), path)
+        wb = openpyxl.load_workbook(path)
+
+        # Assert
+        self.assertListEqual(["LKW_1", "LKW_11", "PKW"], wb.sheetnames)
+        self.assertListEqual([("gruppe", "kurzname"), ("LKW:1", "B")], list(wb["LKW_11"].iter_rows(values_only=True)))
+
+    def test_xlsx_sink_write_partitioned_sheets__when_engine_is_openpyxl__expect_styled_sheet_per_partition(self):
+        # Arrange
+        path = self._get_path("xlsx")
+        df = pd.DataFrame({"gruppe": ["LKW", "PKW"], "kurzname": ["A", "C"]})
+        partitions = split_into_partitions(df, "gruppe", pd.Series(["007500", "FFA500"]))
+
+        # Act
+        XlsxSink("openpyxl").write_partitioned_sheets(partitions, path, 2)
+        wb = openpyxl.load_workbook(path)
+
+        # Assert
+        self.assertListEqual(["LKW", "PKW"], wb.sheetnames)
+        self.assertListEqual([("gruppe", "kurzname"), ("PKW", "C")], list(wb["PKW"].iter_rows(values_only=True)))
+        self.assertEqual("00FFA500", wb["PKW"].cell(row=2, column=1).fill.fgColor.rgb)
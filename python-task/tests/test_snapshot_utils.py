@@ -0,0 +1,90 @@
+import os
+import tempfile
+from unittest import TestCase
+
+import pandas as pd
+
+from utils.snapshot_utils import *
+
+
+class SnapshotUtilsTests(TestCase):
+    _KEY_COLUMN = "kurzname"
+
+    def setUp(self):
+        self.local_df = pd.DataFrame({self._KEY_COLUMN: ["A", "B", "C"], "gruppe": ["LKW", "PKW", "LKW"]})
+        self.request_df = pd.DataFrame({self._KEY_COLUMN: ["A", "B", "D"], "hu": ["2022-11-15", None, "2022-01-01"]})
+
+    def test_get_rows_hashes__when_dfs_are_unchanged__expect_same_hashes(self):
+        # Act
+        first_hashes = get_rows_hashes([self.local_df, self.request_df], self._KEY_COLUMN)
+        second_hashes = get_rows_hashes([self.local_df.copy(), self.request_df.copy()], self._KEY_COLUMN)
+
+        # Assert
+        self.assertListEqual(["A", "B", "C", "D"], first_hashes.index.tolist())
+        pd.testing.assert_series_equal(first_hashes, second_hashes)
+
+    def test_get_rows_hashes__when_only_dtypes_change__expect_same_hashes(self):
+        # Arrange
+        local_df = self.local_df.assign(rnr=pd.Series([1, 2, 3], dtype="int8"), gb1=pd.Series([0.5, 1.0, None]))
+        compact_local_df = local_df.assign(
+            rnr=local_df["rnr"].astype("int16"),
+            gb1=local_df["gb1"].astype("float32"),
+            gruppe=local_df["gruppe"].astype("category")
+        )
+
+        # Act
+        first_hashes = get_rows_hashes([local_df, self.request_df], self._KEY_COLUMN)
+        second_hashes = get_rows_hashes([compact_local_df, self.request_df], self._KEY_COLUMN)
+
+        # Assert
+        pd.testing.assert_series_equal(first_hashes, second_hashes)
+
+    def test_get_changed_keys__when_rows_are_changed_and_added__expect_only_their_keys(self):
+        # Arrange
+        expected_keys = ["B", "E"]
+        previous_hashes = get_rows_hashes([self.local_df, self.request_df], self._KEY_COLUMN)
+
+        # Act
+        self.request_df.loc[1, "hu"] = "2022-12-01"
+        local_df = pd.concat([self.local_df, pd.DataFrame({self._KEY_COLUMN: ["E"], "gruppe": ["LKW"]})])
+        current_hashes = get_rows_hashes([local_df, self.request_df], self._KEY_COLUMN)
+        actual_keys = get_changed_keys(previous_hashes, current_hashes).tolist()
+
+        # Assert
+        self.assertListEqual(expected_keys, actual_keys)
+
+    def test_get_changed_keys__when_row_without_key_is_changed__expect_null_key(self):
+        # Arrange
+        self.local_df.loc[1, self._KEY_COLUMN] = None
+        previous_hashes = get_rows_hashes([self.local_df, self.request_df], self._KEY_COLUMN)
+
+        # Act
+        self.local_df.loc[1, "gruppe"] = "LKW"
+        current_hashes = get_rows_hashes([self.local_df, self.request_df], self._KEY_COLUMN)
+        actual_keys = get_changed_keys(previous_hashes, current_hashes)
+
+        # Assert
+        self.assertEqual(1, len(actual_keys))
+        self.assertTrue(pd.isnull(actual_keys[0]))
+
+    def test_save_snapshot__when_snapshot_is_loaded__expect_same_snapshot(self):
+        # Arrange
+        snapshot = {"hashes": get_rows_hashes([self.local_df], self._KEY_COLUMN), "clean_df": self.local_df}
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, "cache", "snapshot.pkl")
+
+            # Act
+            save_snapshot(path, snapshot)
+            actual_snapshot = load_snapshot(path)
+
+        # Assert
+        pd.testing.assert_series_equal(snapshot["hashes"], actual_snapshot["hashes"])
+        pd.testing.assert_frame_equal(snapshot["clean_df"], actual_snapshot["clean_df"])
+
+    def test_load_snapshot__when_file_does_not_exist__expect_none(self):
+        # Act
+        actual_snapshot = load_snapshot("missing/snapshot.pkl")
+
+        # Assert
+        self.assertIsNone(actual_snapshot)
@@ -0,0 +1,127 @@
+import os
+import tempfile
+from typing import Iterator
+from unittest import TestCase
+
+import numpy as np
+import pandas as pd
+
+from utils.data_utils import coalesce_merge_dataframes, filter_rows_with_null_values_from_df
+from utils.spill_utils import *
+
+
+def iter_chunks(df: pd.DataFrame, chunk_rows: int) -> Iterator[pd.DataFrame]:
+    for start in range(0, len(df.index), chunk_rows):
+        yield df.iloc[start:start + chunk_rows]
+
+
+class SpillUtilsTests(TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        rng = np.random.default_rng(0)
+        groups = np.array(["LKW", "PKW", "Anhänger", "Büro", None], dtype=object)
+        self.left_df = pd.DataFrame({
+            "kurzname": [f"K{i}" for i in range(1000)],
+            "gruppe": groups[rng.integers(0, len(groups), 1000)]
+        })
+        self.right_df = pd.DataFrame({
+            "kurzname": [f"K{i}" for i in range(500, 1500)],
+            "rnr": np.arange(1000),
+            "hu": np.where(rng.random(1000) < 0.1, None, "2022-01-01"),
+            "gruppe": groups[rng.integers(0, len(groups), 1000)]
+        })
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def _merge_in_memory(self) -> pd.DataFrame:
+        merged_df = coalesce_merge_dataframes(self.left_df, self.right_df, "outer", "kurzname")
+        return filter_rows_with_null_values_from_df(merged_df, "hu")
+
+    def test_spill_partitions__when_chunks_are_spilled__expect_every_key_in_one_partition(self):
+        # Act
+        partitions, empty_df = spill_partitions(iter_chunks(self.left_df, 300), "kurzname", 4, self.temp_dir.name)
+        partition_keys = [
+            set(pd.concat([pd.read_pickle(path) for path in paths])["kurzname"]) for paths, _ in partitions
+        ]
+
+        # Assert
+        self.assertListEqual(["kurzname", "gruppe"], empty_df.columns.tolist())
+        self.assertEqual(1000, sum(len(keys) for keys in partition_keys))
+        self.assertEqual(set(self.left_df["kurzname"]), set.union(*partition_keys))
+        self.assertTrue(all(size > 0 for _, size in partitions))
+
+    def test_merge_and_sort_out_of_core__when_budget_is_small__expect_same_rows_as_in_memory_sorted(self):
+        # Arrange
+        expected_df = self._merge_in_memory()
+
+        # Act
+        blocks = merge_and_sort_out_of_core(
+            iter_chunks(self.left_df, 100),
+            iter_chunks(self.right_df, 100),
+            "outer",
+            "kurzname",
+            "hu",
+            "gruppe",
+            memory_budget=200000,
+            directory=self.temp_dir.name,
+            partitions_count=4
+        )
+        actual_df = pd.concat(list(blocks), ignore_index=True)
+        actual_groups = actual_df["gruppe"]
+        not_null_groups = actual_groups.dropna().tolist()
+
+        # Assert
+        self.assertListEqual(sorted(not_null_groups), not_null_groups)
+        self.assertTrue(actual_groups.iloc[len(not_null_groups):].isnull().all())
+        pd.testing.assert_frame_equal(
+            expected_df.sort_values("kurzname", ignore_index=True),
+            actual_df.sort_values("kurzname", ignore_index=True),
+            check_dtype=False
+        )
+
+    def test_merge_and_sort_out_of_core__when_blocks_are_read__expect_no_spilled_files_left_but_runs(self):
+        # Act
+        blocks = merge_and_sort_out_of_core(
+            iter_chunks(self.left_df, 100),
+            iter_chunks(self.right_df, 100),
+            "outer",
+            "kurzname",
+            "hu",
+            "gruppe",
+            memory_budget=200000,
+            directory=self.temp_dir.name,
+            partitions_count=4
+        )
+        spilled_files = [
+            name for root, _, names in os.walk(self.temp_dir.name) for name in names if "runs" not in root
+        ]
+        rows_count = sum(len(block.index) for block in blocks)
+
+        # Assert
+        self.assertListEqual([], spilled_files)
+        self.assertEqual(len(self._merge_in_memory().index), rows_count)
+
+    def test_merge_sorted_runs__when_runs_overlap__expect_sorted_blocks(self):
+        # Arrange
+        runs = []
+        for i, values in enumerate([["A", "C", "E", "G"], ["B", "C", "D"], ["F"]]):
+            paths = []
+            for j, start in enumerate(range(0, len(values), 2)):
+                path = os.path.join(self.temp_dir.name, f"{i}_{j}.pkl")
+                pd.DataFrame({"gruppe": values[start:start + 2]}).to_pickle(path)
+                paths.append(path)
+            runs.append(paths)
+
+        # Act
+        actual_values = pd.concat(list(merge_sorted_runs(runs, "gruppe")))["gruppe"].tolist()
+
+        # Assert
+        self.assertListEqual(["A", "B", "C", "C", "D", "E", "F", "G"], actual_values)
+
+    def test_get_rows_per_budget__when_budget_is_smaller_than_a_row__expect_one_row(self):
+        # Act
+        rows_count = get_rows_per_budget(self.left_df, memory_budget=1)
+
+        # Assert
+        self.assertEqual(1, rows_count)
@@ -0,0 +1,199 @@
+import os
+import tempfile
+from unittest import TestCase
+from zipfile import ZipFile
+
+import numpy as np
+import openpyxl
+import pandas as pd
+
+from utils.sink_utils import XlsxSink
+from utils.xlsx_utils import *
+
+
+class XlsxUtilsTests(TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.df = pd.DataFrame({
+            "kurzname": ["A", " B&<C> ", None],
+            "hu": pd.to_datetime(["2022-11-15", "2022-01-01", None]),
+            "rnr": np.array([1, 2, 3], dtype=np.int16),
+            "gb1": [1.5, None, 0.1],
+            "gb2": [123.0, -4.0, 0.1 + 0.2],
+            "gruppe": pd.Categorical(["LKW", "LKW", None]),
+            "aktiv": [True, False, True]
+        })
+        self.fill_color_codes = pd.Series(["007500", None, "b30000"])
+        self.font_color_codes = pd.Series([None, "#FF0000", "#FF0000"])
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def _get_path(self, name: str) -> str:
+        return os.path.join(self.temp_dir.name, name)
+
+    def test_write_styled_dataframe_to_stream__when_df_is_written__expect_same_cells_as_openpyxl_engine(self):
+        # Arrange
+        native_path = self._get_path("native.xlsx")
+        openpyxl_path = self._get_path("openpyxl.xlsx")
+        XlsxSink("openpyxl").write(self.df, openpyxl_path, self.fill_color_codes, self.font_color_codes)
+        expected_ws = openpyxl.load_workbook(openpyxl_path).active
+
+        # Act
+        with XlsxStreamWriter(native_path) as writer:
+            write_styled_dataframe_to_stream(self.df, writer, self.fill_color_codes, self.font_color_codes)
+        actual_ws = openpyxl.load_workbook(native_path).active
+
+        # Assert
+        self.assertEqual(expected_ws.title, actual_ws.title)
+        self.assertListEqual(
+            list(expected_ws.iter_rows(values_only=True)),
+            list(actual_ws.iter_rows(values_only=True))
+        )
+        for expected_row, actual_row in zip(expected_ws.iter_rows(), actual_ws.iter_rows()):
+            for expected_cell, actual_cell in zip(expected_row, actual_row):
+                # Integral floats are read back as int if they are written without the fraction
+                self.assertIs(type(expected_cell.value), type(actual_cell.value))
+                self.assertEqual(expected_cell.fill.fgColor.rgb, actual_cell.fill.fgColor.rgb)
+                self.assertEqual(expected_cell.font.color, actual_cell.font.color)
+                self.assertEqual(expected_cell.font.b, actual_cell.font.b)
+                self.assertEqual(expected_cell.border.left.style, actual_cell.border.left.style)
+                self.assertEqual(expected_cell.alignment.horizontal, actual_cell.alignment.horizontal)
+
+    def test_xlsx_stream_writer__when_strings_repeat__expect_every_string_shared_once(self):
+        # Arrange
+        path = self._get_path("vehicles.xlsx")
+        df = pd.DataFrame({"gruppe": ["LKW", "PKW", "LKW", "LKW"]})
+
+        # Act
+        with XlsxStreamWriter(path) as writer:
+            writer.write_header(df.columns)
+            writer.write_rows(df)
+        with ZipFile(path) as archive:
+            shared_strings_xml = archive.read("xl/sharedStrings.xml").decode()
+        ws = openpyxl.load_workbook(path).active
+
+        # Assert
+        self.assertIn('uniqueCount="3"', shared_strings_xml)
+        self.assertListEqual(
+            [("gruppe",), ("LKW",), ("PKW",), ("LKW",), ("LKW",)],
+            list(ws.iter_rows(values_only=True))
+        )
+
+    def test_xlsx_stream_writer__when_strings_are_inline__expect_no_shared_strings(self):
+        # Arrange
+        path = self._get_path("vehicles.xlsx")
+
+        # Act
+        with XlsxStreamWriter(path, shared_strings=False, compress_in_thread=False) as writer:
+            write_styled_dataframe_to_stream(self.df[["kurzname"]], writer)
+        with ZipFile(path) as archive:
+            names = archive.namelist()
+        ws = openpyxl.load_workbook(path).active
+
+        # Assert
+        self.assertNotIn("xl/sharedStrings.xml", names)
+        self.assertListEqual([("kurzname",), ("A",), (" B&<C> ",)], list(ws.iter_rows(values_only=True)))
+
+    def test_xlsx_stream_writer__when_rows_span_chunks_and_sheets__expect_all_rows_in_their_sheets(self):
+        # Arrange
+        path = self._get_path("vehicles.xlsx")
+        rows_count = ROWS_PER_CHUNK + 5
+        df = pd.DataFrame({"rnr": np.arange(rows_count), "kurzname": [f"K{i % 7}" for i in range(rows_count)]})
+
+        # Act
+        with XlsxStreamWriter(path) as writer:
+            writer.add_sheet("LKW")
+            write_styled_dataframe_to_stream(df, writer, pd.Series(["007500"] * rows_count))
+            writer.add_sheet("PKW & Kombi")
+            write_styled_dataframe_to_stream(df.iloc[:2], writer)
+        wb = openpyxl.load_workbook(path)
+        last_row = list(wb["LKW"].iter_rows(min_row=rows_count + 1))[0]
+
+        # Assert
+        self.assertListEqual(["LKW", "PKW & Kombi"], wb.sheetnames)
+        self.assertEqual(rows_count + 1, wb["LKW"].max_row)
+        self.assertListEqual([rows_count - 1, f"K{(rows_count - 1) % 7}"], [cell.value for cell in last_row])
+        self.assertEqual("00007500", last_row[1].fill.fgColor.rgb)
+        self.assertListEqual(
+            [("rnr", "kurzname"), (0, "K0"), (1, "K1")],
+            list(wb["PKW & Kombi"].iter_rows(values_only=True))
+        )
+
+    def test_xlsx_stream_writer__when_writing_fails__expect_partial_workbook_deleted(self):
+        # Arrange
+        path = self._get_path("vehicles.xlsx")
+
+        # Act
+        with self.assertRaises(RuntimeError):
+            with XlsxStreamWriter(path) as writer:
+                write_styled_dataframe_to_stream(self.df, writer, self.fill_color_codes)
+                raise RuntimeError("Rendering failed")
+
+        # Assert
+        self.assertFalse(os.path.exists(path))
+
+    def test_xlsx_stream_writer__when_color_code_is_not_hex__expect_value_error_like_openpyxl_engine(self):
+        # Arrange
+        path = self._get_path("vehicles.xlsx")
+        openpyxl_path = self._get_path("openpyxl.xlsx")
+        font_color_codes = pd.Series([None, "", "#FF0000"])
+
+        # Act & Assert
+        with self.assertRaises(ValueError):
+            XlsxSink("openpyxl").write(self.df, openpyxl_path, font_color_codes=font_color_codes)
+        with self.assertRaises(ValueError):
+            XlsxSink("native").write(self.df, path, font_color_codes=font_color_codes)
+        self.assertFalse(os.path.exists(path))
+
+    def test_build_rows_xml__when_sheets_are_built_apart__expect_same_sheets_as_streamed(self):
+        # Arrange
+        streamed_path = self._get_path("streamed.xlsx")
+        built_path = self._get_path("built.xlsx")
+        partitions = [
+            ("LKW", self.df, self.fill_color_codes, self.font_color_codes),
+            ("PKW", self.df.iloc[:1], pd.Series(["FFA500"]), None)
+        ]
+        with XlsxStreamWriter(streamed_path) as writer:
+            for title, df, fill, font in partitions:
+                writer.add_sheet(title)
+                write_styled_dataframe_to_stream(df, writer, fill, font)
+        expected_wb = openpyxl.load_workbook(streamed_path)
+
+        # Act
+        with XlsxStreamWriter(built_path) as writer:
+            sheets_xml = [
+                build_rows_xml(df, fill, font, *writer.register_rows(df, fill, font))
+                for _, df, fill, font in partitions
+            ]
+            for (title, _, _, _), rows_xml in zip(partitions, sheets_xml):
+                writer.add_sheet_xml(title, rows_xml)
+        with ZipFile(built_path) as archive:
+            sheet_xml = archive.read("xl/worksheets/sheet1.xml").decode()
+        actual_wb = openpyxl.load_workbook(built_path)
+
+        # Assert
+        self.assertNotIn("inlineStr", sheet_xml)
+        self.assertListEqual(expected_wb.sheetnames, actual_wb.sheetnames)
+        for expected_ws, actual_ws in zip(expected_wb, actual_wb):
+            for expected_row, actual_row in zip(expected_ws.iter_rows(), actual_ws.iter_rows()):
+                self.assertListEqual([cell.value for cell in expected_row], [cell.value for cell in actual_row])
+                self.assertListEqual(
+                    [(cell.fill.fgColor.rgb, cell.font.color, cell.font.b) for cell in expected_row],
+                    [(cell.fill.fgColor.rgb, cell.font.color, cell.font.b) for cell in actual_row]
+                )
+
+    def test_build_rows_xml__when_string_is_not_registered__expect_string_written_inline(self):
+        # Arrange
+        path = self._get_path("vehicles.xlsx")
+        df = pd.DataFrame({"kurzname": ["A", "B"]})
+
+        # Act
+        with XlsxStreamWriter(path) as writer:
+            strings, styles = writer.register_rows(df.iloc[:1])
+            writer.add_sheet_xml("Sheet", build_rows_xml(df, None, None, strings, styles))
+        ws = openpyxl.load_workbook(path).active
+
+        # Assert
+        self.assertDictEqual({"kurzname": 0, "A": 1}, strings)
+        self.assertListEqual([("kurzname",), ("A",), ("B",)], list(ws.iter_rows(values_only=True)))
@@ -0,0 +1,136 @@
+import json
+import os
+import time
+from collections import OrderedDict
+from typing import Callable, Tuple
+
+from logger import logger
+
+
+class LabelColorCache:
+    """
+    Persistent label id -> color code cache with TTL and LRU eviction.
+
+    Ids that couldn't be resolved are cached as well (with None as
+    color code), so they are not requested again until they expire.
+
+    Parameters
+    ----------
+    path: str
+        Path of the JSON file to load the cache from and save it to.
+    ttl: float
+        Seconds after which an entry expires.
+    max_size: int
+        Maximum count of entries, the least recently used are evicted first.
+    negative_ttl: float | None
+        Seconds after which an unresolved id expires, same as ttl if None.
+    clock: Callable[[], float]
+        Function returning the current time in seconds.
+    """
+
+    def __init__(
+            self,
+            path: str,
+            ttl: float,
+            max_size: int = 1024,
+            negative_ttl: float | None = None,
+            clock: Callable[[], float] = time.time
+    ):
+        self.path = path
+        self.ttl = ttl
+        self.max_size = max_size
+        self.negative_ttl = ttl if negative_ttl is None else negative_ttl
+        self._clock = clock
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+        self._load()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, label_id) -> Tuple[bool, str | None]:
+        """
+        Gets the cached color code of label id.
+
+        Parameters
+        ----------
+        label_id: Any
+            Id of the label.
+
+        Returns
+        -------
+        result: Tuple[bool, str | None]
+            Whether the id was found in the cache and its color code.
+        """
+        key = str(label_id)
+        entry = self._entries.get(key)
+
+        if entry is not None:
+            color_code, stored_at = entry
+            ttl = self.ttl if color_code is not None else self.negative_ttl
+            if self._clock() - stored_at < ttl:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return True, color_code
+
+            del self._entries[key]
+
+        self.misses += 1
+        return False, None
+
+    def set(self, label_id, color_code: str | None) -> None:
+        """
+        Caches the color code of label id, None if it couldn't be resolved.
+
+        Parameters
+        ----------
+        label_id: Any
+            Id of the label.
+        color_code: str | None
+            Color code of the label.
+
+        Returns
+        -------
+        None
+        """
+        key = str(label_id)
+        self._entries[key] = (color_code, self._clock())
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def save(self) -> None:
+        """
+        Saves the cache entries to the cache file.
+
+        Returns
+        -------
+        None
+        """
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as file:
+            json.dump([[key, color_code, stored_at] for key, (color_code, stored_at) in self._entries.items()], file)
+        os.replace(tmp_path, self.path)
+
+        logger.info(f"Label color cache saved - {self.hits} hits, {self.misses} misses.")
+
+    def _load(self) -> None:
+        if not os.path.exists(self.path):
+            return
+
+        try:
+            with open(self.path) as file:
+                entries = json.load(file)
+        except (OSError, ValueError):
+            logger.info(f"Couldn't load label color cache from {self.path}.")
+            return
+
+        for key, color_code, stored_at in entries[-self.max_size:]:
+            self._entries[key] = (color_code, stored_at)
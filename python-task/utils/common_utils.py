@@ -1,3 +1,51 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+# Imported by the command line entry points before the arguments are parsed, so numpy and pandas are imported lazily
+if TYPE_CHECKING:
+    import pandas as pd
+
+OUTPUT_FORMATS = ["xlsx", "csv", "parquet", "feather"]
+PARTITION_MODES = ["sheets", "files"]
+# The native engine streams the sheet XML from the DataFrame columns, openpyxl builds a cell object per value
+XLSX_ENGINES = ["native", "openpyxl"]
+
+_TRUE_VALUES = {"1", "true", "t", "yes", "y", "on"}
+_FALSE_VALUES = {"0", "false", "f", "no", "n", "off"}
+
+_GREEN_COLOR_CODE = "007500"
+_ORANGE_COLOR_CODE = "FFA500"
+_RED_COLOR_CODE = "b30000"
+
+
+def string_to_bool(value: str) -> bool:
+    """
+    Converts string like "True", "yes" or "0" to bool.
+
+    Parameters
+    ----------
+    value: str
+        The bool as string.
+
+    Returns
+    -------
+    result: bool
+        The bool.
+
+    Raises
+    ------
+    ValueError
+        If the string is not a bool.
+    """
+    if value.lower() in _TRUE_VALUES:
+        return True
+    if value.lower() in _FALSE_VALUES:
+        return False
+
+    raise ValueError(f"Invalid bool {value}.")
+
+
 def get_color_code_by_number(number: int) -> str:
     """
     Gets the color code depending on the given number.
@@ -13,8 +61,35 @@ def get_color_code_by_number(number: int) -> str:
         The code of color
     """
     if number <= 3:
-        return "007500"
+        return _GREEN_COLOR_CODE
     elif number <= 12:
-        return "FFA500"
+        return _ORANGE_COLOR_CODE
+
+    return _RED_COLOR_CODE
+
+
+def get_color_codes_by_numbers(numbers: pd.Series) -> pd.Series:
+    """
+    Gets the color code depending on every number, the same way as get_color_code_by_number.
+
+    Parameters
+    ----------
+    numbers: pd.Series
+        Comparison numbers, NaN for none.
+
+    Returns
+    -------
+    Color codes: pd.Series
+        The code of color for every number, None for NaN.
+    """
+    import numpy as np
+    import pandas as pd
+
+    values = numbers.to_numpy(dtype=np.float64)
+    color_codes = np.select(
+        [values <= 3, values <= 12, values > 12],
+        [_GREEN_COLOR_CODE, _ORANGE_COLOR_CODE, _RED_COLOR_CODE],
+        None
+    )
 
-    return "b30000"
+    return pd.Series(color_codes, index=numbers.index)
@@ -0,0 +1,144 @@
+import mmap
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from io import BytesIO
+from typing import List, Tuple
+
+import pandas as pd
+
+from logger import logger
+
+_QUOTE = b'"'
+_NEWLINE = b"\n"
+_COUNT_BLOCK_SIZE = 64 * 1024 * 1024
+
+
+def _count_quotes(mm: mmap.mmap, start: int, end: int) -> int:
+    """
+    Counts the quote characters between two offsets of memory-mapped file, block by block.
+    """
+    count = 0
+    for block_start in range(start, end, _COUNT_BLOCK_SIZE):
+        count += mm[block_start:min(block_start + _COUNT_BLOCK_SIZE, end)].count(_QUOTE)
+
+    return count
+
+
+def _find_record_end(mm: mmap.mmap, start: int, quotes_count: int) -> Tuple[int, int]:
+    """
+    Finds the end of the first record ending at or after the offset, skipping newlines inside quoted fields.
+
+    A newline is a record boundary if the count of quotes before it is even,
+    as escaped quotes ("") inside quoted fields don't change the parity.
+
+    Returns the offset after the newline (or the file size) and the count of quotes before it.
+    """
+    position = start
+    while True:
+        newline = mm.find(_NEWLINE, position)
+        if newline == -1:
+            return len(mm), quotes_count + _count_quotes(mm, position, len(mm))
+
+        quotes_count += _count_quotes(mm, position, newline)
+        position = newline + 1
+        if quotes_count % 2 == 0:
+            return position, quotes_count
+
+
+def find_record_boundaries(path: str, chunk_size: int) -> Tuple[int, List[Tuple[int, int]]]:
+    """
+    Splits CSV file into chunks of whole records, respecting quoted multi-line fields.
+
+    Parameters
+    ----------
+    path : str
+        Path of the CSV file.
+    chunk_size : int
+        Approximate size of a chunk in bytes.
+
+    Returns
+    -------
+    boundaries : Tuple[int, List[Tuple[int, int]]]
+        End offset of the header and start and end offsets of every chunk.
+    """
+    with open(path, "rb") as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        file_size = len(mm)
+        header_end, quotes_count = _find_record_end(mm, 0, 0)
+
+        chunks = []
+        chunk_start = header_end
+        while chunk_start < file_size:
+            target = min(chunk_start + chunk_size, file_size)
+            if target < file_size:
+                quotes_count += _count_quotes(mm, chunk_start, target)
+                chunk_end, quotes_count = _find_record_end(mm, target, quotes_count)
+            else:
+                chunk_end = file_size
+            chunks.append((chunk_start, chunk_end))
+            chunk_start = chunk_end
+
+    return header_end, chunks
+
+
+def _read_csv_chunk(path: str, start: int, end: int, sep: str, names: List[str], kwargs: dict) -> pd.DataFrame:
+    """
+    Parses the records between two offsets of CSV file.
+    """
+    with open(path, "rb") as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        data = mm[start:end]
+
+    return pd.read_csv(BytesIO(data), sep=sep, header=None, names=names, **kwargs)
+
+
+def read_csv_in_parallel(
+        path: str,
+        sep: str = ",",
+        workers: int | None = None,
+        chunk_size: int = 64 * 1024 * 1024,
+        **kwargs
+) -> pd.DataFrame:
+    """
+    Reads CSV file into DataFrame, parsing chunks of
+    whole records across a process pool.
+
+    Files smaller than a chunk are read in the current process.
+
+    Parameters
+    ----------
+    path : str
+        Path of the CSV file.
+    sep : str
+        Delimiter of the fields.
+    workers : int | None
+        Count of processes, the count of CPUs if None.
+    chunk_size : int
+        Approximate size of a chunk in bytes.
+    kwargs : Any
+        Other arguments to pass to pd.read_csv.
+
+    Returns
+    -------
+    df : pd.DataFrame
+        DataFrame with the records of the file.
+    """
+    if os.path.getsize(path) <= chunk_size:
+        return pd.read_csv(path, sep=sep, **kwargs)
+
+    header_end, chunks = find_record_boundaries(path, chunk_size)
+    with open(path, "rb") as file:
+        names = pd.read_csv(BytesIO(file.read(header_end)), sep=sep, nrows=0).columns.tolist()
+
+    # Resolve callable usecols against the header, so that the workers get a picklable list
+    if callable(kwargs.get("usecols")):
+        kwargs["usecols"] = [name for name in names if kwargs["usecols"](name)]
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        read_chunk = partial(_read_csv_chunk, path, sep=sep, names=names, kwargs=kwargs)
+        chunk_dfs = list(executor.map(read_chunk, *zip(*chunks)))
+
+    df = pd.concat(chunk_dfs, ignore_index=True) if chunk_dfs else pd.DataFrame(columns=kwargs.get("usecols", names))
+
+    logger.info(f"Read {len(df.index)} records from {path} in {len(chunks)} chunks.")
+
+    return df
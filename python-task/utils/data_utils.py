@@ -1,16 +1,80 @@
-from typing import List, Dict, Any
+from __future__ import annotations
 
-import openpyxl
+from concurrent.futures import ThreadPoolExecutor
+from copy import copy
+from itertools import islice
+from typing import TYPE_CHECKING, Any, Collection, Dict, Iterable, List, Tuple
+
+import numpy as np
 import pandas as pd
-from openpyxl.styles import PatternFill
-from openpyxl.utils.dataframe import dataframe_to_rows
+
+# openpyxl is imported by the functions writing Worksheets, so that the other output formats don't load it,
+# and requests by the functions requesting the label colors, so that writing the output doesn't load it
+if TYPE_CHECKING:
+    import openpyxl
+    from openpyxl.styles.cell_style import StyleArray
 
 from logger import logger
-from utils.common_utils import get_color_code_by_number
+from utils.cache_utils import LabelColorCache
+from utils.common_utils import get_color_codes_by_numbers
 from utils.datetime_utils import *
-from utils.request_utils import get_request_resource_as_json
+from utils.metrics_utils import track_stage
+
+
+@track_stage
+def records_to_dataframe(
+        records: Iterable[dict],
+        batch_size: int = 10000,
+        columns: Collection[str] | None = None
+) -> pd.DataFrame:
+    """
+    Builds DataFrame from records, converting every fixed-size batch
+    of records into typed column arrays before reading the next one.
+
+    Parameters
+    ----------
+    records : Iterable[dict]
+        Records with the column values.
+    batch_size : int
+        Count of records in a batch.
+    columns : Collection[str] | None
+        Names of the fields to keep, all fields if None.
+
+    Returns
+    -------
+    new_df : pd.DataFrame
+        DataFrame with the records as rows.
+    """
+    records = iter(records)
+    column_batches = {}
+    rows_count = 0
+
+    for batch in iter(lambda: list(islice(records, batch_size)), []):
+        batch_columns = dict.fromkeys(
+            key for record in batch for key in record if columns is None or key in columns
+        )
+        for column in batch_columns:
+            if column not in column_batches:
+                column_batches[column] = [pd.Series([None] * rows_count, dtype=object)] if rows_count else []
+            column_batches[column].append(pd.Series([record.get(column) for record in batch]))
+
+        for column, batches in column_batches.items():
+            if column not in batch_columns:
+                batches.append(pd.Series([None] * len(batch), dtype=object))
 
+        rows_count += len(batch)
 
+    new_df = pd.DataFrame({
+        column: pd.concat(batches, ignore_index=True) if len(batches) > 1 else batches[0]
+        for column, batches in column_batches.items()
+    })
+
+    logger.info(f"Built DataFrame from {rows_count} records.")
+
+    return new_df
+
+
+@track_stage
 def merge_dataframes(
         left_df: pd.DataFrame,
         right_df: pd.DataFrame,
@@ -46,6 +110,88 @@ def merge_dataframes(
     return new_df
 
 
+def _to_categorical(values: pd.Series) -> pd.Series:
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        return values
+
+    return values.astype(object).astype("category")
+
+
+@track_stage
+def coalesce_merge_dataframes(
+        left_df: pd.DataFrame,
+        right_df: pd.DataFrame,
+        merge_type: str,
+        merge_column: str
+) -> pd.DataFrame:
+    """
+    Merges two dataframes by given column, taking the values of
+    overlapping columns from the left DataFrame and falling back
+    to the right DataFrame's values where they are Null.
+
+    Parameters
+    ----------
+    left_df : pd.DataFrame
+        First DataFrame to merge, its values are preferred.
+    right_df : pd.DataFrame
+        Second DataFrame to merge with.
+    merge_type : str
+        How to merge the two DataFrames.
+    merge_column: str
+        Column name to join on.
+
+    Returns
+    -------
+    new_df : pd.DataFrame
+        The merged DataFrame with one column per column name.
+    """
+    # Merge only the keys with the row positions, then gather every column once by position
+    positions_df = pd.DataFrame({merge_column: left_df[merge_column], "_left": np.arange(len(left_df.index))}).merge(
+        pd.DataFrame({merge_column: right_df[merge_column], "_right": np.arange(len(right_df.index))}),
+        how=merge_type,
+        on=merge_column
+    )
+    left_positions = positions_df["_left"].fillna(-1).to_numpy(dtype=np.int64)
+    right_positions = positions_df["_right"].fillna(-1).to_numpy(dtype=np.int64)
+
+    def take(df: pd.DataFrame, column: str, positions: np.ndarray) -> pd.Series:
+        # Taken from the array of the column to keep categorical, string and datetime dtypes
+        return pd.Series(df[column].array.take(positions, allow_fill=True), name=column)
+
+    columns = {}
+    for column in left_df.columns:
+        if column == merge_column:
+            columns[column] = positions_df[merge_column]
+            continue
+
+        values = take(left_df, column, left_positions)
+        if column in right_df.columns:
+            is_null = values.isnull()
+            if is_null.any():
+                fallback_values = take(right_df, column, right_positions)
+                # Categoricals only coalesce into categorical with the same categories,
+                # the other side is made categorical too if only one of them is
+                dtypes = [values.dtype, fallback_values.dtype]
+                if any(isinstance(dtype, pd.CategoricalDtype) for dtype in dtypes):
+                    values = _to_categorical(values)
+                    fallback_values = _to_categorical(fallback_values)
+                    categories = values.cat.categories.union(fallback_values.cat.categories)
+                    values = values.cat.set_categories(categories)
+                    fallback_values = fallback_values.cat.set_categories(categories)
+                values = values.where(~is_null, fallback_values)
+        columns[column] = values
+
+    for column in right_df.columns.difference(left_df.columns, sort=False):
+        columns[column] = take(right_df, column, right_positions)
+
+    new_df = pd.DataFrame(columns)
+
+    logger.info("DataFrames merged and coalesced successfully!")
+
+    return new_df
+
+
+@track_stage
 def filter_rows_with_null_values_from_df(df: pd.DataFrame, column: str) -> pd.DataFrame:
     """
     Removes rows from DataFrame where value from given column is Null.
@@ -90,6 +236,7 @@ def get_common_columns_from_dfs(first_df: pd.DataFrame, second_df: pd.DataFrame)
     return common_columns
 
 
+@track_stage
 def replace_null_values_in_df(df: pd.DataFrame, common_columns: List[str], suffix: str) -> pd.DataFrame:
     """
     Compares the generated columns in DataFrame after merge
@@ -117,6 +264,7 @@ def replace_null_values_in_df(df: pd.DataFrame, common_columns: List[str], suffi
     return df
 
 
+@track_stage
 def drop_suffix_columns_from_df(df: pd.DataFrame, columns: List[str], suffix: str) -> pd.DataFrame:
     """
     Drops redundant columns from DataFrame generated after merge if any.
@@ -143,6 +291,7 @@ def drop_suffix_columns_from_df(df: pd.DataFrame, columns: List[str], suffix: st
     return new_df
 
 
+@track_stage
 def drop_mismatch_columns(df: pd.DataFrame, columns: List[str]):
     """
     Compares and drop columns from DataFrame
@@ -167,6 +316,7 @@ def drop_mismatch_columns(df: pd.DataFrame, columns: List[str]):
     return new_df
 
 
+@track_stage
 def sort_dataframe(df: pd.DataFrame, sort_columns: str | List[str], ascending: bool | List[bool]) -> pd.DataFrame:
     """
     Sorts DataFrame by given columns in given order.
@@ -192,12 +342,109 @@ def sort_dataframe(df: pd.DataFrame, sort_columns: str | List[str], ascending: b
     return new_df
 
 
-def write_data_from_pandas_dataframe_to_worksheet(
+@track_stage
+def parse_dates(dates: pd.Series) -> pd.Series:
+    """
+    Parses the dates, every distinct date string only once.
+
+    Parameters
+    ----------
+    dates: pd.Series
+        Array containing the dates as strings or already parsed as datetime64 values.
+
+    Returns
+    -------
+    parsed_dates: pd.Series
+        Array with the datetime64 value of every date.
+    """
+    if pd.api.types.is_datetime64_any_dtype(dates):
+        return dates
+
+    parsed_dates = strings_to_dates(dates)
+
+    return parsed_dates
+
+
+@track_stage
+def get_background_color_codes(dates: pd.Series, today: datetime) -> pd.Series:
+    """
+    Gets the background color code for every date
+    depending on months count between the date and today.
+
+    Parameters
+    ----------
+    dates: pd.Series
+        Array containing the dates as strings or as datetime64 values parsed by parse_dates.
+    today: datetime
+        End date
+
+    Returns
+    -------
+    color_codes: pd.Series
+        Array with the color code of every date.
+    """
+    if not pd.api.types.is_datetime64_any_dtype(dates):
+        dates = strings_to_dates(dates)
+
+    months_diff = get_months_diff_between_date_arrays(dates, today)
+    color_codes = get_color_codes_by_numbers(months_diff)
+
+    return color_codes
+
+
+def _get_cell_style(
+        ws: openpyxl.worksheet.worksheet.Worksheet,
+        fill_color_code: str | None,
+        font_color_code: str | None,
+        styles: Dict[tuple, StyleArray]
+) -> StyleArray:
+    """
+    Gets the shared style of a fill and font colors combination,
+    registering the PatternFill and Font in the Workbook only once.
+    """
+    from openpyxl.cell.cell import Cell
+    from openpyxl.styles import Font, PatternFill
+
+    key = (fill_color_code, font_color_code)
+    if key not in styles:
+        template_cell = Cell(ws)
+        if fill_color_code is not None:
+            template_cell.fill = PatternFill(start_color=fill_color_code, fill_type="solid")
+        if font_color_code is not None:
+            template_cell.font = Font(color=font_color_code.lstrip("#"))
+        styles[key] = template_cell._style
+
+    return styles[key]
+
+
+def _get_cell_values(values: pd.Series) -> list:
+    """
+    Converts the values of a column of any dtype to the Python values of its cells, None for the Null values.
+    """
+    if pd.api.types.is_datetime64_any_dtype(values):
+        dates = values.dropna()
+        # Dates are written as YYYY-MM-DD text, without time of day if it is midnight
+        date_format = "%Y-%m-%d" if (dates == dates.dt.normalize()).all() else "%Y-%m-%d %H:%M:%S"
+        values = values.dt.strftime(date_format)
+
+    cell_values = values.astype(object)
+
+    return cell_values.where(values.notnull(), None).tolist()
+
+
+@track_stage
+def write_styled_dataframe_to_worksheet(
         df: pd.DataFrame,
-        ws: openpyxl.worksheet.worksheet.Worksheet
+        ws: openpyxl.worksheet.worksheet.Worksheet,
+        fill_color_codes: pd.Series | None = None,
+        font_color_codes: pd.Series | None = None,
+        header: bool = True,
+        styles: Dict[tuple, StyleArray] | None = None
 ) -> None:
     """
-    Writes data from pandas Dataframe to openpyxl Worksheet.
+    Writes data from pandas Dataframe to openpyxl Worksheet
+    and styles every row's cells in the same pass.
+    The rows are appended, so write-only Worksheets can be written block by block.
 
     Parameters
     ----------
@@ -205,72 +452,84 @@ def write_data_from_pandas_dataframe_to_worksheet(
         DataFrame to use for getting the data.
     ws: openpyxl.worksheet.worksheet.Worksheet
         Worksheet to use for writing the data.
+    fill_color_codes: pd.Series | None
+        Background color code of every row, aligned with the DataFrame rows.
+    font_color_codes: pd.Series | None
+        Font color code of every row, aligned with the DataFrame rows.
+    header: bool
+        Whether to write the column names first.
+    styles: Dict[tuple, StyleArray] | None
+        Styles of the color combinations already registered in the Workbook, updated with the new ones.
 
     Returns
     -------
     None
     """
-    for row in dataframe_to_rows(df, index=False, header=True):
-        ws.append(row)
+    from openpyxl.cell.cell import Cell
+
+    rows = zip(*(_get_cell_values(df[column]) for column in df.columns))
+
+    if header:
+        header_cells = [Cell(ws, value=column) for column in df.columns]
+        for cell in header_cells:
+            cell.style = 'Pandas'
+        ws.append(header_cells)
 
-    for cell in ws[1]:
-        cell.style = 'Pandas'
+    rows_count = len(df.index)
+    fill_codes = fill_color_codes.tolist() if fill_color_codes is not None else [None] * rows_count
+    font_codes = font_color_codes.tolist() if font_color_codes is not None else [None] * rows_count
+
+    styles = styles if styles is not None else {}
+    for row, fill_code, font_code in zip(rows, fill_codes, font_codes):
+        if pd.isnull(fill_code):
+            fill_code = None
+        if pd.isnull(font_code):
+            font_code = None
+
+        if fill_code is None and font_code is None:
+            ws.append(row)
+            continue
+
+        style = _get_cell_style(ws, fill_code, font_code, styles)
+        ws.append([Cell(ws, value=value, style_array=copy(style)) for value in row])
 
     logger.info("Data written from DataFrame to Worksheet successfully!")
 
 
-def get_color_code(
-        label_ids: pd.Series,
-        url: str,
-        headers=Dict[str, str]
-) -> str | None:
+def parse_label_ids(value: Any) -> List[str]:
     """
-    Extracts color codes from API via request using values from array.
+    Parses the label ids of a row.
 
     Parameters
     ----------
-    label_ids: pd.Series
-        Array containing the values.
-    url: str
-        URL of the color codes.
-    headers: Dict[str, str]
-        Headers to send with the request.
+    value: Any
+        Comma separated ids, a single id or a list of ids.
 
     Returns
     -------
-    color_codes: str | None
-        First resolved color code if any
+    label_ids: List[str]
+        List with the label ids.
     """
+    if isinstance(value, (list, tuple)):
+        return [label_id for item in value for label_id in parse_label_ids(item)]
 
-    for label_id in label_ids:
-        if label_id is not None:
-            current_url = f"{url}{label_id}"
-            resource = get_request_resource_as_json(current_url, headers)
-            try:
-                current_code = resource[0]["colorCode"]
-                return current_code
-            except (IndexError, KeyError):
-                logger.info(f"Couldn't extract color code with id - {label_id}.")
+    if value is None or (isinstance(value, float) and pd.isnull(value)):
+        return []
 
-    return None
+    if isinstance(value, float) and value.is_integer():
+        return [str(int(value))]
 
+    return [label_id.strip() for label_id in str(value).split(",") if label_id.strip()]
 
-def add_font_color_to_worksheet_cells(
-        label_ids: pd.Series,
-        ws: openpyxl.worksheet.worksheet.Worksheet,
-        url: str,
-        headers: Dict[str, str]
-) -> None:
+
+def request_label_color_code(label_id: str, url: str, headers: Dict[str, str]) -> str | None:
     """
-    Adds font color to Worksheet's cells text by
-    extracting color code from API using values from array.
+    Extracts the color code of label from API via request.
 
     Parameters
     ----------
-    label_ids: pd.Series
-        Array containing the values.
-    ws: openpyxl.worksheet.worksheet.Worksheet
-        Worksheet with the data.
+    label_id: str
+        Id of the label.
     url: str
         URL of the color codes.
     headers: Dict[str, str]
@@ -278,88 +537,113 @@ def add_font_color_to_worksheet_cells(
 
     Returns
     -------
-    None
+    color_code: str | None
+        Color code of the label if any
+
+    Raises
+    ------
+    requests.RequestException
+        If the label couldn't be requested.
+    ValueError
+        If the response is not a JSON array.
     """
-    color_code = get_color_code(label_ids, url, headers)
-    if color_code is not None:
-        first_code = color_code.lstrip("#")
-        rows_range = ws.max_row
-        columns_range = ws.max_column
-        for row_index in range(1, rows_range + 1):
-            for column_index in range(1, columns_range + 1):
-                ws.cell(row_index, column_index).font = openpyxl.styles.Font(color=first_code)
+    from utils.request_utils import get_request_resource_as_json
 
-        logger.info("Added font color to Worksheet.")
+    resource = get_request_resource_as_json(f"{url}{label_id}", headers)
+    if not isinstance(resource, list):
+        raise ValueError(f"Expected JSON array of label with id - {label_id}, got {type(resource).__name__}.")
+    try:
+        return resource[0]["colorCode"]
+    except (IndexError, KeyError):
+        # Logged for every missing label, so the message is only formatted if it is written
+        logger.info("Couldn't extract color code with id - %s.", label_id)
 
-    logger.info("Couldn't extract any color code.")
+    return None
 
 
-def get_column_index_in_worksheet(
-        ws: openpyxl.worksheet.worksheet.Worksheet,
-        required_column,
-        rows_range,
-        columns_range
-) -> int:
+@track_stage
+def resolve_label_color_codes(
+        label_ids: pd.Series,
+        url: str,
+        headers: Dict[str, str],
+        cache: LabelColorCache | None = None,
+        max_workers: int = 8
+) -> Dict[str, str | None]:
     """
-    Finds the column index of column in Worksheet.
+    Extracts the color code of every distinct label id,
+    requesting the ids that are not cached concurrently.
 
     Parameters
     ----------
-    ws: openpyxl.worksheet.worksheet.Worksheet
-        Worksheet with the data.
-    required_column: str
-        Name of the required column
-    rows_range:
-        Worksheet's rows count
-    columns_range:
-        Worksheet's columns count
+    label_ids: pd.Series
+        Array containing the label ids of every row.
+    url: str
+        URL of the color codes.
+    headers: Dict[str, str]
+        Headers to send with the request.
+    cache: LabelColorCache | None
+        Cache to look up color codes in before requesting them.
+    max_workers: int
+        Maximum count of concurrent requests.
 
     Returns
     -------
-    column_index: int
-        The index of the required column
+    color_codes: Dict[str, str | None]
+        Dictionary with the color code of every label id.
     """
-    for row_index in range(1, rows_range + 1):
-        for column_index in range(1, columns_range + 1):
-            if ws.cell(row_index, column_index).value == required_column:
-                return column_index
-
-
-def add_background_color_to_worksheet_cells(
-        ws: openpyxl.worksheet.worksheet.Worksheet,
-        required_column: str,
-        today: datetime
-) -> None:
+    import requests
+
+    distinct_ids = dict.fromkeys(label_id for value in label_ids for label_id in parse_label_ids(value))
+
+    color_codes = {}
+    missing_ids = []
+    for label_id in distinct_ids:
+        is_cached, color_code = cache.get(label_id) if cache is not None else (False, None)
+        if is_cached:
+            color_codes[label_id] = color_code
+        else:
+            missing_ids.append(label_id)
+
+    def request(label_id: str) -> Tuple[bool, str | None]:
+        try:
+            return True, request_label_color_code(label_id, url, headers)
+        except (requests.RequestException, ValueError, IndexError, KeyError) as error:
+            # One label failing leaves its rows without font color instead of failing the job
+            logger.info("Couldn't request color code with id - %s: %s.", label_id, error)
+            return False, None
+
+    if missing_ids:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            for label_id, (is_requested, color_code) in zip(missing_ids, executor.map(request, missing_ids)):
+                color_codes[label_id] = color_code
+                # Failed requests are not cached, only labels without color code
+                if cache is not None and is_requested:
+                    cache.set(label_id, color_code)
+
+    logger.info(f"Resolved color codes of {len(color_codes)} labels, {len(missing_ids)} requested.")
+
+    return color_codes
+
+
+@track_stage
+def get_font_color_codes(label_ids: pd.Series, color_codes: Dict[str, str | None]) -> pd.Series:
     """
-    Adds background color to Worksheet's cells
-    depending on months count between two dates.
+    Gets the font color code of every row,
+    which is the first resolved color code of the row's label ids.
 
     Parameters
     ----------
-    ws: openpyxl.worksheet.worksheet.Worksheet
-        Worksheet with the data.
-    required_column: str
-        Column to use for start date
-    today: datetime
-        End date
+    label_ids: pd.Series
+        Array containing the label ids of every row.
+    color_codes: Dict[str, str | None]
+        Dictionary with the color code of every label id.
 
     Returns
     -------
-    None
+    font_color_codes: pd.Series
+        Array with the font color code of every row, None if no label id is resolved.
     """
-    rows_range = ws.max_row
-    columns_range = ws.max_column
-
-    hu_column_index = get_column_index_in_worksheet(ws, required_column, rows_range, columns_range)
-
-    for row_index in range(1, rows_range + 1):
-        if hu_column_index is not None and row_index > 1:
-            date_str = ws.cell(row_index, hu_column_index).value
-            date = string_to_date(date_str)
-            months_diff = get_months_diff_between_dates(date, today)
-            color_code = get_color_code_by_number(months_diff)
-            for column_index in range(1, columns_range + 1):
-                cell_header = ws.cell(row_index, column_index)
-                cell_header.fill = PatternFill(start_color=color_code, fill_type="solid")
+    def get_row_color_code(value: Any) -> str | None:
+        return next((color_codes[i] for i in parse_label_ids(value) if color_codes.get(i) is not None), None)
 
-    logger.info("Added background color to Worksheet.")
+    return label_ids.map(get_row_color_code)
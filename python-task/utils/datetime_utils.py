@@ -1,5 +1,8 @@
+import calendar
 from datetime import datetime
 
+import numpy as np
+import pandas as pd
 from dateutil.relativedelta import relativedelta
 
 
@@ -45,3 +48,76 @@ def get_months_diff_between_dates(start_date: datetime.date, end_date: datetime.
     delta = relativedelta(end_date, start_date)
     months_diff = 12 * delta.years + delta.months
     return months_diff
+
+
+def strings_to_dates(dates: pd.Series) -> pd.Series:
+    """
+    Converts strings in YY/MM/DD or YY-MM-DD format to dates,
+    parsing every distinct string only once.
+
+    Parameters
+    ----------
+    dates : pd.Series
+        The dates as strings, Null values are converted to NaT.
+
+    Returns
+    -------
+    dates : pd.Series
+        The dates as datetime64 values.
+    """
+    codes, unique_dates = pd.factorize(dates)
+    parsed_dates = pd.to_datetime(
+        pd.Index(unique_dates, dtype=object).str.replace("/", "-", regex=False),
+        format="%Y-%m-%d"
+    )
+
+    return pd.Series(parsed_dates.take(codes, allow_fill=True, fill_value=pd.NaT), index=dates.index)
+
+
+def get_months_diff_between_date_arrays(start_dates: pd.Series, end_date: datetime) -> pd.Series:
+    """
+    Calculates months between every start date and the end date,
+    the same way as get_months_diff_between_dates but on the whole array.
+
+    Like relativedelta, the months are counted from the start day of month,
+    clamped to the last day of shorter months, and the time of the end date
+    counts when the end date is before the start date.
+
+    Parameters
+    ----------
+    start_dates : pd.Series
+        Start dates as datetime64 values.
+    end_date: datetime
+        End date.
+
+    Returns
+    -------
+    months_diff : pd.Series
+        Months between every start date and the end date, NaN for NaT.
+    """
+    start_days = start_dates.to_numpy(dtype="datetime64[D]")
+    start_months = start_days.astype("datetime64[M]")
+    start_days_of_month = (start_days - start_months).astype(np.int64) + 1
+
+    end_month = (end_date.year - 1970) * 12 + end_date.month - 1
+    months_diff = end_month - start_months.astype(np.int64)
+
+    # The start day is moved to the month of the end date, clamped to its last day
+    days_in_end_month = calendar.monthrange(end_date.year, end_date.month)[1]
+    start_days_in_end_month = np.minimum(start_days_of_month, days_in_end_month)
+    has_time = isinstance(end_date, datetime) and end_date.time() != datetime.min.time()
+
+    # Take a month off end dates after the start date but before its day in the end month,
+    # and add one to end dates before the start date but after its day in the end month
+    is_end_after_start = np.datetime64(end_date.strftime("%Y-%m-%d")) >= start_days
+    is_end_before_start_day = end_date.day < start_days_in_end_month
+    is_end_on_start_day = end_date.day == start_days_in_end_month
+    is_end_after_start_day = (end_date.day > start_days_in_end_month) | (is_end_on_start_day & has_time)
+    months_diff = np.where(
+        is_end_after_start,
+        months_diff - is_end_before_start_day,
+        months_diff + is_end_after_start_day
+    ).astype(np.float64)
+    months_diff[np.isnat(start_days)] = np.nan
+
+    return pd.Series(months_diff, index=start_dates.index)
@@ -0,0 +1,187 @@
+from __future__ import annotations
+
+from importlib.util import find_spec
+from typing import Collection, Tuple
+
+import numpy as np
+import pandas as pd
+
+from logger import logger
+from utils.datetime_utils import strings_to_dates
+from utils.metrics_utils import track_stage
+
+# Text columns with at most this ratio of distinct values to rows are stored as categoricals
+CATEGORICAL_MAX_UNIQUE_RATIO = 0.5
+
+
+def _get_text_dtype() -> str | None:
+    # Strings backed by Arrow buffers instead of Python objects if pyarrow is installed
+    return "string[pyarrow]" if find_spec("pyarrow") is not None else None
+
+
+def _intern_strings(values: pd.Series) -> pd.Series:
+    """
+    Makes the equal strings of the values share one Python object.
+    """
+    codes, uniques = pd.factorize(values)
+
+    return pd.Series(pd.api.extensions.take(uniques, codes, allow_fill=True), index=values.index, name=values.name)
+
+
+def _compact_text(values: pd.Series, categorical_max_unique_ratio: float) -> pd.Series:
+    """
+    Stores the text values as categorical if they repeat enough, else as compact strings.
+    Columns mixing strings with other values are kept as they are.
+    """
+    if pd.api.types.infer_dtype(values, skipna=True) != "string":
+        return values
+
+    unique_count = values.nunique(dropna=True)
+    if unique_count <= categorical_max_unique_ratio * len(values.index):
+        return values.astype("category")
+
+    text_dtype = _get_text_dtype()
+    if text_dtype is not None:
+        return values.astype(text_dtype)
+
+    return _intern_strings(values)
+
+
+def _compact_numbers(values: pd.Series) -> pd.Series:
+    """
+    Downcasts the numbers to the smallest dtype holding all of them exactly.
+    """
+    if pd.api.types.is_integer_dtype(values):
+        return pd.to_numeric(values, downcast="integer")
+
+    downcast_values = pd.to_numeric(values, downcast="float")
+    if np.array_equal(downcast_values.to_numpy(np.float64), values.to_numpy(np.float64), equal_nan=True):
+        return downcast_values
+
+    return values
+
+
+@track_stage
+def optimize_dtypes(
+        df: pd.DataFrame,
+        date_columns: Collection[str] = (),
+        categorical_max_unique_ratio: float = CATEGORICAL_MAX_UNIQUE_RATIO
+) -> pd.DataFrame:
+    """
+    Converts the columns of DataFrame to memory-compact dtypes.
+
+    Date columns are parsed to datetime64, repeating text is stored as categorical,
+    the other text as Arrow-backed strings or interned if pyarrow is not installed,
+    and numbers are downcast to the smallest dtype holding them exactly.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        DataFrame to convert.
+    date_columns : Collection[str]
+        Columns with the dates as YYYY-MM-DD or YYYY/MM/DD strings, kept as they are if they don't parse.
+    categorical_max_unique_ratio : float
+        Maximum ratio of distinct values to rows of the text columns stored as categorical.
+
+    Returns
+    -------
+    new_df : pd.DataFrame
+        DataFrame with the same values in the compact dtypes.
+    """
+    columns = {}
+    for column in df.columns:
+        values = df[column]
+        if column in date_columns and pd.api.types.is_object_dtype(values):
+            try:
+                values = strings_to_dates(values)
+            except (ValueError, TypeError, AttributeError):
+                logger.info(f"Couldn't parse dates of {column} column, keeping it as is.")
+        elif pd.api.types.is_object_dtype(values):
+            values = _compact_text(values, categorical_max_unique_ratio)
+        elif pd.api.types.is_numeric_dtype(values) and not pd.api.types.is_bool_dtype(values):
+            values = _compact_numbers(values)
+        columns[column] = values
+
+    new_df = pd.DataFrame(columns, index=df.index)
+
+    return new_df
+
+
+def _is_text_dtype(dtype) -> bool:
+    return isinstance(dtype, (pd.CategoricalDtype, pd.StringDtype)) or pd.api.types.is_object_dtype(dtype)
+
+
+def align_dtypes(left_df: pd.DataFrame, right_df: pd.DataFrame) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Converts the text columns of both DataFrames to one dtype per column, as their dtypes are chosen per DataFrame.
+
+    A column categorical in either DataFrame becomes categorical with the categories of both,
+    the other text columns with different dtypes become objects. The other columns are kept as they are.
+
+    Parameters
+    ----------
+    left_df : pd.DataFrame
+        First DataFrame to convert.
+    right_df : pd.DataFrame
+        Second DataFrame to convert.
+
+    Returns
+    -------
+    new_dfs : Tuple[pd.DataFrame, pd.DataFrame]
+        Both DataFrames with the same dtype of the text columns they share.
+    """
+    left_columns, right_columns = {}, {}
+    for column in left_df.columns.intersection(right_df.columns):
+        left_values, right_values = left_df[column], right_df[column]
+        if left_values.dtype == right_values.dtype:
+            continue
+        if not (_is_text_dtype(left_values.dtype) and _is_text_dtype(right_values.dtype)):
+            continue
+
+        if any(isinstance(values.dtype, pd.CategoricalDtype) for values in (left_values, right_values)):
+            left_values, right_values = (
+                values if isinstance(values.dtype, pd.CategoricalDtype) else values.astype(object).astype("category")
+                for values in (left_values, right_values)
+            )
+            categories = left_values.cat.categories.union(right_values.cat.categories)
+            left_values = left_values.cat.set_categories(categories)
+            right_values = right_values.cat.set_categories(categories)
+        else:
+            left_values, right_values = left_values.astype(object), right_values.astype(object)
+        left_columns[column], right_columns[column] = left_values, right_values
+
+    if left_columns:
+        logger.info(f"Aligned dtypes of {', '.join(map(str, left_columns))} columns.")
+
+    return left_df.assign(**left_columns), right_df.assign(**right_columns)
+
+
+def get_memory_report(before_df: pd.DataFrame, after_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Compares the dtype and memory usage of every column of DataFrame before and after converting it.
+
+    Parameters
+    ----------
+    before_df : pd.DataFrame
+        DataFrame before the conversion.
+    after_df : pd.DataFrame
+        DataFrame after the conversion, with the same columns.
+
+    Returns
+    -------
+    report : pd.DataFrame
+        Dtype and bytes before and after of every column and of the total, indexed by column name.
+    """
+    bytes_before = before_df.memory_usage(index=False, deep=True)
+    bytes_after = after_df.memory_usage(index=False, deep=True)
+    report = pd.DataFrame({
+        "dtype_before": before_df.dtypes.astype(str),
+        "dtype_after": after_df.dtypes.astype(str),
+        "bytes_before": bytes_before,
+        "bytes_after": bytes_after
+    })
+    report.loc["total"] = ["", "", bytes_before.sum(), bytes_after.sum()]
+    report["bytes_before"] = report["bytes_before"].astype(np.int64)
+    report["bytes_after"] = report["bytes_after"].astype(np.int64)
+
+    return report
@@ -0,0 +1,228 @@
+import functools
+import json
+import os
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, List
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+from logger import logger
+
+_current_recorder: ContextVar["MetricsRecorder | None"] = ContextVar("current_recorder", default=None)
+
+
+def _get_rows_count(value: Any) -> int | None:
+    return len(value) if hasattr(value, "shape") else None
+
+
+def _get_columns_count(value: Any) -> int | None:
+    return len(value.columns) if hasattr(value, "columns") else None
+
+
+def _get_max_rss_bytes() -> int | None:
+    if resource is None:
+        return None
+
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Reported in bytes on macOS and in kilobytes elsewhere
+    return max_rss if sys.platform == "darwin" else max_rss * 1024
+
+
+class StageMetrics:
+    """
+    Measurements of a stage, the row and column counts can be set while it runs.
+    """
+
+    def __init__(self, name: str, depth: int):
+        self.name = name
+        self.depth = depth
+        self.rows_in = None
+        self.rows_out = None
+        self.columns_in = None
+        self.columns_out = None
+        self.wall_time = None
+        self.cpu_time = None
+        self.peak_traced_memory = None
+        self.max_rss = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return dict(vars(self))
+
+
+class MetricsRecorder:
+    """
+    Records wall time, CPU time, memory and row and column counts of the stages of a run.
+
+    Parameters
+    ----------
+    trace_memory: bool
+        Whether to trace the peak memory allocated in every stage with tracemalloc, which slows the run down.
+    """
+
+    def __init__(self, trace_memory: bool = False):
+        self.trace_memory = trace_memory
+        self.metadata: Dict[str, Any] = {}
+        self.stages: List[StageMetrics] = []
+        self._depth = 0
+        self._peaks: List[int] = []
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[StageMetrics]:
+        """
+        Measures the code run in the context as stage.
+
+        Parameters
+        ----------
+        name: str
+            Name of the stage.
+
+        Returns
+        -------
+        stage: Iterator[StageMetrics]
+            The measurements of the stage.
+        """
+        metrics = StageMetrics(name, self._depth)
+        self.stages.append(metrics)
+        self._depth += 1
+
+        # tracemalloc has a single peak, so the peaks of the enclosing stages are kept on a stack
+        is_tracing = self.trace_memory and tracemalloc.is_tracing()
+        if is_tracing:
+            if self._peaks:
+                self._peaks[-1] = max(self._peaks[-1], tracemalloc.get_traced_memory()[1])
+            tracemalloc.reset_peak()
+            self._peaks.append(0)
+
+        start_wall_time = time.perf_counter()
+        start_cpu_time = time.process_time()
+        try:
+            yield metrics
+        finally:
+            metrics.wall_time = time.perf_counter() - start_wall_time
+            metrics.cpu_time = time.process_time() - start_cpu_time
+            metrics.max_rss = _get_max_rss_bytes()
+            if is_tracing:
+                metrics.peak_traced_memory = max(self._peaks.pop(), tracemalloc.get_traced_memory()[1])
+                if self._peaks:
+                    self._peaks[-1] = max(self._peaks[-1], metrics.peak_traced_memory)
+                tracemalloc.reset_peak()
+            self._depth -= 1
+
+            logger.info(
+                f"Stage {name} took {metrics.wall_time:.3f}s wall and {metrics.cpu_time:.3f}s CPU time"
+                f" ({metrics.rows_in} -> {metrics.rows_out} rows)."
+            )
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"metadata": self.metadata, "stages": [stage.to_dict() for stage in self.stages]}
+
+    def save(self, path: str) -> None:
+        """
+        Saves the measurements as JSON file.
+
+        Parameters
+        ----------
+        path: str
+            Path of the JSON file.
+
+        Returns
+        -------
+        None
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        with open(path, "w") as file:
+            json.dump(self.to_dict(), file, indent=2)
+
+        logger.info(f"Metrics saved to {path}.")
+
+
+@contextmanager
+def recording(recorder: MetricsRecorder) -> Iterator[MetricsRecorder]:
+    """
+    Makes the recorder record the stages tracked in the context.
+
+    Parameters
+    ----------
+    recorder: MetricsRecorder
+        Recorder to record with.
+
+    Returns
+    -------
+    recorder: Iterator[MetricsRecorder]
+        The same recorder.
+    """
+    is_tracing_started = recorder.trace_memory and not tracemalloc.is_tracing()
+    if is_tracing_started:
+        tracemalloc.start()
+
+    token = _current_recorder.set(recorder)
+    try:
+        yield recorder
+    finally:
+        _current_recorder.reset(token)
+        if is_tracing_started:
+            tracemalloc.stop()
+
+
+def track_stage(function: Callable) -> Callable:
+    """
+    Records the calls of function as stages while recording,
+    with the rows and columns of its first argument and its result.
+
+    Parameters
+    ----------
+    function: Callable
+        Function to track.
+
+    Returns
+    -------
+    wrapper: Callable
+        The tracked function.
+    """
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        recorder = _current_recorder.get()
+        if recorder is None:
+            return function(*args, **kwargs)
+
+        with recorder.stage(function.__name__) as metrics:
+            if args:
+                metrics.rows_in = _get_rows_count(args[0])
+                metrics.columns_in = _get_columns_count(args[0])
+            result = function(*args, **kwargs)
+            metrics.rows_out = _get_rows_count(result)
+            metrics.columns_out = _get_columns_count(result)
+
+        return result
+
+    return wrapper
+
+
+def record_metadata(key: str, value: Any) -> None:
+    """
+    Adds value to the metadata of the current recorder, if recording.
+
+    Parameters
+    ----------
+    key: str
+        Key of the value in the metadata.
+    value: Any
+        JSON serializable value.
+
+    Returns
+    -------
+    None
+    """
+    recorder = _current_recorder.get()
+    if recorder is not None:
+        recorder.metadata[key] = value
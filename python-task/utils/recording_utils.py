@@ -0,0 +1,244 @@
+from __future__ import annotations
+
+import io
+import json
+import os
+import threading
+import zipfile
+from typing import Any, Dict, Tuple
+
+import requests
+
+from logger import logger
+from utils.request_utils import HttpClient
+
+_INDEX_FILE_NAME = "index.json"
+# Headers kept with the recorded bodies, which are stored decoded
+_RECORDED_HEADERS = ("Content-Type", "ETag", "Last-Modified")
+
+# Status, headers and body of a recorded response
+RecordedResponse = Tuple[int, Dict[str, str], bytes]
+
+
+class ApiRecording:
+    """
+    Responses of API requests by method, URL and JSON body, saved to and loaded from a zip bundle.
+
+    The request headers are not part of the key, so that the responses are replayed with any access token.
+    """
+
+    def __init__(self):
+        self._responses: Dict[str, RecordedResponse] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._responses)
+
+    @staticmethod
+    def get_key(method: str, url: str, json_body: Any = None) -> str:
+        """
+        Gets the key of the request.
+
+        Parameters
+        ----------
+        method : str
+            HTTP method of the request.
+        url : str
+            URL of the request.
+        json_body : Any
+            JSON object sent in the body.
+
+        Returns
+        -------
+        key : str
+            The key of the recorded response.
+        """
+        return json.dumps([method.upper(), url, json_body], sort_keys=True)
+
+    def add(self, method: str, url: str, json_body: Any, response: RecordedResponse) -> None:
+        """
+        Records the response of the request, replacing the previous response of the same request.
+
+        Parameters
+        ----------
+        method : str
+            HTTP method of the request.
+        url : str
+            URL of the request.
+        json_body : Any
+            JSON object sent in the body.
+        response : RecordedResponse
+            Status, headers and decoded body of the response.
+
+        Returns
+        -------
+        None
+        """
+        with self._lock:
+            self._responses[self.get_key(method, url, json_body)] = response
+
+    def get(self, method: str, url: str, json_body: Any = None) -> RecordedResponse | None:
+        """
+        Gets the recorded response of the request.
+
+        Parameters
+        ----------
+        method : str
+            HTTP method of the request.
+        url : str
+            URL of the request.
+        json_body : Any
+            JSON object sent in the body.
+
+        Returns
+        -------
+        response : RecordedResponse | None
+            Status, headers and decoded body of the response, None if the request wasn't recorded.
+        """
+        return self._responses.get(self.get_key(method, url, json_body))
+
+    def save(self, path: str) -> None:
+        """
+        Saves the responses to a zip bundle with the index of the requests and the compressed bodies.
+
+        Parameters
+        ----------
+        path : str
+            Path of the bundle.
+
+        Returns
+        -------
+        None
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        with self._lock:
+            responses = list(self._responses.items())
+
+        index = []
+        tmp_path = f"{path}.tmp"
+        with zipfile.ZipFile(tmp_path, "w", compression=zipfile.ZIP_DEFLATED) as bundle:
+            for body_index, (key, (status, headers, body)) in enumerate(responses):
+                body_name = f"bodies/{body_index}"
+                bundle.writestr(body_name, body)
+                index.append({"key": key, "status": status, "headers": headers, "body": body_name})
+            bundle.writestr(_INDEX_FILE_NAME, json.dumps(index))
+        os.replace(tmp_path, path)
+
+        logger.info(f"Saved {len(responses)} API responses to {path}.")
+
+    @classmethod
+    def load(cls, path: str) -> ApiRecording:
+        """
+        Loads the responses of a zip bundle into memory.
+
+        Parameters
+        ----------
+        path : str
+            Path of the bundle.
+
+        Returns
+        -------
+        recording : ApiRecording
+            The recorded responses.
+        """
+        recording = cls()
+        with zipfile.ZipFile(path) as bundle:
+            for entry in json.loads(bundle.read(_INDEX_FILE_NAME)):
+                recording._responses[entry["key"]] = (entry["status"], entry["headers"], bundle.read(entry["body"]))
+
+        logger.info(f"Loaded {len(recording)} API responses from {path}.")
+
+        return recording
+
+
+def _create_response(url: str, recorded_response: RecordedResponse) -> requests.Response:
+    """
+    Creates response streaming the recorded body from memory.
+    """
+    status, headers, body = recorded_response
+    response = requests.Response()
+    response.status_code = status
+    response.url = url
+    response.headers.update(headers)
+    response.raw = io.BytesIO(body)
+
+    return response
+
+
+class RecordingHttpClient(HttpClient):
+    """
+    HTTP client recording the responses of all requests it sends.
+
+    The bodies are downloaded in full and recorded decoded before they are returned.
+
+    Parameters
+    ----------
+    recording: ApiRecording
+        Recording to add the responses to.
+    **kwargs
+        Arguments of HttpClient.
+    """
+
+    def __init__(self, recording: ApiRecording, **kwargs):
+        super().__init__(**kwargs)
+        self.recording = recording
+
+    def request(
+            self,
+            method: str,
+            url: str,
+            headers: Dict[str, str] = None,
+            json: Any = None,
+            timeout: float | Tuple[float, float] = None,
+            stream: bool = False
+    ) -> requests.Response:
+        with super().request(method, url, headers, json, timeout, stream) as response:
+            recorded_response = (
+                response.status_code,
+                {name: response.headers[name] for name in _RECORDED_HEADERS if name in response.headers},
+                response.content
+            )
+        self.recording.add(method, url, json, recorded_response)
+
+        return _create_response(url, recorded_response)
+
+
+class ReplayHttpClient(HttpClient):
+    """
+    HTTP client serving the recorded responses from memory, without sending any request.
+
+    Parameters
+    ----------
+    recording: ApiRecording
+        Recording to serve the responses from.
+    """
+
+    def __init__(self, recording: ApiRecording):
+        super().__init__()
+        self.recording = recording
+
+    def request(
+            self,
+            method: str,
+            url: str,
+            headers: Dict[str, str] = None,
+            json: Any = None,
+            timeout: float | Tuple[float, float] = None,
+            stream: bool = False
+    ) -> requests.Response:
+        """
+        Serves the recorded response of the request.
+
+        Raises
+        ------
+        requests.ConnectionError
+            If the request wasn't recorded.
+        """
+        recorded_response = self.recording.get(method, url, json)
+        if recorded_response is None:
+            raise requests.ConnectionError(f"No recorded response to {method} {url}.")
+
+        return _create_response(url, recorded_response)
@@ -1,9 +1,637 @@
-from typing import List, Dict
+import codecs
+import hashlib
+import json as json_lib
+import os
+import random
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from email.utils import parsedate_to_datetime
+from typing import Any, BinaryIO, Callable, Iterable, Iterator, List, Dict, Tuple, TypeVar
 
 import requests
+from requests.adapters import HTTPAdapter
 
+from logger import logger
 
-def get_access_token(url: str, json: dict, headers: Dict[str, str]) -> str:
+T = TypeVar("T")
+
+
+class HttpCache:
+    """
+    Disk cache of GET response bodies, revalidated with their ETag and Last-Modified headers.
+
+    Bodies of the responses with a validator are stored while they are read. The later requests
+    of the same resource send If-None-Match and If-Modified-Since, and the body of a 304 Not Modified
+    response is read from disk. The least recently used bodies are evicted once they exceed max_size.
+
+    Parameters
+    ----------
+    directory: str
+        Directory of the index and the bodies.
+    max_size: int
+        Maximum total bytes of the stored bodies.
+    clock: Callable[[], float]
+        Function returning the current time in seconds.
+    """
+
+    _INDEX_FILE_NAME = "index.json"
+
+    def __init__(self, directory: str, max_size: int = 256 * 1024 * 1024, clock: Callable[[], float] = time.time):
+        self.directory = directory
+        self.max_size = max_size
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._is_loaded = False
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        with self._lock:
+            self._load()
+            return len(self._entries)
+
+    @property
+    def hit_ratio(self) -> float:
+        requests_count = self.hits + self.misses
+        return self.hits / requests_count if requests_count else 0.0
+
+    @property
+    def size(self) -> int:
+        with self._lock:
+            self._load()
+            return sum(entry["size"] for entry in self._entries.values())
+
+    @staticmethod
+    def get_key(url: str, json: Any = None) -> str:
+        """
+        Gets the key of the resource requested with the URL and the JSON body.
+
+        Parameters
+        ----------
+        url : str
+            URL of the resource.
+        json : Any
+            JSON object sent in the body.
+
+        Returns
+        -------
+        key : str
+            Hexadecimal hash of the request.
+        """
+        return hashlib.sha256(json_lib.dumps([url, json], sort_keys=True).encode()).hexdigest()
+
+    def get_validators(self, key: str) -> Dict[str, str]:
+        """
+        Gets the conditional request headers of the stored body of the resource.
+
+        Parameters
+        ----------
+        key : str
+            Key of the resource.
+
+        Returns
+        -------
+        headers : Dict[str, str]
+            If-None-Match and If-Modified-Since headers, empty if the body is not stored.
+        """
+        with self._lock:
+            self._load()
+            entry = self._entries.get(key)
+
+        headers = {}
+        if entry is not None:
+            if entry["etag"]:
+                headers["If-None-Match"] = entry["etag"]
+            if entry["last_modified"]:
+                headers["If-Modified-Since"] = entry["last_modified"]
+
+        return headers
+
+    def open_body(self, key: str) -> BinaryIO | None:
+        """
+        Opens the stored body of the resource after the server answered it is not modified.
+
+        Parameters
+        ----------
+        key : str
+            Key of the resource.
+
+        Returns
+        -------
+        body : BinaryIO | None
+            The body file, None if it was evicted in the meantime.
+        """
+        with self._lock:
+            self._load()
+            if key not in self._entries:
+                return None
+
+            try:
+                body = open(self._get_body_path(key), "rb")
+            except OSError:
+                del self._entries[key]
+                return None
+
+            self._entries.move_to_end(key)
+            url = self._entries[key]["url"]
+            self.hits += 1
+            self._save_index()
+
+        logger.info(f"Response of {url} not modified, read from cache.")
+
+        return body
+
+    def store(self, key: str, url: str, response: requests.Response, chunk_size: int) -> Iterator[bytes]:
+        """
+        Yields the chunks of the response body, storing the body if the response has a validator.
+        The body is only stored once it is read to the end.
+
+        Parameters
+        ----------
+        key : str
+            Key of the resource.
+        url : str
+            URL of the resource.
+        response : requests.Response
+            Streamed response.
+        chunk_size: int
+            Count of bytes to read from the socket at once.
+
+        Returns
+        -------
+        chunks : Iterator[bytes]
+            The chunks of the body.
+        """
+        self.misses += 1
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+        if response.status_code != 200 or not (etag or last_modified):
+            yield from response.iter_content(chunk_size)
+            return
+
+        os.makedirs(self.directory, exist_ok=True)
+        file_descriptor, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        size = 0
+        is_stored = False
+        try:
+            with os.fdopen(file_descriptor, "wb") as file:
+                for chunk in response.iter_content(chunk_size):
+                    size += len(chunk)
+                    # Bodies larger than the whole cache are only streamed
+                    if size <= self.max_size:
+                        file.write(chunk)
+                    yield chunk
+
+            if size <= self.max_size:
+                self._add(key, url, tmp_path, size, etag, last_modified)
+                is_stored = True
+        finally:
+            if not is_stored and os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def _add(self, key: str, url: str, tmp_path: str, size: int, etag: str | None, last_modified: str | None):
+        with self._lock:
+            self._load()
+            os.replace(tmp_path, self._get_body_path(key))
+            self._entries[key] = {
+                "url": url,
+                "etag": etag,
+                "last_modified": last_modified,
+                "size": size,
+                "stored_at": self._clock()
+            }
+            self._entries.move_to_end(key)
+
+            total_size = sum(entry["size"] for entry in self._entries.values())
+            while total_size > self.max_size:
+                evicted_key, evicted_entry = self._entries.popitem(last=False)
+                total_size -= evicted_entry["size"]
+                if os.path.exists(self._get_body_path(evicted_key)):
+                    os.remove(self._get_body_path(evicted_key))
+
+            self._save_index()
+
+        logger.info(f"Response of {url} stored in cache, {size} bytes.")
+
+    def _get_body_path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.body")
+
+    def _load(self) -> None:
+        if self._is_loaded:
+            return
+        self._is_loaded = True
+
+        index_path = os.path.join(self.directory, self._INDEX_FILE_NAME)
+        if not os.path.exists(index_path):
+            return
+
+        try:
+            with open(index_path) as file:
+                entries = json_lib.load(file)
+        except (OSError, ValueError):
+            logger.info(f"Couldn't load HTTP cache index from {index_path}.")
+            return
+
+        # Least recently used first
+        for key, entry in entries:
+            if os.path.exists(self._get_body_path(key)):
+                self._entries[key] = entry
+
+    def _save_index(self) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+
+        index_path = os.path.join(self.directory, self._INDEX_FILE_NAME)
+        tmp_path = f"{index_path}.tmp"
+        with open(tmp_path, "w") as file:
+            json_lib.dump(list(self._entries.items()), file)
+        os.replace(tmp_path, index_path)
+
+
+class HttpClient:
+    """
+    HTTP client sharing keep-alive connections between requests,
+    which retries failed requests with exponential backoff and jitter.
+
+    Parameters
+    ----------
+    pool_size: int
+        Maximum count of connections kept alive per host.
+    timeout: float | Tuple[float, float]
+        Default connect and read timeout of every request in seconds.
+    max_retries: int
+        Maximum count of retries of a failed request.
+    backoff_factor: float
+        Seconds to wait before the first retry, doubled on every next one.
+    max_backoff: float
+        Maximum seconds to wait before a retry, also the limit of the Retry-After header.
+    sleep: Callable[[float], None]
+        Function used to wait between retries.
+    """
+
+    RETRY_STATUS_CODES = frozenset([429, 500, 502, 503, 504])
+
+    def __init__(
+            self,
+            pool_size: int = 10,
+            timeout: float | Tuple[float, float] = (5, 60),
+            max_retries: int = 3,
+            backoff_factor: float = 0.5,
+            max_backoff: float = 30,
+            sleep: Callable[[float], None] = time.sleep
+    ):
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.max_backoff = max_backoff
+        self._sleep = sleep
+
+        self._session = requests.Session()
+        self._session.headers["Accept-Encoding"] = "gzip, deflate"
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self._session.mount("http://", adapter)
+        self._session.mount("https://", adapter)
+
+    def request(
+            self,
+            method: str,
+            url: str,
+            headers: Dict[str, str] = None,
+            json: Any = None,
+            timeout: float | Tuple[float, float] = None,
+            stream: bool = False
+    ) -> requests.Response:
+        """
+        Sends request, retrying it on connection errors, timeouts and 5xx/429 responses.
+
+        Parameters
+        ----------
+        method : str
+            HTTP method of the request.
+        url : str
+            URL of the request.
+        headers: Dict[str, str]
+            Headers to send with the request.
+        json : Any
+            JSON object to send in the body.
+        timeout: float | Tuple[float, float]
+            Connect and read timeout in seconds, the client's timeout if None.
+        stream: bool
+            Whether to defer downloading the response body.
+
+        Returns
+        -------
+        response : requests.Response
+            The response of the last attempt.
+
+        Raises
+        ------
+        requests.RequestException
+            If the request still fails after the last retry.
+        """
+        timeout = self.timeout if timeout is None else timeout
+
+        for attempt in range(self.max_retries + 1):
+            is_last_attempt = attempt == self.max_retries
+            try:
+                response = self._session.request(
+                    method, url=url, json=json, headers=headers, timeout=timeout, stream=stream
+                )
+            except (requests.ConnectionError, requests.Timeout) as error:
+                if is_last_attempt:
+                    raise
+                logger.info(f"Request to {url} failed with {type(error).__name__}, retrying...")
+                self._sleep(self._get_backoff(attempt))
+                continue
+
+            if response.status_code not in self.RETRY_STATUS_CODES:
+                return response
+
+            if is_last_attempt:
+                response.raise_for_status()
+
+            logger.info(f"Request to {url} failed with status {response.status_code}, retrying...")
+            retry_after = response.headers.get("Retry-After", "")
+            response.close()
+            self._sleep(self._get_retry_delay(retry_after, attempt))
+
+    def request_json(
+            self,
+            method: str,
+            url: str,
+            headers: Dict[str, str] = None,
+            json: Any = None,
+            timeout: float | Tuple[float, float] = None,
+            cache: HttpCache | None = None
+    ) -> Any:
+        """
+        Sends request and decodes the JSON response body while it is streamed.
+
+        Parameters
+        ----------
+        method : str
+            HTTP method of the request.
+        url : str
+            URL of the request.
+        headers: Dict[str, str]
+            Headers to send with the request.
+        json : Any
+            JSON object to send in the body.
+        timeout: float | Tuple[float, float]
+            Connect and read timeout in seconds, the client's timeout if None.
+        cache: HttpCache | None
+            Cache to revalidate and store the GET response body in, not cached if None.
+
+        Returns
+        -------
+        data : Any
+            The decoded response body.
+
+        Raises
+        ------
+        requests.HTTPError
+            If the response status is an error.
+        """
+        if cache is not None and method == "GET":
+            return json_lib.loads(b"".join(self._iter_content(method, url, headers, json, timeout, 64 * 1024, cache)))
+
+        with self.request(method, url, headers, json, timeout, stream=True) as response:
+            # Error bodies are not the requested data
+            response.raise_for_status()
+            response.raw.decode_content = True
+            return json_lib.load(response.raw)
+
+    def stream_json_array(
+            self,
+            method: str,
+            url: str,
+            headers: Dict[str, str] = None,
+            json: Any = None,
+            timeout: float | Tuple[float, float] = None,
+            chunk_size: int = 64 * 1024,
+            cache: HttpCache | None = None
+    ) -> Iterator[Any]:
+        """
+        Sends request and yields the items of the JSON array response body while it is downloaded.
+
+        Parameters
+        ----------
+        method : str
+            HTTP method of the request.
+        url : str
+            URL of the request.
+        headers: Dict[str, str]
+            Headers to send with the request.
+        json : Any
+            JSON object to send in the body.
+        timeout: float | Tuple[float, float]
+            Connect and read timeout in seconds, the client's timeout if None.
+        chunk_size: int
+            Count of bytes to read from the socket at once.
+        cache: HttpCache | None
+            Cache to revalidate and store the GET response body in, not cached if None.
+
+        Returns
+        -------
+        items : Iterator[Any]
+            The decoded items of the array.
+        """
+        chunks = self._iter_content(method, url, headers, json, timeout, chunk_size, cache)
+        yield from iter_json_array_items(chunks)
+        # The body is read to its end after the array, so that the cache stores it complete
+        for _ in chunks:
+            pass
+
+    def close(self) -> None:
+        self._session.close()
+
+    def _iter_content(
+            self,
+            method: str,
+            url: str,
+            headers: Dict[str, str] | None,
+            json: Any,
+            timeout: float | Tuple[float, float] | None,
+            chunk_size: int,
+            cache: HttpCache | None
+    ) -> Iterator[bytes]:
+        """
+        Yields the chunks of the response body, revalidating the stored body of GET requests if cache is given.
+        """
+        if cache is None or method != "GET":
+            with self.request(method, url, headers, json, timeout, stream=True) as response:
+                response.raise_for_status()
+                yield from response.iter_content(chunk_size)
+            return
+
+        key = cache.get_key(url, json)
+        conditional_headers = {**(headers or {}), **cache.get_validators(key)}
+        with self.request(method, url, conditional_headers, json, timeout, stream=True) as response:
+            if response.status_code != 304:
+                response.raise_for_status()
+                yield from cache.store(key, url, response, chunk_size)
+                return
+
+        body = cache.open_body(key)
+        if body is not None:
+            with body:
+                yield from iter(lambda: body.read(chunk_size), b"")
+            return
+
+        # The stored body was evicted after it was revalidated
+        with self.request(method, url, headers, json, timeout, stream=True) as response:
+            response.raise_for_status()
+            yield from cache.store(key, url, response, chunk_size)
+
+    def _get_backoff(self, attempt: int) -> float:
+        return random.uniform(0, min(self.max_backoff, self.backoff_factor * 2 ** attempt))
+
+    def _get_retry_delay(self, retry_after: str, attempt: int) -> float:
+        """
+        Gets the seconds to wait before a retry from the Retry-After seconds or HTTP date, at most max_backoff,
+        the backoff of the attempt if the header is missing or invalid.
+        """
+        retry_after = retry_after.strip()
+        if retry_after.isdigit():
+            delay = float(retry_after)
+        else:
+            try:
+                delay = parsedate_to_datetime(retry_after).timestamp() - time.time()
+            except (TypeError, ValueError):
+                return self._get_backoff(attempt)
+
+        return min(max(delay, 0.0), self.max_backoff)
+
+
+def iter_json_array_items(chunks: Iterable[bytes]) -> Iterator[Any]:
+    """
+    Parses JSON array incrementally from chunks of its UTF-8 encoded text.
+
+    Parameters
+    ----------
+    chunks : Iterable[bytes]
+        Consecutive chunks of the JSON text.
+
+    Returns
+    -------
+    items : Iterator[Any]
+        The decoded items of the array.
+
+    Raises
+    ------
+    ValueError
+        If the text is not a JSON array.
+    """
+    decoder = json_lib.JSONDecoder()
+    text_decoder = codecs.getincrementaldecoder("utf-8")()
+    chunks = iter(chunks)
+    buffer = ""
+    position = 0
+    is_array_started = False
+    is_stream_ended = False
+
+    while True:
+        while position < len(buffer) and buffer[position] in " \t\r\n,":
+            position += 1
+
+        if position < len(buffer):
+            if not is_array_started:
+                if buffer[position] != "[":
+                    raise ValueError("Expected JSON array.")
+                is_array_started = True
+                position += 1
+                continue
+
+            if buffer[position] == "]":
+                return
+
+            try:
+                item, end = decoder.raw_decode(buffer, position)
+            except ValueError:
+                if is_stream_ended:
+                    raise
+            else:
+                # An item ending with the buffer might be a number cut in the middle
+                if end < len(buffer) or is_stream_ended:
+                    yield item
+                    position = end
+                    continue
+
+        if is_stream_ended:
+            raise ValueError("Unexpected end of JSON array.")
+
+        chunk = next(chunks, None)
+        if chunk is None:
+            is_stream_ended = True
+            chunk = b""
+        buffer = buffer[position:] + text_decoder.decode(chunk, final=is_stream_ended)
+        position = 0
+
+
+_http_client = None
+
+
+def get_http_client() -> HttpClient:
+    """
+    Gets the HTTP client shared by all requests.
+
+    Returns
+    -------
+    client : HttpClient
+        The shared HTTP client.
+    """
+    global _http_client
+    if _http_client is None:
+        _http_client = HttpClient()
+
+    return _http_client
+
+
+def set_http_client(client: HttpClient | None) -> None:
+    """
+    Replaces the HTTP client shared by all requests, a new client is created on first use if None.
+
+    Parameters
+    ----------
+    client : HttpClient | None
+        The client to share.
+
+    Returns
+    -------
+    None
+    """
+    global _http_client
+    _http_client = client
+
+
+def request_access_token(url: str, json: dict, headers: Dict[str, str], client: HttpClient = None) -> dict:
+    """
+    Logs in API via request.
+
+    Parameters
+    ----------
+    url : str
+        URL of the access token.
+    json : str
+        JSON object to send in the body.
+    headers: Any
+        Headers to send with the request.
+    client: HttpClient
+        Client to send the request with, the shared client if None.
+
+    Returns
+    -------
+    oauth : dict
+        OAuth object with the access token and its lifetime.
+    """
+    client = client or get_http_client()
+    oauth = client.request_json("POST", url, headers, json)["oauth"]
+    return oauth
+
+
+def get_access_token(url: str, json: dict, headers: Dict[str, str], client: HttpClient = None) -> str:
     """
     Extracts access token for authorization in API via request.
 
@@ -15,18 +643,194 @@ def get_access_token(url: str, json: dict, headers: Dict[str, str]) -> str:
         JSON object to send in the body.
     headers: Any
         Headers to send with the request.
+    client: HttpClient
+        Client to send the request with, the shared client if None.
 
     Returns
     -------
     token : str
         Access token for API.
     """
-    response = requests.request("POST", url=url, json=json, headers=headers)
-    token = response.json()["oauth"]["access_token"]
+    token = request_access_token(url, json, headers, client)["access_token"]
     return token
 
 
-def get_request_resource_as_json(url: str, headers: Dict[str, str], json: Dict[str, str] = None) -> List[dict]:
+class AccessTokenProvider:
+    """
+    Logs in API lazily on first use and caches the access token until shortly before it expires.
+
+    Concurrent callers share the same login request.
+
+    Parameters
+    ----------
+    url : str
+        URL of the access token.
+    json : str
+        JSON object to send in the body.
+    headers: Dict[str, str]
+        Headers to send with the login request.
+    client: HttpClient
+        Client to send the request with, the shared client if None.
+    cache_path: str | None
+        Path of the JSON file to keep the token in between runs, not kept on disk if None.
+    refresh_margin: float
+        Seconds before the expiry in which the token is refreshed.
+    default_ttl: float
+        Lifetime of the token in seconds if the login response doesn't contain it.
+    clock: Callable[[], float]
+        Function returning the current time in seconds.
+    """
+
+    def __init__(
+            self,
+            url: str,
+            json: dict,
+            headers: Dict[str, str],
+            client: HttpClient = None,
+            cache_path: str | None = None,
+            refresh_margin: float = 60,
+            default_ttl: float = 1200,
+            clock: Callable[[], float] = time.time
+    ):
+        self.url = url
+        self.json = json
+        self.headers = headers
+        self.client = client
+        self.cache_path = cache_path
+        self.refresh_margin = refresh_margin
+        self.default_ttl = default_ttl
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._token = None
+        self._expires_at = 0.0
+        self._is_cache_loaded = False
+
+    def get_token(self) -> str:
+        """
+        Gets valid access token, logging in if there is none or it is about to expire.
+
+        Returns
+        -------
+        token : str
+            Access token for API.
+        """
+        with self._lock:
+            if not self._is_cache_loaded:
+                self._load()
+
+            if self._token is None or self._clock() >= self._expires_at - self.refresh_margin:
+                oauth = request_access_token(self.url, self.json, self.headers, self.client)
+                self._token = oauth["access_token"]
+                self._expires_at = self._clock() + float(oauth.get("expires_in") or self.default_ttl)
+                self._save()
+
+                logger.info("Access token refreshed.")
+
+            return self._token
+
+    def invalidate(self) -> None:
+        """
+        Drops the cached access token, so that the next call logs in again.
+
+        Returns
+        -------
+        None
+        """
+        with self._lock:
+            self._token = None
+            self._expires_at = 0.0
+
+    def retry_unauthorized(self, request: Callable[[], T]) -> T:
+        """
+        Sends request, logging in again and sending it once more if the API rejects the access token with 401,
+        as the token kept on disk may be revoked before it expires.
+
+        Parameters
+        ----------
+        request: Callable[[], T]
+            Function sending the request with the current access token.
+
+        Returns
+        -------
+        result : T
+            Result of the request.
+        """
+        try:
+            return request()
+        except requests.HTTPError as error:
+            if error.response is None or error.response.status_code != 401:
+                raise
+
+        logger.info("Access token was rejected, logging in again...")
+        self.invalidate()
+
+        return request()
+
+    def _load(self) -> None:
+        self._is_cache_loaded = True
+        if self.cache_path is None or not os.path.exists(self.cache_path):
+            return
+
+        try:
+            with open(self.cache_path) as file:
+                cached = json_lib.load(file)
+            self._token = cached["access_token"]
+            self._expires_at = float(cached["expires_at"])
+        except (OSError, ValueError, KeyError):
+            logger.info(f"Couldn't load access token from {self.cache_path}.")
+
+    def _save(self) -> None:
+        if self.cache_path is None:
+            return
+
+        directory = os.path.dirname(self.cache_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        file_descriptor = os.open(self.cache_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(file_descriptor, "w") as file:
+            json_lib.dump({"access_token": self._token, "expires_at": self._expires_at}, file)
+
+
+def stream_request_resource(
+        url: str,
+        headers: Dict[str, str],
+        json: Dict[str, str] = None,
+        client: HttpClient = None,
+        cache: HttpCache | None = None
+) -> Iterator[dict]:
+    """
+    Extracts data from API via request, yielding the records while they are downloaded.
+
+    Parameters
+    ----------
+    url : str
+        URL of the data.
+    json : str
+        JSON object to send in the body.
+    headers: Any
+        Headers to send with the request.
+    client: HttpClient
+        Client to send the request with, the shared client if None.
+    cache: HttpCache | None
+        Cache to revalidate and store the response body in, not cached if None.
+
+    Returns
+    -------
+    records : Iterator[dict]
+        Required data records.
+    """
+    client = client or get_http_client()
+    yield from client.stream_json_array("GET", url, headers, json, cache=cache)
+
+
+def get_request_resource_as_json(
+        url: str,
+        headers: Dict[str, str],
+        json: Dict[str, str] = None,
+        client: HttpClient = None,
+        cache: HttpCache | None = None
+) -> List[dict]:
     """
     Extracts data from API via request.
 
@@ -38,12 +842,16 @@ def get_request_resource_as_json(url: str, headers: Dict[str, str], json: Dict[s
         JSON object to send in the body.
     headers: Any
         Headers to send with the request.
+    client: HttpClient
+        Client to send the request with, the shared client if None.
+    cache: HttpCache | None
+        Cache to revalidate and store the response body in, not cached if None.
 
     Returns
     -------
     data : List[dict]
         Required data.
     """
-    response = requests.request("GET", url=url, json=json, headers=headers)
-    data = response.json()
+    client = client or get_http_client()
+    data = client.request_json("GET", url, headers, json, cache=cache)
     return data
@@ -0,0 +1,322 @@
+from __future__ import annotations
+
+import glob
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Collection, Dict, List, Tuple
+
+import pandas as pd
+
+from logger import logger
+from utils.csv_utils import read_csv_in_parallel
+
+_MANIFEST_FILE_NAME = "manifest.json"
+_HASH_BLOCK_SIZE = 1024 * 1024
+
+
+def get_shard_paths(path: str) -> List[str]:
+    """
+    Gets the paths of the CSV shards of a file, a directory or a glob pattern, in sorted order.
+
+    Parameters
+    ----------
+    path : str
+        Path of a CSV file, a directory with CSV files or a glob pattern of CSV files.
+
+    Returns
+    -------
+    shard_paths : List[str]
+        Paths of the shards.
+
+    Raises
+    ------
+    FileNotFoundError
+        If no shard matches the path.
+    """
+    if os.path.isdir(path):
+        shard_paths = sorted(glob.glob(os.path.join(path, "*.csv")))
+    elif glob.has_magic(path):
+        shard_paths = sorted(glob.glob(path))
+    else:
+        shard_paths = [path] if os.path.exists(path) else []
+
+    if not shard_paths:
+        raise FileNotFoundError(f"No CSV shards found at {path}.")
+
+    return shard_paths
+
+
+def get_file_hash(path: str) -> str:
+    """
+    Gets the SHA-256 hash of the content of file, read block by block.
+
+    Parameters
+    ----------
+    path : str
+        Path of the file.
+
+    Returns
+    -------
+    file_hash : str
+        The hexadecimal hash.
+    """
+    file_hash = hashlib.sha256()
+    with open(path, "rb") as file:
+        for block in iter(lambda: file.read(_HASH_BLOCK_SIZE), b""):
+            file_hash.update(block)
+
+    return file_hash.hexdigest()
+
+
+class ShardManifest:
+    """
+    Persistent manifest of the parsed CSV shards, with their modification time, size and content hash,
+    and the binary cache of their DataFrames.
+
+    A shard is reused from the cache if its modification time and size didn't change,
+    or if they did but its content hash didn't, and it was parsed with the same columns.
+
+    Parameters
+    ----------
+    directory: str
+        Directory of the manifest and the cached DataFrames.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.path = os.path.join(directory, _MANIFEST_FILE_NAME)
+        self._entries: Dict[str, dict] = {}
+        self.hits = 0
+        self.misses = 0
+
+        self._load()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get_cache_path(self, shard_path: str) -> str:
+        """
+        Gets the path of the cached DataFrame of shard.
+
+        Parameters
+        ----------
+        shard_path: str
+            Path of the shard.
+
+        Returns
+        -------
+        cache_path: str
+            Path of the pickled DataFrame.
+        """
+        name = hashlib.sha1(os.path.abspath(shard_path).encode()).hexdigest()
+
+        return os.path.join(self.directory, f"{name}.pkl")
+
+    def get(self, shard_path: str, columns: List[str] | None) -> pd.DataFrame | None:
+        """
+        Gets the cached DataFrame of shard if the shard didn't change since it was cached.
+
+        Parameters
+        ----------
+        shard_path: str
+            Path of the shard.
+        columns: List[str] | None
+            Sorted names of the parsed columns, all columns if None.
+
+        Returns
+        -------
+        df: pd.DataFrame | None
+            The cached DataFrame, None if the shard is new or changed or the cache can't be read.
+        """
+        entry = self._entries.get(shard_path)
+        stat = os.stat(shard_path)
+        if entry is None or entry["columns"] != columns:
+            self.misses += 1
+            return None
+
+        if (entry["mtime_ns"], entry["size"]) != (stat.st_mtime_ns, stat.st_size):
+            # Touched or copied shards keep their cache if the content is the same
+            if entry["size"] != stat.st_size or entry["hash"] != get_file_hash(shard_path):
+                self.misses += 1
+                return None
+            entry["mtime_ns"] = stat.st_mtime_ns
+
+        try:
+            df = pd.read_pickle(entry["cache_path"])
+        except (OSError, EOFError, ValueError):
+            logger.info(f"Couldn't read cached shard {shard_path}, parsing it again.")
+            self.misses += 1
+            return None
+
+        self.hits += 1
+
+        return df
+
+    def set(self, shard_path: str, entry: dict) -> None:
+        """
+        Records the parsed and cached shard.
+
+        Parameters
+        ----------
+        shard_path: str
+            Path of the shard.
+        entry: dict
+            Modification time, size, hash, parsed columns and cache path of the shard.
+
+        Returns
+        -------
+        None
+        """
+        self._entries[shard_path] = entry
+
+    def prune(self, shard_paths: Collection[str]) -> None:
+        """
+        Removes the entries and the cached DataFrames of the shards that are not in shard_paths anymore.
+
+        Parameters
+        ----------
+        shard_paths: Collection[str]
+            Paths of the current shards.
+
+        Returns
+        -------
+        None
+        """
+        shard_paths = set(shard_paths)
+        for shard_path in [path for path in self._entries if path not in shard_paths]:
+            entry = self._entries.pop(shard_path)
+            if os.path.exists(entry["cache_path"]):
+                os.remove(entry["cache_path"])
+
+    def save(self) -> None:
+        """
+        Saves the manifest entries to the manifest file.
+
+        Returns
+        -------
+        None
+        """
+        os.makedirs(self.directory, exist_ok=True)
+
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as file:
+            json.dump(self._entries, file)
+        os.replace(tmp_path, self.path)
+
+        logger.info(f"Shard manifest saved - {self.hits} shards reused, {self.misses} parsed.")
+
+    def _load(self) -> None:
+        if not os.path.exists(self.path):
+            return
+
+        try:
+            with open(self.path) as file:
+                self._entries = json.load(file)
+        except (OSError, ValueError):
+            logger.info(f"Couldn't load shard manifest from {self.path}.")
+
+
+def _parse_shard(
+        shard_path: str,
+        sep: str,
+        columns: List[str] | None,
+        cache_path: str,
+        workers: int | None
+) -> Tuple[dict, pd.DataFrame]:
+    """
+    Parses CSV shard, caches its DataFrame and returns its manifest entry with the DataFrame.
+    A single shard is parsed in chunks across a process pool, the shards of a pool in one process each.
+    """
+    stat = os.stat(shard_path)
+    usecols = frozenset(columns).__contains__ if columns is not None else None
+    if workers == 1:
+        df = pd.read_csv(shard_path, sep=sep, usecols=usecols)
+    else:
+        df = read_csv_in_parallel(shard_path, sep=sep, workers=workers, usecols=usecols)
+    df.to_pickle(cache_path)
+
+    entry = {
+        "mtime_ns": stat.st_mtime_ns,
+        "size": stat.st_size,
+        "hash": get_file_hash(shard_path),
+        "columns": columns,
+        "cache_path": cache_path
+    }
+
+    return entry, df
+
+
+def _parse_shard_in_worker(shard_path: str, sep: str, columns: List[str] | None, cache_path: str) -> dict:
+    """
+    Parses CSV shard in a worker process, the DataFrame is handed over through the cache instead of being pickled.
+    """
+    entry, _ = _parse_shard(shard_path, sep, columns, cache_path, 1)
+
+    return entry
+
+
+def read_csv_shards(
+        shard_paths: List[str],
+        sep: str,
+        columns: Collection[str] | None,
+        cache_directory: str,
+        workers: int | None = None
+) -> pd.DataFrame:
+    """
+    Reads CSV shards into one DataFrame, reusing the cached DataFrames of the unchanged shards
+    and parsing the others across a process pool.
+
+    Parameters
+    ----------
+    shard_paths : List[str]
+        Paths of the shards with the same header, concatenated in this order.
+    sep : str
+        Delimiter of the fields.
+    columns : Collection[str] | None
+        Names of the columns to read, all columns if None.
+    cache_directory : str
+        Directory of the manifest and the cached DataFrames.
+    workers : int | None
+        Count of processes, the count of CPUs if None.
+
+    Returns
+    -------
+    df : pd.DataFrame
+        DataFrame with the records of all shards.
+    """
+    columns = sorted(columns) if columns is not None else None
+    manifest = ShardManifest(cache_directory)
+    os.makedirs(cache_directory, exist_ok=True)
+
+    dfs = {shard_path: manifest.get(shard_path, columns) for shard_path in shard_paths}
+    changed_paths = [shard_path for shard_path, df in dfs.items() if df is None]
+
+    if len(changed_paths) == 1:
+        shard_path = changed_paths[0]
+        entry, dfs[shard_path] = _parse_shard(shard_path, sep, columns, manifest.get_cache_path(shard_path), workers)
+        manifest.set(shard_path, entry)
+    elif changed_paths:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = {
+                shard_path: executor.submit(
+                    _parse_shard_in_worker, shard_path, sep, columns, manifest.get_cache_path(shard_path)
+                )
+                for shard_path in changed_paths
+            }
+            for shard_path, future in futures.items():
+                manifest.set(shard_path, future.result())
+                # The workers hand the shards over through the cache, so they are not pickled twice
+                dfs[shard_path] = pd.read_pickle(manifest.get_cache_path(shard_path))
+
+    manifest.prune(shard_paths)
+    manifest.save()
+
+    # Concatenated once, a single shard is returned as it is
+    shard_dfs = list(dfs.values())
+    df = shard_dfs[0] if len(shard_dfs) == 1 else pd.concat(shard_dfs, ignore_index=True, copy=False)
+
+    logger.info(f"Read {len(df.index)} records from {len(shard_paths)} shards, {len(changed_paths)} parsed.")
+
+    return df
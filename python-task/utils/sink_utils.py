@@ -0,0 +1,430 @@
+from __future__ import annotations
+
+import abc
+import importlib.util
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from typing import BinaryIO, Iterable, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from logger import logger
+from utils.common_utils import PARTITION_MODES, XLSX_ENGINES
+from utils.data_utils import write_styled_dataframe_to_worksheet
+from utils.xlsx_utils import XlsxStreamWriter, build_rows_xml, write_styled_dataframe_to_stream
+
+_MAX_SHEET_TITLE_LENGTH = 31
+# Keeps the file names within the usual 255 bytes, with the path's name, number and extension
+_MAX_FILE_NAME_LENGTH = 100
+_NULL_PARTITION_NAME = "unknown"
+# Inferred types of the object columns Arrow can't convert to one type
+_MIXED_TYPES = frozenset(["mixed", "mixed-integer"])
+
+# Name, rows, background and font color codes of a partition
+Partition = Tuple[str, pd.DataFrame, pd.Series | None, pd.Series | None]
+# Rows, background and font color codes of a block of the output
+Block = Tuple[pd.DataFrame, pd.Series | None, pd.Series | None]
+
+
+class OutputSink(abc.ABC):
+    """
+    Writes the cleaned DataFrame to output file.
+
+    Sinks that support styling get the background and font
+    color code of every row, the others get None.
+    """
+    extension = None
+    content_type = None
+    supports_styling = False
+    supports_sheets = False
+    required_module = None
+
+    @abc.abstractmethod
+    def write(
+            self,
+            df: pd.DataFrame,
+            path: str | BinaryIO,
+            fill_color_codes: pd.Series | None = None,
+            font_color_codes: pd.Series | None = None
+    ) -> None:
+        """
+        Writes DataFrame to file.
+
+        Parameters
+        ----------
+        df: pd.DataFrame
+            DataFrame to write.
+        path: str | BinaryIO
+            Path of the output file or binary file object to write to.
+        fill_color_codes: pd.Series | None
+            Background color code of every row, aligned with the DataFrame rows.
+        font_color_codes: pd.Series | None
+            Font color code of every row, aligned with the DataFrame rows.
+
+        Returns
+        -------
+        None
+        """
+
+    def write_blocks(self, blocks: Iterable[Block], path: str) -> int:
+        """
+        Writes the blocks of rows to one file in order.
+
+        Sinks that can append to their files hold one block in memory at a time,
+        the others concatenate the blocks first.
+
+        Parameters
+        ----------
+        blocks: Iterable[Block]
+            Rows and color codes of every block.
+        path: str
+            Path of the output file.
+
+        Returns
+        -------
+        rows_count: int
+            Count of the written rows.
+        """
+        blocks = list(blocks)
+        if not blocks:
+            self.write(pd.DataFrame(), path)
+            return 0
+
+        df = pd.concat([df for df, _, _ in blocks], ignore_index=True)
+        fill_color_codes = _concat_color_codes([fill for _, fill, _ in blocks], [df for df, _, _ in blocks])
+        font_color_codes = _concat_color_codes([font for _, _, font in blocks], [df for df, _, _ in blocks])
+        self.write(df, path, fill_color_codes, font_color_codes)
+
+        return len(df.index)
+
+    def write_partitioned_files(self, partitions: List[Partition], path: str, max_workers: int | None = None) -> None:
+        """
+        Writes every partition to its own file, each in its own process.
+
+        Parameters
+        ----------
+        partitions: List[Partition]
+            Partitions to write.
+        path: str
+            Path of the output files without extension, suffixed by the partition names.
+        max_workers: int | None
+            Maximum count of processes, the count of CPUs if None.
+
+        Returns
+        -------
+        None
+        """
+        file_names = _get_unique_file_names(partitions)
+        with ProcessPoolExecutor(max_workers) as executor:
+            futures = [
+                executor.submit(self.write, df, f"{path}_{file_name}.{self.extension}", fill, font)
+                for file_name, (_, df, fill, font) in zip(file_names, partitions)
+            ]
+            for future in futures:
+                future.result()
+
+        logger.info(f"Written {len(partitions)} partitions to files.")
+
+    def write_partitioned_sheets(self, partitions: List[Partition], path: str, max_workers: int | None = None) -> None:
+        """
+        Writes every partition to its own sheet of one file, only implemented by the sinks that support sheets.
+
+        Parameters
+        ----------
+        partitions: List[Partition]
+            Partitions to write.
+        path: str
+            Path of the output file.
+        max_workers: int | None
+            Maximum count of processes, the count of CPUs if None.
+
+        Returns
+        -------
+        None
+        """
+        raise NotImplementedError(f"Output format {self.extension} doesn't support sheets.")
+
+
+class XlsxSink(OutputSink):
+    """
+    Writes the cleaned DataFrame to xlsx workbook with the native streaming writer or with openpyxl.
+
+    Parameters
+    ----------
+    engine: str
+        Engine writing the workbook, one of XLSX_ENGINES.
+    """
+    extension = "xlsx"
+    content_type = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+    supports_styling = True
+    supports_sheets = True
+
+    def __init__(self, engine: str = "openpyxl"):
+        if engine not in XLSX_ENGINES:
+            raise ValueError(f"Unsupported xlsx engine {engine}, expected one of {', '.join(XLSX_ENGINES)}.")
+        self.engine = engine
+
+    def write(self, df, path, fill_color_codes=None, font_color_codes=None):
+        if self.engine == "native":
+            with XlsxStreamWriter(path) as writer:
+                write_styled_dataframe_to_stream(df, writer, fill_color_codes, font_color_codes)
+            return
+
+        import openpyxl
+
+        wb = openpyxl.Workbook()
+        write_styled_dataframe_to_worksheet(df, wb.active, fill_color_codes, font_color_codes)
+        wb.save(path)
+        wb.close()
+
+    def write_blocks(self, blocks, path):
+        if self.engine == "native":
+            rows_count = 0
+            with XlsxStreamWriter(path) as writer:
+                for df, fill_color_codes, font_color_codes in blocks:
+                    write_styled_dataframe_to_stream(
+                        df, writer, fill_color_codes, font_color_codes, header=rows_count == 0
+                    )
+                    rows_count += len(df.index)
+
+            return rows_count
+
+        import openpyxl
+
+        # Write-only Workbooks stream the rows to a temporary file instead of keeping the cells
+        wb = openpyxl.Workbook(write_only=True)
+        ws = wb.create_sheet()
+        styles = {}
+        rows_count = 0
+        for df, fill_color_codes, font_color_codes in blocks:
+            write_styled_dataframe_to_worksheet(
+                df, ws, fill_color_codes, font_color_codes, header=rows_count == 0, styles=styles
+            )
+            rows_count += len(df.index)
+        wb.save(path)
+        wb.close()
+
+        return rows_count
+
+    def write_partitioned_sheets(self, partitions, path, max_workers=None):
+        """
+        Writes every partition to its own sheet of one Workbook.
+
+        The native engine styles and serialises every sheet in its own process. It numbers the strings and
+        styles of every partition in the workbook's tables before its rows are turned into XML, and streams
+        the sheets directly if there is only one process to write them. openpyxl writes the sheets
+        one after another to a write-only Workbook, sharing the styles of the color combinations.
+        """
+        if not partitions:
+            partitions = [(_NULL_PARTITION_NAME, pd.DataFrame(), None, None)]
+
+        titles = _get_unique_sheet_titles(partitions)
+        if self.engine == "native":
+            with XlsxStreamWriter(path) as writer:
+                if min(len(partitions), max_workers or os.cpu_count() or 1) == 1:
+                    # Without parallel processes the sheets are streamed directly, without copying their XML
+                    for title, (_, df, fill, font) in zip(titles, partitions):
+                        writer.add_sheet(title)
+                        write_styled_dataframe_to_stream(df, writer, fill, font)
+                else:
+                    with ProcessPoolExecutor(max_workers) as executor:
+                        futures = [
+                            executor.submit(build_rows_xml, df, fill, font, *writer.register_rows(df, fill, font))
+                            for _, df, fill, font in partitions
+                        ]
+                        # The sheets are compressed in order while the next ones are still built
+                        for title, future in zip(titles, futures):
+                            writer.add_sheet_xml(title, future.result())
+
+            logger.info(f"Written {len(partitions)} partitions to sheets.")
+            return
+
+        import openpyxl
+
+        wb = openpyxl.Workbook(write_only=True)
+        styles = {}
+        for title, (_, df, fill, font) in zip(titles, partitions):
+            write_styled_dataframe_to_worksheet(df, wb.create_sheet(title), fill, font, styles=styles)
+        wb.save(path)
+        wb.close()
+
+        logger.info(f"Written {len(partitions)} partitions to sheets.")
+
+
+class CsvSink(OutputSink):
+    extension = "csv"
+    content_type = "text/csv"
+
+    def write(self, df, path, fill_color_codes=None, font_color_codes=None):
+        df.to_csv(path, sep=";", index=False)
+
+    def write_blocks(self, blocks, path):
+        rows_count = 0
+        with open(path, "w", newline="") as file:
+            for df, _, _ in blocks:
+                df.to_csv(file, sep=";", index=False, header=rows_count == 0)
+                rows_count += len(df.index)
+
+        return rows_count
+
+
+def _to_arrow_compatible(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Converts the object columns mixing strings with numbers, like "labelIds", to strings,
+    as Arrow columns have one type. The Null values are kept.
+    """
+    columns = {}
+    for column in df.columns:
+        values = df[column]
+        if pd.api.types.is_object_dtype(values) and pd.api.types.infer_dtype(values) in _MIXED_TYPES:
+            columns[column] = values.astype(str).where(values.notnull(), None)
+
+    return df.assign(**columns) if columns else df
+
+
+class ParquetSink(OutputSink):
+    extension = "parquet"
+    content_type = "application/vnd.apache.parquet"
+    required_module = "pyarrow"
+
+    def write(self, df, path, fill_color_codes=None, font_color_codes=None):
+        _to_arrow_compatible(df).to_parquet(path, index=False)
+
+
+class FeatherSink(OutputSink):
+    extension = "feather"
+    content_type = "application/vnd.apache.arrow.file"
+    required_module = "pyarrow"
+
+    def write(self, df, path, fill_color_codes=None, font_color_codes=None):
+        _to_arrow_compatible(df).reset_index(drop=True).to_feather(path)
+
+
+def _get_file_name(name: str) -> str:
+    return re.sub(r"[^\w-]+", "_", name)[:_MAX_FILE_NAME_LENGTH] or _NULL_PARTITION_NAME
+
+
+def _get_sheet_title(name: str) -> str:
+    from openpyxl.workbook.child import INVALID_TITLE_REGEX
+
+    return INVALID_TITLE_REGEX.sub("_", name)[:_MAX_SHEET_TITLE_LENGTH] or _NULL_PARTITION_NAME
+
+
+def _get_unique_names(names: List[str]) -> List[str]:
+    # Names equal after they are cleaned and cut are numbered, like openpyxl numbers sheet titles.
+    # They are compared case-insensitively, as sheet titles and file names on some file systems are
+    unique_names = []
+    used_names = set()
+    for name in names:
+        unique_name = name
+        number = 0
+        while unique_name.lower() in used_names:
+            number += 1
+            unique_name = f"{name}{number}"
+        used_names.add(unique_name.lower())
+        unique_names.append(unique_name)
+
+    return unique_names
+
+
+def _get_unique_sheet_titles(partitions: List[Partition]) -> List[str]:
+    return _get_unique_names([_get_sheet_title(name) for name, _, _, _ in partitions])
+
+
+def _get_unique_file_names(partitions: List[Partition]) -> List[str]:
+    return _get_unique_names([_get_file_name(name) for name, _, _, _ in partitions])
+
+
+def _concat_color_codes(color_codes: List[pd.Series | None], dfs: List[pd.DataFrame]) -> pd.Series | None:
+    if all(codes is None for codes in color_codes):
+        return None
+
+    return pd.concat([
+        codes.reset_index(drop=True) if codes is not None else pd.Series([None] * len(df.index), dtype=object)
+        for codes, df in zip(color_codes, dfs)
+    ], ignore_index=True)
+
+
+def split_into_partitions(
+        df: pd.DataFrame,
+        column: str,
+        fill_color_codes: pd.Series | None = None,
+        font_color_codes: pd.Series | None = None
+) -> List[Partition]:
+    """
+    Splits DataFrame and the color codes of its rows by the values of column, in the order they appear.
+
+    Parameters
+    ----------
+    df: pd.DataFrame
+        DataFrame to split.
+    column: str
+        Column name to split by.
+    fill_color_codes: pd.Series | None
+        Background color code of every row, aligned with the DataFrame rows.
+    font_color_codes: pd.Series | None
+        Font color code of every row, aligned with the DataFrame rows.
+
+    Returns
+    -------
+    partitions: List[Partition]
+        Name, rows and color codes of every partition.
+    """
+    # Only the values present are partitions, unlike the groups of a categorical column,
+    # which include its unused categories and drop its Null rows
+    codes, values = pd.factorize(df[column], use_na_sentinel=False)
+    order = np.argsort(codes, kind="stable")
+    bounds = np.searchsorted(codes[order], np.arange(1, len(values)))
+
+    partitions = []
+    for value, positions in zip(values, np.split(order, bounds)):
+        name = _NULL_PARTITION_NAME if pd.isnull(value) else str(value)
+        partitions.append((
+            name,
+            df.iloc[positions].reset_index(drop=True),
+            fill_color_codes.iloc[positions].reset_index(drop=True) if fill_color_codes is not None else None,
+            font_color_codes.iloc[positions].reset_index(drop=True) if font_color_codes is not None else None
+        ))
+
+    return partitions
+
+
+SINKS = {sink.extension: sink for sink in [XlsxSink, CsvSink, ParquetSink, FeatherSink]}
+
+
+def get_sink(output_format: str, xlsx_engine: str = "openpyxl") -> OutputSink:
+    """
+    Creates the sink of output format, checking its optional dependencies are installed.
+
+    Parameters
+    ----------
+    output_format: str
+        Format of the output file, one of SINKS keys.
+    xlsx_engine: str
+        Engine writing xlsx workbooks, one of XLSX_ENGINES.
+
+    Returns
+    -------
+    sink: OutputSink
+        The sink of the format.
+
+    Raises
+    ------
+    ValueError
+        If the format or the xlsx engine is not supported.
+    ImportError
+        If a module the format depends on is not installed.
+    """
+    if output_format not in SINKS:
+        raise ValueError(f"Unsupported output format {output_format}, expected one of {', '.join(SINKS)}.")
+
+    sink_class = SINKS[output_format]
+    module = sink_class.required_module
+    if module is not None and importlib.util.find_spec(module) is None:
+        raise ImportError(f"Output format {output_format} requires {module}, install it with: pip install {module}")
+
+    logger.info(f"Writing output as {output_format}.")
+
+    return XlsxSink(xlsx_engine) if sink_class is XlsxSink else sink_class()
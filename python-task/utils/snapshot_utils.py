@@ -0,0 +1,164 @@
+import os
+import pickle
+from typing import List
+
+import numpy as np
+import pandas as pd
+
+from logger import logger
+
+
+def _get_canonical_values(values: pd.Series) -> pd.Series:
+    """
+    Converts the values to one dtype per kind of values, so that their hashes don't depend on the dtypes
+    chosen to store them compactly, which change with the range of the numbers and the repetition of the text.
+    """
+    if pd.api.types.is_bool_dtype(values) or not (
+            pd.api.types.is_numeric_dtype(values) or pd.api.types.is_string_dtype(values)
+            or isinstance(values.dtype, pd.CategoricalDtype)
+    ):
+        return values
+
+    if pd.api.types.is_integer_dtype(values):
+        return values.astype("Int64" if pd.api.types.is_extension_array_dtype(values) else np.int64)
+
+    if pd.api.types.is_float_dtype(values):
+        return values.astype("Float64" if pd.api.types.is_extension_array_dtype(values) else np.float64)
+
+    # Categorical, Arrow-backed and object text, with None for every kind of Null value
+    return values.astype(object).where(values.notnull(), None)
+
+
+def get_rows_hashes(dfs: List[pd.DataFrame], key_column: str) -> pd.Series:
+    """
+    Calculates content hash of every key's rows across DataFrames.
+    The values are hashed in canonical dtypes, so the hashes only change with the values.
+
+    Parameters
+    ----------
+    dfs : List[pd.DataFrame]
+        DataFrames with the rows.
+    key_column : str
+        Column name to key the rows by.
+
+    Returns
+    -------
+    hashes : pd.Series
+        Array with the hash of every key, indexed by the keys.
+    """
+    dfs_hashes = []
+    for df in dfs:
+        columns = sorted(df.columns)
+        canonical_df = pd.DataFrame({column: _get_canonical_values(df[column]) for column in columns})
+        rows_hashes = pd.util.hash_pandas_object(canonical_df, index=False)
+        # Keys repeated in the DataFrame are combined into one hash, the rows without key share the Null key
+        keys_hashes = pd.Series(rows_hashes.to_numpy(), index=df[key_column].to_numpy())
+        dfs_hashes.append(keys_hashes.groupby(level=0, dropna=False).sum())
+
+    keys = dfs_hashes[0].index
+    for df_hashes in dfs_hashes[1:]:
+        keys = keys.union(df_hashes.index)
+
+    combined_df = pd.DataFrame({i: df_hashes.reindex(keys, fill_value=0) for i, df_hashes in enumerate(dfs_hashes)})
+    hashes = pd.util.hash_pandas_object(combined_df, index=True)
+
+    return hashes
+
+
+def get_changed_keys(previous_hashes: pd.Series, current_hashes: pd.Series) -> pd.Index:
+    """
+    Finds the keys that are new or whose rows changed.
+
+    Parameters
+    ----------
+    previous_hashes : pd.Series
+        Hashes of the rows before.
+    current_hashes : pd.Series
+        Hashes of the rows now.
+
+    Returns
+    -------
+    keys : pd.Index
+        The new and changed keys.
+    """
+    aligned_hashes = previous_hashes.reindex(current_hashes.index)
+    changed = aligned_hashes.isnull() | (aligned_hashes != current_hashes)
+
+    return current_hashes.index[changed.to_numpy()]
+
+
+def isin_keys(values: pd.Series, keys: pd.Index) -> pd.Series:
+    """
+    Checks which values are in the keys, the Null values are in them if the Null key is.
+
+    Parameters
+    ----------
+    values : pd.Series
+        Keys of the rows.
+    keys : pd.Index
+        Keys to look for, as returned by get_changed_keys.
+
+    Returns
+    -------
+    mask : pd.Series
+        Whether the key of every row is in the keys.
+    """
+    # isin doesn't match None with NaN, the Null keys are matched separately
+    mask = values.isin(keys)
+    if keys.hasnans:
+        mask |= values.isnull()
+
+    return mask
+
+
+def load_snapshot(path: str) -> dict | None:
+    """
+    Loads snapshot of previous run.
+
+    Parameters
+    ----------
+    path : str
+        Path of the snapshot file.
+
+    Returns
+    -------
+    snapshot : dict | None
+        The snapshot, None if there is no valid one.
+    """
+    if not os.path.exists(path):
+        return None
+
+    try:
+        with open(path, "rb") as file:
+            return pickle.load(file)
+    except (OSError, pickle.UnpicklingError, EOFError):
+        logger.info(f"Couldn't load snapshot from {path}.")
+
+    return None
+
+
+def save_snapshot(path: str, snapshot: dict) -> None:
+    """
+    Saves snapshot of the current run.
+
+    Parameters
+    ----------
+    path : str
+        Path of the snapshot file.
+    snapshot : dict
+        The snapshot.
+
+    Returns
+    -------
+    None
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as file:
+        pickle.dump(snapshot, file, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, path)
+
+    logger.info(f"Snapshot saved to {path}.")
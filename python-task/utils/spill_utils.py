@@ -0,0 +1,376 @@
+from __future__ import annotations
+
+import os
+from typing import Iterable, Iterator, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from logger import logger
+from utils.data_utils import coalesce_merge_dataframes, filter_rows_with_null_values_from_df
+from utils.metrics_utils import track_stage
+
+# Copies of the rows held in memory at once while a partition is merged and sorted
+MEMORY_COPIES = 4
+PARTITIONS_COUNT = 16
+# Partitions still over the budget are split again with another hash, at most this many times
+_MAX_PARTITION_DEPTH = 4
+
+# Paths of the spilled chunks of a partition and their bytes in memory
+SpilledPartition = Tuple[List[str], int]
+
+
+def get_rows_per_budget(df: pd.DataFrame, memory_budget: int, copies: int = MEMORY_COPIES) -> int:
+    """
+    Gets the count of rows like the ones of DataFrame that fit in the memory budget the given count of times.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        Sample of the rows.
+    memory_budget : int
+        Memory budget in bytes.
+    copies : int
+        Count of copies of the rows held in memory at once.
+
+    Returns
+    -------
+    rows_count : int
+        The count of rows, at least 1.
+    """
+    bytes_per_row = df.memory_usage(index=True, deep=True).sum() / max(len(df.index), 1)
+
+    return max(1, int(memory_budget // (copies * max(bytes_per_row, 1))))
+
+
+def _get_hash_key(depth: int) -> str:
+    # Every depth hashes with another key, so rows of a partition are spread when it is split again
+    return f"{depth:016d}"
+
+
+@track_stage
+def spill_partitions(
+        chunks: Iterable[pd.DataFrame],
+        column: str,
+        partitions_count: int,
+        directory: str,
+        depth: int = 0
+) -> Tuple[List[SpilledPartition], pd.DataFrame | None]:
+    """
+    Hash-partitions the chunks by the values of column into files on disk, one chunk in memory at a time.
+
+    Parameters
+    ----------
+    chunks : Iterable[pd.DataFrame]
+        Chunks of the rows with the same columns.
+    column : str
+        Column name to partition by.
+    partitions_count : int
+        Count of the partitions.
+    directory : str
+        Directory of the spilled files.
+    depth : int
+        Count of times the rows were already partitioned, the partitions of every depth use another hash.
+
+    Returns
+    -------
+    spilled : Tuple[List[SpilledPartition], pd.DataFrame | None]
+        Files and bytes in memory of every partition and empty DataFrame with the columns, None if no chunks.
+    """
+    os.makedirs(directory, exist_ok=True)
+    partitions = [([], 0) for _ in range(partitions_count)]
+    empty_df = None
+
+    for chunk_index, chunk in enumerate(chunks):
+        if empty_df is None:
+            empty_df = chunk.iloc[:0]
+
+        hashes = pd.util.hash_pandas_object(chunk[column], index=False, hash_key=_get_hash_key(depth)).to_numpy()
+        partition_ids = hashes % partitions_count
+        order = np.argsort(partition_ids, kind="stable")
+        bounds = np.searchsorted(partition_ids[order], np.arange(partitions_count + 1))
+
+        for partition_index in range(partitions_count):
+            start, end = bounds[partition_index], bounds[partition_index + 1]
+            if start == end:
+                continue
+
+            part_df = chunk.iloc[order[start:end]]
+            path = os.path.join(directory, f"{partition_index}_{chunk_index}.pkl")
+            part_df.to_pickle(path)
+
+            paths, size = partitions[partition_index]
+            paths.append(path)
+            partitions[partition_index] = (paths, size + int(part_df.memory_usage(index=True, deep=True).sum()))
+
+    return partitions, empty_df
+
+
+def _read_spilled_chunks(paths: List[str]) -> Iterator[pd.DataFrame]:
+    for path in paths:
+        yield pd.read_pickle(path)
+
+
+def _read_spilled_partition(paths: List[str], empty_df: pd.DataFrame) -> pd.DataFrame:
+    if not paths:
+        return empty_df
+
+    return pd.concat(list(_read_spilled_chunks(paths)), ignore_index=True)
+
+
+def _remove_files(paths: List[str]) -> None:
+    for path in paths:
+        os.remove(path)
+
+
+def _write_sorted_run(df: pd.DataFrame, directory: str, name: str, block_rows: int) -> List[str]:
+    """
+    Writes sorted rows as files of at most block_rows rows each, in order.
+    """
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for start in range(0, len(df.index), block_rows):
+        path = os.path.join(directory, f"{name}_{len(paths)}.pkl")
+        df.iloc[start:start + block_rows].to_pickle(path)
+        paths.append(path)
+
+    return paths
+
+
+def merge_sorted_runs(runs: List[List[str]], column: str) -> Iterator[pd.DataFrame]:
+    """
+    Merges runs of rows sorted by column into one stream of sorted blocks,
+    holding one block of every run in memory at a time.
+
+    Parameters
+    ----------
+    runs : List[List[str]]
+        Files of the blocks of every run, in order. The column has no Null values.
+    column : str
+        Column name the runs are sorted by.
+
+    Returns
+    -------
+    blocks : Iterator[pd.DataFrame]
+        Blocks of the merged rows in order.
+    """
+    blocks_by_run = [_read_spilled_chunks(paths) for paths in runs]
+    heads = {}
+    for run_index, blocks in enumerate(blocks_by_run):
+        block = next(blocks, None)
+        if block is not None:
+            heads[run_index] = block
+
+    while heads:
+        # Rows up to the smallest last value of the blocks in memory precede all rows still on disk
+        bound = min(block[column].iloc[-1] for block in heads.values())
+        parts = []
+        for run_index in list(heads):
+            block = heads[run_index]
+            end = np.searchsorted(block[column].to_numpy(dtype=object), bound, side="right")
+            parts.append(block.iloc[:end])
+
+            block = block.iloc[end:]
+            while block is not None and block.empty:
+                block = next(blocks_by_run[run_index], None)
+            if block is None:
+                del heads[run_index]
+            else:
+                heads[run_index] = block
+
+        merged_df = pd.concat(parts, ignore_index=True)
+        yield merged_df.sort_values(column, kind="mergesort", ignore_index=True)
+
+
+def _merge_runs_to_fan_in(
+        runs: List[List[str]],
+        column: str,
+        fan_in: int,
+        block_rows: int,
+        directory: str
+) -> List[List[str]]:
+    """
+    Merges groups of runs into longer runs on disk until at most fan_in runs are left.
+    """
+    merge_pass = 0
+    while len(runs) > fan_in:
+        merged_runs = []
+        for start in range(0, len(runs), fan_in):
+            group = runs[start:start + fan_in]
+            name = f"pass_{merge_pass}_{start}"
+            paths = []
+            for block_index, block in enumerate(merge_sorted_runs(group, column)):
+                paths.extend(_write_sorted_run(block, directory, f"{name}_{block_index}", block_rows))
+            merged_runs.append(paths)
+            _remove_files([path for run in group for path in run])
+
+        logger.info(f"Merged {len(runs)} sorted runs into {len(merged_runs)}.")
+        runs = merged_runs
+        merge_pass += 1
+
+    return runs
+
+
+def _clean_partitions(
+        left_partitions: List[SpilledPartition],
+        right_partitions: List[SpilledPartition],
+        empty_dfs: Tuple[pd.DataFrame, pd.DataFrame],
+        merge_type: str,
+        merge_column: str,
+        filter_column: str,
+        memory_budget: int,
+        directory: str,
+        depth: int
+) -> Iterator[pd.DataFrame]:
+    """
+    Merges and filters every pair of left and right partitions in memory,
+    splitting the pairs over the memory budget again first.
+    """
+    for index, ((left_paths, left_bytes), (right_paths, right_bytes)) in enumerate(
+            zip(left_partitions, right_partitions)
+    ):
+        if not left_paths and not right_paths:
+            continue
+
+        if (left_bytes + right_bytes) * MEMORY_COPIES > memory_budget:
+            if depth < _MAX_PARTITION_DEPTH:
+                partitions_count = len(left_partitions)
+                sub_directory = os.path.join(directory, f"{depth + 1}_{index}")
+                left_sub_partitions, _ = spill_partitions(
+                    _read_spilled_chunks(left_paths),
+                    merge_column,
+                    partitions_count,
+                    os.path.join(sub_directory, "left"),
+                    depth + 1
+                )
+                right_sub_partitions, _ = spill_partitions(
+                    _read_spilled_chunks(right_paths),
+                    merge_column,
+                    partitions_count,
+                    os.path.join(sub_directory, "right"),
+                    depth + 1
+                )
+                _remove_files(left_paths + right_paths)
+
+                yield from _clean_partitions(
+                    left_sub_partitions,
+                    right_sub_partitions,
+                    empty_dfs,
+                    merge_type,
+                    merge_column,
+                    filter_column,
+                    memory_budget,
+                    sub_directory,
+                    depth + 1
+                )
+                continue
+
+            # Rows with the same key can't be split by hashing
+            logger.warning(f"Partition {index} is over the memory budget after {depth} splits, merging it anyway.")
+
+        left_df = _read_spilled_partition(left_paths, empty_dfs[0])
+        right_df = _read_spilled_partition(right_paths, empty_dfs[1])
+        _remove_files(left_paths + right_paths)
+
+        merged_df = coalesce_merge_dataframes(left_df, right_df, merge_type, merge_column)
+
+        yield filter_rows_with_null_values_from_df(merged_df, filter_column)
+
+
+def merge_and_sort_out_of_core(
+        left_chunks: Iterable[pd.DataFrame],
+        right_chunks: Iterable[pd.DataFrame],
+        merge_type: str,
+        merge_column: str,
+        filter_column: str,
+        sort_column: str,
+        memory_budget: int,
+        directory: str,
+        partitions_count: int = PARTITIONS_COUNT
+) -> Iterator[pd.DataFrame]:
+    """
+    Coalesce-merges two inputs of any size, filters the rows where filter_column is Null
+    and sorts them by sort_column, spilling the rows to disk to stay within the memory budget.
+
+    Both inputs are hash-partitioned by merge_column into files, every pair of partitions is merged,
+    filtered and sorted in memory into a sorted run on disk, and the runs are merged into
+    a stream of sorted blocks. The rows where sort_column is Null come last, like sort_dataframe.
+
+    Parameters
+    ----------
+    left_chunks : Iterable[pd.DataFrame]
+        Chunks of the first input, its values are preferred.
+    right_chunks : Iterable[pd.DataFrame]
+        Chunks of the second input, with the same dtype of merge_column.
+    merge_type : str
+        How to merge the two inputs.
+    merge_column : str
+        Column name to join on.
+    filter_column : str
+        Column name of the values that can't be Null.
+    sort_column : str
+        Column name to sort by in ascending order.
+    memory_budget : int
+        Bytes of rows held in memory at once, the chunks are expected to fit it.
+    directory : str
+        Directory of the spilled files, removed by the caller.
+    partitions_count : int
+        Count of the partitions, also the count of the sorted runs merged at once.
+
+    Returns
+    -------
+    blocks : Iterator[pd.DataFrame]
+        Blocks of the merged, filtered and sorted rows in order.
+    """
+    left_partitions, left_empty_df = spill_partitions(
+        left_chunks, merge_column, partitions_count, os.path.join(directory, "left")
+    )
+    right_partitions, right_empty_df = spill_partitions(
+        right_chunks, merge_column, partitions_count, os.path.join(directory, "right")
+    )
+    empty_dfs = (
+        left_empty_df if left_empty_df is not None else pd.DataFrame({merge_column: []}),
+        right_empty_df if right_empty_df is not None else pd.DataFrame({merge_column: []})
+    )
+
+    runs = []
+    null_runs = []
+    block_rows = None
+    runs_directory = os.path.join(directory, "runs")
+    for clean_df in _clean_partitions(
+            left_partitions,
+            right_partitions,
+            empty_dfs,
+            merge_type,
+            merge_column,
+            filter_column,
+            memory_budget,
+            directory,
+            depth=0
+    ):
+        if clean_df.empty:
+            continue
+
+        # Blocks small enough for one of every merged run to fit the budget
+        if block_rows is None:
+            block_rows = get_rows_per_budget(clean_df, memory_budget, MEMORY_COPIES * partitions_count)
+
+        is_null = clean_df[sort_column].isnull()
+        sorted_df = clean_df[~is_null].sort_values(sort_column, kind="mergesort")
+        run_name = str(len(runs) + len(null_runs))
+        if not sorted_df.empty:
+            runs.append(_write_sorted_run(sorted_df, runs_directory, run_name, block_rows))
+        if is_null.any():
+            null_runs.append(_write_sorted_run(clean_df[is_null], runs_directory, f"{run_name}_null", block_rows))
+
+    logger.info(f"Sorted {len(runs)} runs of the partitions.")
+
+    runs = _merge_runs_to_fan_in(runs, sort_column, partitions_count, block_rows or 1, runs_directory)
+
+    def iter_blocks():
+        yield from merge_sorted_runs(runs, sort_column)
+        for paths in null_runs:
+            for block in _read_spilled_chunks(paths):
+                yield block.reset_index(drop=True)
+
+    return iter_blocks()
@@ -0,0 +1,733 @@
+from __future__ import annotations
+
+import abc
+import os
+import queue
+import re
+import threading
+from typing import BinaryIO, Dict, Iterable, List, Tuple
+from xml.sax.saxutils import escape, quoteattr
+from zipfile import ZIP_DEFLATED, ZipFile
+
+import numpy as np
+import pandas as pd
+
+from logger import logger
+from utils.data_utils import _get_cell_values
+from utils.metrics_utils import track_stage
+
+# Rows turned into XML at once, so the cell fragments of only this many rows are held in memory
+ROWS_PER_CHUNK = 10000
+# Encoded chunks waiting for the compressing thread
+_MAX_QUEUED_CHUNKS = 4
+
+_MAIN_NAMESPACE = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+_RELATIONSHIPS_NAMESPACE = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+_PACKAGE_RELATIONSHIPS_NAMESPACE = "http://schemas.openxmlformats.org/package/2006/relationships"
+_XML_DECLARATION = '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+# Characters XML 1.0 doesn't allow, removed from the text
+_ILLEGAL_CHARACTERS_RE = re.compile(r"[\000-\010]|[\013-\014]|[\016-\037]")
+# RGB or aRGB hex color codes, the ones openpyxl accepts
+_RGB_RE = re.compile(r"^([A-Fa-f0-9]{8}|[A-Fa-f0-9]{6})$")
+
+# Fonts, fills and borders every workbook starts with, the same as openpyxl's
+_DEFAULT_FONT = (
+    '<font><name val="Calibri"/><family val="2"/><color theme="1"/><sz val="11"/><scheme val="minor"/></font>'
+)
+_HEADER_FONT = '<font><b val="1"/></font>'
+_DEFAULT_FILLS = '<fill><patternFill/></fill><fill><patternFill patternType="gray125"/></fill>'
+_THIN_SIDE = '<{0} style="thin"><color rgb="00000000"/></{0}>'
+_BORDERS = (
+    '<borders count="2"><border><left/><right/><top/><bottom/><diagonal/></border><border>'
+    + "".join(_THIN_SIDE.format(side) for side in ["left", "right", "top", "bottom"])
+    + "<diagonal/></border></borders>"
+)
+# The header cells have the "Pandas" named style, bold, centered and with thin borders
+_HEADER_XF = (
+    '<xf numFmtId="0" fontId="1" fillId="0" borderId="1" applyAlignment="1"{}><alignment horizontal="center"/></xf>'
+)
+_HEADER_STYLE_ID = 1
+
+# Fill and font color code of a style
+StyleKey = Tuple[str | None, str | None]
+
+
+def _get_column_letter(index: int) -> str:
+    letters = ""
+    index += 1
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        letters = chr(ord("A") + remainder) + letters
+
+    return letters
+
+
+def _get_rgb(color_code: str) -> str:
+    # Color codes without alpha are opaque, written with the 00 alpha like openpyxl does
+    rgb = str(color_code).lstrip("#")
+    if not _RGB_RE.match(rgb):
+        raise ValueError(f"Colors must be aRGB hex values, got {color_code!r}.")
+
+    return f"00{rgb}" if len(rgb) == 6 else rgb
+
+
+def _get_text_xml(text: str) -> str:
+    text = _ILLEGAL_CHARACTERS_RE.sub("", text)
+    space = ' xml:space="preserve"' if text != text.strip() else ""
+
+    return f"<t{space}>{escape(text)}</t>"
+
+
+def _format_number(value: int | float) -> str:
+    # Floats are written with 16 significant digits like openpyxl does, so 123.0 is written as 123
+    return f"{value:.16g}" if isinstance(value, float) else str(value)
+
+
+def _normalize_color_codes(color_codes: pd.Series | None, rows_count: int) -> List[str | None]:
+    if color_codes is None:
+        return [None] * rows_count
+
+    color_codes = color_codes.astype(object)
+
+    return color_codes.where(color_codes.notnull(), None).tolist()
+
+
+class _RowsXmlWriter(abc.ABC):
+    """
+    Turns the rows of DataFrames into the XML of sheet rows, numbering their strings and row styles.
+
+    Parameters
+    ----------
+    shared_strings: bool
+        Whether to number the strings in the shared strings table, else write them inline in the cells.
+    strings: Dict[str, int] | None
+        Numbers of the strings already in the shared strings table.
+    styles: Dict[StyleKey, int] | None
+        Numbers of the row styles already in the style table.
+    add_strings: bool
+        Whether to number the strings missing from the shared strings table, else write them inline.
+    """
+
+    def __init__(
+            self,
+            shared_strings: bool = True,
+            strings: Dict[str, int] | None = None,
+            styles: Dict[StyleKey, int] | None = None,
+            add_strings: bool = True
+    ):
+        self.shared_strings = shared_strings
+        self.add_strings = add_strings
+        self._strings: Dict[str, int] = {} if strings is None else strings
+        self._styles: Dict[StyleKey, int] = {} if styles is None else styles
+        self._rows_count = 0
+
+    def write_header(self, columns: Iterable[str]) -> None:
+        """
+        Writes the column names as a row with the header style.
+
+        Parameters
+        ----------
+        columns: Iterable[str]
+            Names of the columns.
+
+        Returns
+        -------
+        None
+        """
+        style = f' s="{_HEADER_STYLE_ID}"'
+        self._write_rows([[self._get_value_xml(str(column)) for column in columns]], [style])
+
+    def write_rows(
+            self,
+            df: pd.DataFrame,
+            fill_color_codes: pd.Series | None = None,
+            font_color_codes: pd.Series | None = None
+    ) -> None:
+        """
+        Writes the rows of DataFrame with the background and font color of every row.
+
+        Parameters
+        ----------
+        df: pd.DataFrame
+            DataFrame to write.
+        fill_color_codes: pd.Series | None
+            Background color code of every row, aligned with the DataFrame rows.
+        font_color_codes: pd.Series | None
+            Font color code of every row, aligned with the DataFrame rows.
+
+        Returns
+        -------
+        None
+        """
+        rows_count = len(df.index)
+        fill_codes = _normalize_color_codes(fill_color_codes, rows_count)
+        font_codes = _normalize_color_codes(font_color_codes, rows_count)
+
+        for start in range(0, rows_count, ROWS_PER_CHUNK):
+            end = start + ROWS_PER_CHUNK
+            columns_xml = [self._get_column_xml(df[column].iloc[start:end]) for column in df.columns]
+            styles = [self._get_style_attribute(key) for key in zip(fill_codes[start:end], font_codes[start:end])]
+            self._write_rows(zip(*columns_xml), styles)
+
+    def _write_rows(self, rows: Iterable[Iterable[str | None]], styles: List[str]) -> None:
+        """
+        Writes the rows of cell value fragments, the cells of the rows with a style are written even without value.
+        """
+        self._start_rows()
+
+        letters = None
+        parts = []
+        for row, style in zip(rows, styles):
+            self._rows_count += 1
+            if letters is None:
+                letters = [_get_column_letter(index) for index in range(len(row))]
+
+            number = self._rows_count
+            parts.append(f'<row r="{number}">')
+            for letter, value_xml in zip(letters, row):
+                if value_xml is not None:
+                    parts.append(f'<c r="{letter}{number}"{style}{value_xml}</c>')
+                elif style:
+                    parts.append(f'<c r="{letter}{number}"{style}/>')
+            parts.append("</row>")
+
+        self._write("".join(parts))
+
+    def _get_column_xml(self, values: pd.Series) -> List[str | None]:
+        """
+        Gets the value fragments of the cells of a column, None for the Null values.
+        The fragments of categorical columns are made once for every category.
+        """
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            categories = _get_cell_values(pd.Series(values.cat.categories))
+            categories_xml = [self._get_value_xml(value) for value in categories]
+            return [categories_xml[code] if code >= 0 else None for code in values.cat.codes.tolist()]
+
+        cell_values = _get_cell_values(values)
+        # Finite numbers are formatted without checking the type of every value
+        if pd.api.types.is_numeric_dtype(values) and not pd.api.types.is_bool_dtype(values):
+            if not np.isinf(values.to_numpy(dtype=np.float64, na_value=np.nan)).any():
+                return [None if value is None else f' t="n"><v>{_format_number(value)}</v>' for value in cell_values]
+
+        return [self._get_value_xml(value) for value in cell_values]
+
+    def _get_value_xml(self, value) -> str | None:
+        """
+        Gets the type attribute and the value element of a cell, after its opening tag.
+        """
+        if value is None:
+            return None
+
+        if isinstance(value, str):
+            if not self.shared_strings or (not self.add_strings and value not in self._strings):
+                return f' t="inlineStr"><is>{_get_text_xml(value)}</is>'
+
+            index = self._strings.setdefault(value, len(self._strings))
+            return f' t="s"><v>{index}</v>'
+
+        if isinstance(value, bool):
+            return f' t="b"><v>{int(value)}</v>'
+
+        if isinstance(value, (int, float)) and value not in (float("inf"), float("-inf")):
+            return f' t="n"><v>{_format_number(value)}</v>'
+
+        return self._get_value_xml(str(value))
+
+    def _get_style_attribute(self, key: StyleKey) -> str:
+        if key == (None, None):
+            return ""
+
+        if key not in self._styles:
+            # The color codes are checked before the first row with them is written, like openpyxl does
+            for color_code in key:
+                if color_code is not None:
+                    _get_rgb(color_code)
+            # The first cell formats are the default and the header ones
+            self._styles[key] = len(self._styles) + _HEADER_STYLE_ID + 1
+
+        return f' s="{self._styles[key]}"'
+
+    def _start_rows(self) -> None:
+        pass
+
+    @abc.abstractmethod
+    def _write(self, text: str) -> None:
+        pass
+
+
+class XlsxStreamWriter(_RowsXmlWriter):
+    """
+    Writes an xlsx workbook by streaming the XML of its sheets from the DataFrame columns into the zip file,
+    without creating an object for every cell.
+
+    Strings are deduplicated in the shared strings table or written inline, and the fill and font color
+    combinations of the rows are numbered in a style table written when the workbook is closed.
+    The XML is compressed on a worker thread while the next rows are turned into XML.
+
+    Parameters
+    ----------
+    file: str | BinaryIO
+        Path of the workbook or binary file object to write it to.
+    shared_strings: bool
+        Whether to write every distinct string once in the shared strings table, else inline in the cells.
+    compress_in_thread: bool
+        Whether to compress the sheets on a worker thread.
+    """
+
+    def __init__(self, file: str | BinaryIO, shared_strings: bool = True, compress_in_thread: bool = True):
+        super().__init__(shared_strings)
+        self.file = file
+        self.compress_in_thread = compress_in_thread
+        self._archive = ZipFile(file, "w", ZIP_DEFLATED, allowZip64=True)
+        self._sheet_titles: List[str] = []
+        self._stream = None
+        self._queue = None
+        self._thread = None
+        self._error = None
+        self._is_closed = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+    def add_sheet(self, title: str = "Sheet") -> None:
+        """
+        Starts a new sheet, the rows are written to it until the next sheet is added.
+
+        Parameters
+        ----------
+        title: str
+            Valid title of the sheet.
+
+        Returns
+        -------
+        None
+        """
+        self._end_sheet()
+
+        self._sheet_titles.append(title)
+        self._rows_count = 0
+        self._stream = self._archive.open(f"xl/worksheets/sheet{len(self._sheet_titles)}.xml", "w", force_zip64=True)
+        if self.compress_in_thread:
+            self._queue = queue.Queue(_MAX_QUEUED_CHUNKS)
+            self._thread = threading.Thread(target=self._compress, daemon=True)
+            self._thread.start()
+
+        selected = ' tabSelected="1"' if len(self._sheet_titles) == 1 else ""
+        self._write(
+            f'{_XML_DECLARATION}<worksheet xmlns="{_MAIN_NAMESPACE}">'
+            f'<sheetPr><outlinePr summaryBelow="1" summaryRight="1"/><pageSetUpPr/></sheetPr>'
+            f'<sheetViews><sheetView{selected} workbookViewId="0"><selection activeCell="A1" sqref="A1"/></sheetView>'
+            f'</sheetViews><sheetFormatPr baseColWidth="8" defaultRowHeight="15"/><sheetData>'
+        )
+
+    def add_sheet_xml(self, title: str, rows_xml: bytes) -> None:
+        """
+        Adds a sheet with the XML of its rows built by build_rows_xml, the sheet is ended after them.
+
+        Parameters
+        ----------
+        title: str
+            Valid title of the sheet.
+        rows_xml: bytes
+            XML of the rows, built with the string and style numbers registered by register_rows.
+
+        Returns
+        -------
+        None
+        """
+        self.add_sheet(title)
+        self._write_data(rows_xml)
+        self._end_sheet()
+
+    def register_rows(
+            self,
+            df: pd.DataFrame,
+            fill_color_codes: pd.Series | None = None,
+            font_color_codes: pd.Series | None = None
+    ) -> Tuple[Dict[str, int], Dict[StyleKey, int]]:
+        """
+        Numbers the column names, the distinct strings and the row styles of DataFrame in the tables of the workbook,
+        so that its rows can be turned into XML by build_rows_xml in another process.
+
+        Parameters
+        ----------
+        df: pd.DataFrame
+            DataFrame to be written.
+        fill_color_codes: pd.Series | None
+            Background color code of every row, aligned with the DataFrame rows.
+        font_color_codes: pd.Series | None
+            Font color code of every row, aligned with the DataFrame rows.
+
+        Returns
+        -------
+        numbers: Tuple[Dict[str, int], Dict[StyleKey, int]]
+            Numbers of the strings and of the row styles of DataFrame.
+        """
+        strings = {}
+        if self.shared_strings:
+            texts = [str(column) for column in df.columns]
+            for column in df.columns:
+                texts.extend(_get_distinct_strings(df[column]))
+            strings = {text: self._strings.setdefault(text, len(self._strings)) for text in texts}
+
+        rows_count = len(df.index)
+        style_keys = zip(
+            _normalize_color_codes(fill_color_codes, rows_count),
+            _normalize_color_codes(font_color_codes, rows_count)
+        )
+        styles = {}
+        for key in dict.fromkeys(style_keys):
+            if key != (None, None):
+                self._get_style_attribute(key)
+                styles[key] = self._styles[key]
+
+        return strings, styles
+
+    def close(self) -> None:
+        """
+        Ends the last sheet and writes the workbook, style and shared strings parts,
+        the workbook is discarded if they can't be written.
+
+        Returns
+        -------
+        None
+        """
+        if self._is_closed:
+            return
+        self._is_closed = True
+
+        try:
+            if not self._sheet_titles:
+                self.add_sheet()
+            self._end_sheet()
+            self._write_workbook_parts()
+        except BaseException:
+            self._discard()
+            raise
+        self._archive.close()
+
+    def abort(self) -> None:
+        """
+        Discards the workbook without writing its remaining parts, deleting its file if it was given by path.
+
+        Returns
+        -------
+        None
+        """
+        if self._is_closed:
+            return
+        self._is_closed = True
+
+        self._discard()
+        logger.info("Xlsx stream aborted, the partial workbook is discarded.")
+
+    def _discard(self) -> None:
+        """
+        Stops the compressing thread and closes the archive, ignoring errors of the partial workbook.
+        """
+        if self._queue is not None:
+            self._queue.put(None)
+            self._thread.join()
+            self._queue = None
+            self._thread = None
+        try:
+            if self._stream is not None:
+                self._stream.close()
+            self._archive.close()
+        except Exception:
+            pass
+        self._stream = None
+
+        if isinstance(self.file, str) and os.path.exists(self.file):
+            os.remove(self.file)
+
+    def _start_rows(self) -> None:
+        if self._stream is None:
+            self.add_sheet()
+
+    def _write(self, text: str) -> None:
+        self._write_data(text.encode("utf-8"))
+
+    def _write_data(self, data: bytes) -> None:
+        if self._queue is None:
+            self._stream.write(data)
+            return
+
+        if self._error is not None:
+            raise self._error
+        self._queue.put(data)
+
+    def _compress(self) -> None:
+        """
+        Writes the queued chunks to the zip stream until the None chunk,
+        draining the queue after an error so that the writing thread never blocks.
+        """
+        while True:
+            data = self._queue.get()
+            if data is None:
+                return
+            if self._error is None:
+                try:
+                    self._stream.write(data)
+                except Exception as error:
+                    self._error = error
+
+    def _end_sheet(self) -> None:
+        if self._stream is None:
+            return
+
+        self._write(
+            '</sheetData><pageMargins left="0.75" right="0.75" top="1" bottom="1" header="0.5" footer="0.5"/>'
+            "</worksheet>"
+        )
+        if self._queue is not None:
+            self._queue.put(None)
+            self._thread.join()
+            self._queue = None
+            self._thread = None
+        self._stream.close()
+        self._stream = None
+
+        if self._error is not None:
+            raise self._error
+
+    def _write_workbook_parts(self) -> None:
+        sheets_count = len(self._sheet_titles)
+        sheet_overrides = "".join(
+            f'<Override PartName="/xl/worksheets/sheet{number}.xml" '
+            f'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+            for number in range(1, sheets_count + 1)
+        )
+        shared_strings_override = (
+            '<Override PartName="/xl/sharedStrings.xml" '
+            'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sharedStrings+xml"/>'
+            if self.shared_strings else ""
+        )
+        self._archive.writestr(
+            "[Content_Types].xml",
+            f'{_XML_DECLARATION}<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+            f'<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+            f'<Default Extension="xml" ContentType="application/xml"/>'
+            f'<Override PartName="/xl/workbook.xml" '
+            f'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+            f'<Override PartName="/xl/styles.xml" '
+            f'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+            f'<Override PartName="/xl/theme/theme1.xml" '
+            f'ContentType="application/vnd.openxmlformats-officedocument.theme+xml"/>'
+            f"{sheet_overrides}{shared_strings_override}</Types>"
+        )
+        self._archive.writestr(
+            "_rels/.rels",
+            f'{_XML_DECLARATION}<Relationships xmlns="{_PACKAGE_RELATIONSHIPS_NAMESPACE}">'
+            f'<Relationship Id="rId1" Type="{_RELATIONSHIPS_NAMESPACE}/officeDocument" Target="xl/workbook.xml"/>'
+            f"</Relationships>"
+        )
+
+        sheets = "".join(
+            f'<sheet name={quoteattr(title)} sheetId="{number}" r:id="rId{number}"/>'
+            for number, title in enumerate(self._sheet_titles, start=1)
+        )
+        self._archive.writestr(
+            "xl/workbook.xml",
+            f'{_XML_DECLARATION}<workbook xmlns="{_MAIN_NAMESPACE}" xmlns:r="{_RELATIONSHIPS_NAMESPACE}">'
+            f'<workbookPr/><bookViews><workbookView activeTab="0"/></bookViews><sheets>{sheets}</sheets>'
+            f'<calcPr calcId="124519" fullCalcOnLoad="1"/></workbook>'
+        )
+
+        relationships = [
+            (f"{_RELATIONSHIPS_NAMESPACE}/worksheet", f"worksheets/sheet{number}.xml")
+            for number in range(1, sheets_count + 1)
+        ]
+        relationships.append((f"{_RELATIONSHIPS_NAMESPACE}/styles", "styles.xml"))
+        relationships.append((f"{_RELATIONSHIPS_NAMESPACE}/theme", "theme/theme1.xml"))
+        if self.shared_strings:
+            relationships.append((f"{_RELATIONSHIPS_NAMESPACE}/sharedStrings", "sharedStrings.xml"))
+        self._archive.writestr(
+            "xl/_rels/workbook.xml.rels",
+            f'{_XML_DECLARATION}<Relationships xmlns="{_PACKAGE_RELATIONSHIPS_NAMESPACE}">'
+            + "".join(
+                f'<Relationship Id="rId{number}" Type="{relationship_type}" Target="{target}"/>'
+                for number, (relationship_type, target) in enumerate(relationships, start=1)
+            )
+            + "</Relationships>"
+        )
+
+        self._archive.writestr("xl/styles.xml", self._get_styles_xml())
+        self._archive.writestr("xl/theme/theme1.xml", _get_theme_xml())
+        if self.shared_strings:
+            self._archive.writestr("xl/sharedStrings.xml", self._get_shared_strings_xml())
+
+        logger.info(
+            f"Written {sheets_count} sheets streamed to xlsx with {len(self._strings)} shared strings "
+            f"and {len(self._styles)} row styles."
+        )
+
+    def _get_styles_xml(self) -> str:
+        """
+        Gets the style table with a font, fill and cell format for every color combination of the rows.
+        """
+        fonts = [_DEFAULT_FONT, _HEADER_FONT]
+        fills = []
+        font_ids: Dict[str, int] = {}
+        fill_ids: Dict[str, int] = {}
+        cell_xfs = ['<xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>', _HEADER_XF.format(' xfId="1"')]
+
+        for fill_color_code, font_color_code in self._styles:
+            font_id = 0
+            if font_color_code is not None:
+                if font_color_code not in font_ids:
+                    font_ids[font_color_code] = len(fonts)
+                    fonts.append(f'<font><color rgb="{_get_rgb(font_color_code)}"/></font>')
+                font_id = font_ids[font_color_code]
+
+            fill_id = 0
+            if fill_color_code is not None:
+                if fill_color_code not in fill_ids:
+                    fill_ids[fill_color_code] = len(fills) + 2
+                    rgb = _get_rgb(fill_color_code)
+                    fills.append(f'<fill><patternFill patternType="solid"><fgColor rgb="{rgb}"/></patternFill></fill>')
+                fill_id = fill_ids[fill_color_code]
+
+            cell_xfs.append(f'<xf numFmtId="0" fontId="{font_id}" fillId="{fill_id}" borderId="0" xfId="0"/>')
+
+        return (
+            f'{_XML_DECLARATION}<styleSheet xmlns="{_MAIN_NAMESPACE}">'
+            f'<fonts count="{len(fonts)}">{"".join(fonts)}</fonts>'
+            f'<fills count="{len(fills) + 2}">{_DEFAULT_FILLS}{"".join(fills)}</fills>'
+            f"{_BORDERS}"
+            f'<cellStyleXfs count="2"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/>{_HEADER_XF.format("")}'
+            f"</cellStyleXfs>"
+            f'<cellXfs count="{len(cell_xfs)}">{"".join(cell_xfs)}</cellXfs>'
+            f'<cellStyles count="2"><cellStyle name="Normal" xfId="0" builtinId="0"/>'
+            f'<cellStyle name="Pandas" xfId="1"/></cellStyles>'
+            f"</styleSheet>"
+        )
+
+    def _get_shared_strings_xml(self) -> str:
+        strings_count = len(self._strings)
+
+        return (
+            f'{_XML_DECLARATION}<sst xmlns="{_MAIN_NAMESPACE}" count="{strings_count}" uniqueCount="{strings_count}">'
+            + "".join(f"<si>{_get_text_xml(text)}</si>" for text in self._strings)
+            + "</sst>"
+        )
+
+
+class _SheetRowsXmlWriter(_RowsXmlWriter):
+    """
+    Collects the XML of the rows of one sheet in memory, the strings missing from the given ones are written inline.
+    """
+
+    def __init__(self, strings: Dict[str, int], styles: Dict[StyleKey, int]):
+        super().__init__(True, strings, styles, add_strings=False)
+        self.chunks: List[bytes] = []
+
+    def _write(self, text: str) -> None:
+        self.chunks.append(text.encode("utf-8"))
+
+
+def _get_distinct_strings(values: pd.Series) -> List[str]:
+    """
+    Gets the distinct strings the cells of a column are written with.
+    """
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        values = pd.Series(values.cat.categories)
+    elif pd.api.types.is_numeric_dtype(values):
+        return []
+    else:
+        try:
+            values = pd.Series(pd.unique(values.dropna()))
+        except TypeError:
+            # Columns of unhashable values are written inline
+            return []
+
+    return [value for value in _get_cell_values(values) if isinstance(value, str)]
+
+
+def build_rows_xml(
+        df: pd.DataFrame,
+        fill_color_codes: pd.Series | None,
+        font_color_codes: pd.Series | None,
+        strings: Dict[str, int],
+        styles: Dict[StyleKey, int],
+        header: bool = True
+) -> bytes:
+    """
+    Builds the XML of the rows of a sheet with the numbers registered by XlsxStreamWriter.register_rows,
+    so that the sheets of a workbook can be built in parallel processes and added by add_sheet_xml.
+
+    Parameters
+    ----------
+    df: pd.DataFrame
+        DataFrame to use for getting the data.
+    fill_color_codes: pd.Series | None
+        Background color code of every row, aligned with the DataFrame rows.
+    font_color_codes: pd.Series | None
+        Font color code of every row, aligned with the DataFrame rows.
+    strings: Dict[str, int]
+        Numbers of the strings in the shared strings table.
+    styles: Dict[StyleKey, int]
+        Numbers of the row styles in the style table.
+    header: bool
+        Whether to write the column names first.
+
+    Returns
+    -------
+    rows_xml: bytes
+        XML of the rows.
+    """
+    writer = _SheetRowsXmlWriter(strings, styles)
+    if header:
+        writer.write_header(df.columns)
+    writer.write_rows(df, fill_color_codes, font_color_codes)
+
+    return b"".join(writer.chunks)
+
+
+def _get_theme_xml() -> str:
+    # The default Office theme the default font color refers to, the same openpyxl writes
+    from openpyxl.writer.theme import theme_xml
+
+    return theme_xml
+
+
+@track_stage
+def write_styled_dataframe_to_stream(
+        df: pd.DataFrame,
+        writer: XlsxStreamWriter,
+        fill_color_codes: pd.Series | None = None,
+        font_color_codes: pd.Series | None = None,
+        header: bool = True
+) -> None:
+    """
+    Writes data from pandas Dataframe to the current sheet of the streaming xlsx writer
+    and styles every row's cells in the same pass.
+
+    Parameters
+    ----------
+    df: pd.DataFrame
+        DataFrame to use for getting the data.
+    writer: XlsxStreamWriter
+        Writer of the workbook, with the sheet to write to added.
+    fill_color_codes: pd.Series | None
+        Background color code of every row, aligned with the DataFrame rows.
+    font_color_codes: pd.Series | None
+        Font color code of every row, aligned with the DataFrame rows.
+    header: bool
+        Whether to write the column names first.
+
+    Returns
+    -------
+    None
+    """
+    if header:
+        writer.write_header(df.columns)
+    writer.write_rows(df, fill_color_codes, font_color_codes)
+
+    logger.info("Data written from DataFrame to xlsx stream successfully!")